@@ -0,0 +1,427 @@
+"""
+Server-side Analytics for GARCH Trading Bot
+Aggregates over garch_predictions expressed as SQL, so only summary rows cross the wire
+
+The same queries run on BigQuery (production) and on SQLite (local stand-in
+for tests and offline runs). Dialect differences are isolated in the backends.
+"""
+
+import math
+import sqlite3
+from datetime import datetime
+
+from prediction_store import PARAM_COLUMNS, param_expr
+
+
+VOL_RANGES = [
+    (0, 1.5, 'Baja (<1.5%)'),
+    (1.5, 3.0, 'Media (1.5-3%)'),
+    (3.0, 100, 'Alta (>3%)')
+]
+
+MODEL_COLUMNS = ['p', 'q', 'omega', 'alpha', 'beta', 'aic', 'bic']
+
+
+def persistence_expr(backend, fallback):
+    """
+    Persistence per row: the stored family-aware value, or `fallback` (an
+    expression over alpha/beta) for rows written before it was stored
+    """
+    alpha, beta = backend.param('alpha'), backend.param('beta')
+    return f"COALESCE({backend.param('persistence')}, {fallback.format(alpha=alpha, beta=beta)})"
+
+
+class BigQueryBackend:
+    """Run analytics queries on BigQuery"""
+
+    dialect = 'bigquery'
+
+    def __init__(self, project_id, dataset_id, table_id, client=None):
+        from google.cloud import bigquery
+        self._bigquery = bigquery
+        self.client = client or bigquery.Client(project=project_id)
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.table = self.table_ref(table_id)
+
+    def table_ref(self, table_id):
+        return f"`{self.project_id}.{self.dataset_id}.{table_id}`"
+
+    def placeholder(self, name):
+        return f"@{name}"
+
+    def timestamp(self, expr):
+        return f"TIMESTAMP({expr})"
+
+    def cast(self, expr, bq_type):
+        return f"CAST({expr} AS {bq_type})"
+
+    def param(self, name):
+        return param_expr(name)
+
+    def since(self, hours):
+        return f"TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL {int(hours)} HOUR)"
+
+    def hour(self, column):
+        return f"EXTRACT(HOUR FROM {column})"
+
+    def median(self, column):
+        return f"APPROX_QUANTILES({column}, 2)[OFFSET(1)]"
+
+    def query(self, sql, params=None):
+        return [dict(row.items()) for row in self.execute(sql, params)]
+
+    def execute(self, sql, params=None):
+        job_config = None
+        if params:
+            types = {bool: 'BOOL', int: 'INT64', float: 'FLOAT64', str: 'STRING'}
+            job_config = self._bigquery.QueryJobConfig(query_parameters=[
+                self._bigquery.ScalarQueryParameter(name, types[type(value)], value)
+                for name, value in params.items()
+            ])
+        return self.client.query(sql, job_config=job_config).result()
+
+
+class SQLiteBackend:
+    """Run analytics queries on a local SQLite database (stand-in for BigQuery)"""
+
+    dialect = 'sqlite'
+
+    def __init__(self, path=":memory:", table_id="garch_predictions"):
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.table = self.table_ref(table_id)
+
+    def table_ref(self, table_id):
+        return table_id
+
+    def placeholder(self, name):
+        return f":{name}"
+
+    def timestamp(self, expr):
+        return expr
+
+    def cast(self, expr, bq_type):
+        # Column affinity does the conversion
+        return expr
+
+    def create_table(self):
+        """Create the predictions table with the production schema"""
+        param_columns = ", ".join(
+            f"{name} {'INTEGER' if cast is int else 'REAL'}" for name, cast in PARAM_COLUMNS.items()
+        )
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                timestamp TEXT, asset TEXT, current_price REAL,
+                predicted_volatility REAL, signal TEXT, model_params TEXT,
+                {param_columns}
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_ts ON {self.table} (timestamp)")
+
+    def insert_rows(self, rows):
+        """Insert prediction rows (same dicts as run_garch sends to BigQuery)"""
+        columns = ['timestamp', 'asset', 'current_price', 'predicted_volatility', 'signal', 'model_params'] + list(PARAM_COLUMNS)
+        placeholders = ", ".join("?" for _ in columns)
+        self.conn.executemany(
+            f"INSERT INTO {self.table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [[row.get(c) for c in columns] for row in rows]
+        )
+        self.conn.commit()
+
+    def param(self, name):
+        return name
+
+    def since(self, hours):
+        return f"strftime('%Y-%m-%dT%H:%M:%S', 'now', '-{int(hours)} hours')"
+
+    def hour(self, column):
+        return f"CAST(strftime('%H', {column}) AS INTEGER)"
+
+    def median(self, column):
+        # SQLite has no quantile aggregate
+        return "NULL"
+
+    def query(self, sql, params=None):
+        return [dict(row) for row in self.conn.execute(sql, params or {}).fetchall()]
+
+    def execute(self, sql, params=None):
+        cursor = self.conn.execute(sql, params or {})
+        self.conn.commit()
+        return cursor
+
+
+def upsert(backend, table_id, key_columns, values, updates, schema):
+    """
+    Insert a row or merge it into the existing one with the same key
+
+    Args:
+        backend: BigQueryBackend or SQLiteBackend
+        table_id: Table to write (without project/dataset)
+        key_columns: Columns identifying the row
+        values: Column -> value of the incoming row (None -> NULL)
+        updates: Column -> expression applied on conflict, with {old}/{new}
+                 for the stored/incoming row and {least}/{greatest}
+        schema: Column -> BigQuery type
+
+    Every incoming value is cast to its column type from `schema`: BigQuery
+    types a bare NULL in the MERGE source as INT64, which would not insert
+    into STRING or TIMESTAMP columns.
+    """
+    table = backend.table_ref(table_id)
+    columns = list(values)
+    params = {c: v for c, v in values.items() if v is not None}
+
+    def source(c):
+        return backend.cast(backend.placeholder(c) if c in params else "NULL", schema[c])
+
+    if backend.dialect == 'bigquery':
+        set_clause = ", ".join(
+            f"{c} = {expr.format(old='T', new='S', least='LEAST', greatest='GREATEST')}"
+            for c, expr in updates.items()
+        )
+        on = " AND ".join(f"T.{c} = S.{c}" for c in key_columns)
+        sql = f"""
+        MERGE {table} T
+        USING (SELECT {', '.join(f'{source(c)} AS {c}' for c in columns)}) S
+        ON {on}
+        WHEN MATCHED THEN UPDATE SET {set_clause}
+        WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) VALUES ({', '.join(f'S.{c}' for c in columns)})
+        """
+    else:
+        # SQLite UPSERT: the incoming row is "excluded"; MIN/MAX are scalar with 2 args
+        set_clause = ", ".join(
+            f"{c} = {expr.format(old=table, new='excluded', least='MIN', greatest='MAX')}"
+            for c, expr in updates.items()
+        )
+        sql = f"""
+        INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(source(c) for c in columns)})
+        ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {set_clause}
+        """
+    backend.execute(sql, params)
+
+
+def _std(n, total, total_sq, ddof=1):
+    """Standard deviation from count, sum and sum of squares"""
+    if not n or n - ddof <= 0:
+        return float('nan')
+    variance = (total_sq - total * total / n) / (n - ddof)
+    return math.sqrt(max(variance, 0.0))
+
+
+def _float(value):
+    return float(value) if value is not None else float('nan')
+
+
+def _iso(value):
+    """TIMESTAMP value as an ISO string (BigQuery returns datetimes, SQLite text)"""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _where(backend, hours):
+    return f"WHERE timestamp >= {backend.since(hours)}" if hours else ""
+
+
+def report_summary(backend, hours=24):
+    """
+    Everything generate_ai_report needs, in one summary row
+
+    Returns:
+        dict or None: Summary statistics (None if there are no rows)
+    """
+    where = _where(backend, hours)
+    persistence = persistence_expr(backend, "CASE WHEN {alpha} > 0 THEN {alpha} + {beta} END")
+    sql = f"""
+    SELECT
+        COUNT(*) AS n,
+        SUM(predicted_volatility) AS vol_sum,
+        SUM(predicted_volatility * predicted_volatility) AS vol_sumsq,
+        MIN(predicted_volatility) AS vol_min,
+        MAX(predicted_volatility) AS vol_max,
+        MIN(current_price) AS price_min,
+        MAX(current_price) AS price_max,
+        SUM(CASE WHEN signal = 'BUY' THEN 1 ELSE 0 END) AS buy_count,
+        SUM(CASE WHEN signal = 'SELL' THEN 1 ELSE 0 END) AS sell_count,
+        SUM(CASE WHEN signal = 'HOLD' THEN 1 ELSE 0 END) AS hold_count,
+        AVG({persistence}) AS persistence,
+        MAX(timestamp) AS last_timestamp,
+        (SELECT current_price FROM {backend.table} {where} ORDER BY timestamp DESC LIMIT 1) AS last_price,
+        (SELECT signal FROM {backend.table} {where} ORDER BY timestamp DESC LIMIT 1) AS last_signal,
+        (SELECT current_price FROM {backend.table} {where} ORDER BY timestamp ASC LIMIT 1) AS first_price
+    FROM {backend.table}
+    {where}
+    """
+    row = backend.query(sql)[0]
+    n = row['n'] or 0
+    if n == 0:
+        return None
+
+    vol_mean = row['vol_sum'] / n
+    return {
+        'count': n,
+        'last_price': float(row['last_price']),
+        'first_price': float(row['first_price']),
+        'last_signal': row['last_signal'],
+        'price_min': float(row['price_min']),
+        'price_max': float(row['price_max']),
+        'price_change_pct': (row['last_price'] - row['first_price']) / row['first_price'] * 100,
+        'vol_mean': vol_mean,
+        'vol_std': _std(n, row['vol_sum'], row['vol_sumsq'], ddof=0),
+        'vol_min': float(row['vol_min']),
+        'vol_max': float(row['vol_max']),
+        'persistence': _float(row['persistence']),
+        'buy_pct': row['buy_count'] / n * 100,
+        'sell_pct': row['sell_count'] / n * 100,
+        'hold_pct': row['hold_count'] / n * 100,
+        'last_timestamp': _iso(row['last_timestamp'])
+    }
+
+
+def signal_summary(backend, hours=None):
+    """Signal counts and signal-by-volatility-range counts"""
+    where = _where(backend, hours)
+    vol_range = "CASE " + " ".join(
+        f"WHEN predicted_volatility > {low} AND predicted_volatility <= {high} THEN '{label}'"
+        for low, high, label in VOL_RANGES
+    ) + " END"
+    rows = backend.query(f"""
+    SELECT {vol_range} AS vol_range, signal, COUNT(*) AS n
+    FROM {backend.table}
+    {where}
+    GROUP BY vol_range, signal
+    """)
+
+    signal_counts = {}
+    signal_by_vol = {}
+    total = 0
+    for row in rows:
+        total += row['n']
+        signal_counts[row['signal']] = signal_counts.get(row['signal'], 0) + row['n']
+        if row['vol_range'] is not None:
+            key = (row['vol_range'], row['signal'])
+            signal_by_vol[key] = signal_by_vol.get(key, 0) + row['n']
+
+    return {'total': total, 'signal_counts': signal_counts, 'signal_by_vol': signal_by_vol}
+
+
+def volatility_summary(backend, hours=None):
+    """Predicted volatility statistics, overall and by hour of day"""
+    where = _where(backend, hours)
+    row = backend.query(f"""
+    SELECT
+        COUNT(predicted_volatility) AS n,
+        SUM(predicted_volatility) AS s,
+        SUM(predicted_volatility * predicted_volatility) AS ss,
+        MIN(predicted_volatility) AS vmin,
+        MAX(predicted_volatility) AS vmax,
+        {backend.median('predicted_volatility')} AS median
+    FROM {backend.table}
+    {where}
+    """)[0]
+    by_hour_rows = backend.query(f"""
+    SELECT
+        {backend.hour('timestamp')} AS hour,
+        COUNT(predicted_volatility) AS n,
+        SUM(predicted_volatility) AS s,
+        SUM(predicted_volatility * predicted_volatility) AS ss
+    FROM {backend.table}
+    {where}
+    GROUP BY hour
+    ORDER BY hour
+    """)
+
+    n = row['n'] or 0
+    return {
+        'mean': row['s'] / n if n else float('nan'),
+        'median': _float(row['median']),
+        'std': _std(n, row['s'], row['ss']),
+        'min': _float(row['vmin']),
+        'max': _float(row['vmax']),
+        'by_hour': {
+            int(r['hour']): (r['s'] / r['n'], _std(r['n'], r['s'], r['ss']))
+            for r in by_hour_rows if r['n']
+        }
+    }
+
+
+def price_summary(backend, hours=None):
+    """First/last price and statistics of consecutive returns"""
+    where = _where(backend, hours)
+    row = backend.query(f"""
+    WITH ordered AS (
+        SELECT
+            timestamp,
+            current_price,
+            (current_price / LAG(current_price) OVER (ORDER BY timestamp) - 1) * 100 AS ret
+        FROM {backend.table}
+        {where}
+    )
+    SELECT
+        COUNT(ret) AS n,
+        SUM(ret) AS s,
+        SUM(ret * ret) AS ss,
+        {backend.median('ret')} AS median,
+        (SELECT current_price FROM ordered ORDER BY timestamp ASC LIMIT 1) AS first_price,
+        (SELECT current_price FROM ordered ORDER BY timestamp DESC LIMIT 1) AS last_price
+    FROM ordered
+    """)[0]
+
+    n = row['n'] or 0
+    return {
+        'first': _float(row['first_price']),
+        'last': _float(row['last_price']),
+        'ret_mean': row['s'] / n if n else float('nan'),
+        'ret_median': _float(row['median']),
+        'ret_std': _std(n, row['s'], row['ss'])
+    }
+
+
+def model_summary(backend, hours=None):
+    """Average GARCH parameters, persistence and fit quality"""
+    where = _where(backend, hours)
+    defaults = {'p': 1, 'q': 1}
+    averages = ",\n        ".join(
+        f"AVG(COALESCE({backend.param(name)}, {defaults.get(name, 0)})) AS {name}" for name in MODEL_COLUMNS
+    )
+    persistence = persistence_expr(backend, "COALESCE({alpha}, 0) + COALESCE({beta}, 0)")
+    row = backend.query(f"""
+    SELECT
+        {averages},
+        AVG({persistence}) AS persistence
+    FROM {backend.table}
+    {where}
+    """)[0]
+    return {name: _float(value) for name, value in row.items()}
+
+
+if __name__ == "__main__":
+    # Quick check against the local SQLite stand-in
+    import random
+    import json
+    from datetime import timedelta
+
+    backend = SQLiteBackend()
+    backend.create_table()
+
+    now = datetime.utcnow()
+    price = 87500.0
+    rows = []
+    for i in range(288):
+        price *= 1 + random.gauss(0, 0.002)
+        params = {'p': 1, 'q': 1, 'omega': 0.03, 'alpha': 0.16, 'beta': 0.37, 'aic': 1105.0, 'bic': 1133.0}
+        rows.append({
+            'timestamp': (now - timedelta(minutes=5 * (288 - i))).isoformat(),
+            'asset': 'BTC-USD',
+            'current_price': price,
+            'predicted_volatility': abs(random.gauss(0.5, 0.1)),
+            'signal': random.choice(['BUY', 'SELL', 'HOLD']),
+            'model_params': json.dumps(params),
+            **params
+        })
+    backend.insert_rows(rows)
+
+    print("📊 Report summary:", report_summary(backend))
+    print("📈 Signals:", signal_summary(backend))
+    print("📉 Volatility:", volatility_summary(backend))
+    print("💰 Price:", price_summary(backend))
+    print("🤖 Model:", model_summary(backend))
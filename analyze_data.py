@@ -3,166 +3,285 @@
 Script de Metaanálisis para GARCH Trading Bot
 ==============================================
 Extrae y analiza los datos de BigQuery para insights profundos.
+Los datos se procesan por páginas, con memoria acotada.
+
+Uso:
+    python analyze_data.py               # análisis + CSV, leyendo BigQuery por páginas
+    python analyze_data.py --local       # igual, desde el espejo Parquet local
+    python analyze_data.py --no-export   # sin CSV: agregados calculados en BigQuery
 """
 
+import os
+import sys
+import numpy as np
 import pandas as pd
-import json
 from google.cloud import bigquery
 from datetime import datetime
 import matplotlib.pyplot as plt
 import seaborn as sns
+from prediction_store import param_select_sql, iter_query_pages, iter_mirror, PAGE_SIZE
+from streaming_stats import RunningStats, P2Quantile
+import analytics_sql
 
 # Configuración
 PROJECT_ID = "travel-recomender"
 DATASET_ID = "trading_bot"
 TABLE_ID = "garch_predictions"
 
-def fetch_data():
-    """Extrae todos los datos de BigQuery"""
-    client = bigquery.Client(project=PROJECT_ID)
-    
-    query = f"""
-    SELECT 
-        timestamp,
-        asset,
-        current_price,
-        predicted_volatility,
-        signal,
-        model_params
-    FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
-    ORDER BY timestamp ASC
-    """
-    
-    df = client.query(query).to_dataframe()
-    
-    # Parsear model_params JSON
-    df['model_params_parsed'] = df['model_params'].apply(json.loads)
-    
-    # Extraer parámetros individuales
-    df['p'] = df['model_params_parsed'].apply(lambda x: x.get('p', 1))
-    df['q'] = df['model_params_parsed'].apply(lambda x: x.get('q', 1))
-    df['omega'] = df['model_params_parsed'].apply(lambda x: x.get('omega', 0))
-    df['alpha'] = df['model_params_parsed'].apply(lambda x: x.get('alpha', 0))
-    df['beta'] = df['model_params_parsed'].apply(lambda x: x.get('beta', 0))
-    df['aic'] = df['model_params_parsed'].apply(lambda x: x.get('aic', 0))
-    df['bic'] = df['model_params_parsed'].apply(lambda x: x.get('bic', 0))
-    
+VOL_BINS = [0, 1.5, 3.0, 100]
+VOL_LABELS = ['Baja (<1.5%)', 'Media (1.5-3%)', 'Alta (>3%)']
+MODEL_COLUMNS = ['p', 'q', 'omega', 'alpha', 'beta', 'persistence', 'aic', 'bic']
+
+def iter_data(use_mirror=False, page_size=PAGE_SIZE):
+    """Extrae los datos página por página (memoria acotada)"""
+    if use_mirror:
+        pages = iter_mirror(batch_size=page_size)
+    else:
+        client = bigquery.Client(project=PROJECT_ID)
+        query = f"""
+        SELECT 
+            timestamp,
+            asset,
+            current_price,
+            predicted_volatility,
+            signal,
+            {param_select_sql(['p', 'q', 'omega', 'alpha', 'beta', 'persistence', 'aic', 'bic'])}
+        FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+        ORDER BY timestamp ASC
+        """
+        pages = iter_query_pages(client, query, page_size=page_size)
+
+    for page in pages:
+        yield with_persistence(page.fillna({'p': 1, 'q': 1, 'omega': 0, 'alpha': 0, 'beta': 0, 'aic': 0, 'bic': 0}))
+
+
+def with_persistence(df):
+    """Persistencia guardada por modelo; α+β en filas anteriores a esa columna"""
+    fallback = df['alpha'].astype(float) + df['beta'].astype(float)
+    df['persistence'] = df['persistence'].astype(float).fillna(fallback) if 'persistence' in df else fallback
     return df
 
-def analyze_signals(df):
+class AnalysisAccumulator:
+    """Estadísticas de señales, volatilidad, precio y modelo acumuladas por página"""
+
+    def __init__(self):
+        self.total = 0
+        self.signal_counts = pd.Series(dtype='int64')
+        self.signal_by_vol = pd.DataFrame()
+        self.volatility = RunningStats()
+        self.volatility_median = P2Quantile(0.5)
+        self.vol_by_hour = {}
+        self.first_price = None
+        self.last_price = None
+        self.returns = RunningStats()
+        self.returns_median = P2Quantile(0.5)
+        self.model = {col: RunningStats() for col in MODEL_COLUMNS}
+
+    def update(self, df):
+        """Procesa una página y la descarta"""
+        if df.empty:
+            return
+        self.total += len(df)
+
+        # Señales
+        self.signal_counts = self.signal_counts.add(df['signal'].value_counts(), fill_value=0)
+        vol_range = pd.cut(df['predicted_volatility'], bins=VOL_BINS, labels=VOL_LABELS).rename('vol_range')
+        self.signal_by_vol = self.signal_by_vol.add(pd.crosstab(vol_range, df['signal']), fill_value=0)
+
+        # Volatilidad
+        vols = df['predicted_volatility'].to_numpy(dtype=float)
+        self.volatility.update(vols)
+        self.volatility_median.extend(vols)
+        hours = pd.to_datetime(df['timestamp']).dt.hour.to_numpy()
+        for hour in np.unique(hours):
+            self.vol_by_hour.setdefault(int(hour), RunningStats()).update(vols[hours == hour])
+
+        # Precio (el último precio de la página anterior enlaza los retornos)
+        prices = df['current_price'].to_numpy(dtype=float)
+        if self.first_price is None:
+            self.first_price = prices[0]
+            chained = prices
+        else:
+            chained = np.concatenate([[self.last_price], prices])
+        returns = np.diff(chained) / chained[:-1] * 100
+        self.returns.update(returns)
+        self.returns_median.extend(returns)
+        self.last_price = prices[-1]
+
+        # Modelo
+        for col in MODEL_COLUMNS:
+            self.model[col].update(df[col].to_numpy(dtype=float))
+
+    def summaries(self):
+        """Mismos resúmenes que analytics_sql, calculados localmente"""
+        signals = {
+            'total': self.total,
+            'signal_counts': {k: int(v) for k, v in self.signal_counts.items()},
+            'signal_by_vol': {k: int(v) for k, v in self.signal_by_vol.stack().items()}
+        }
+        volatility = {
+            'mean': self.volatility.mean,
+            'median': self.volatility_median.value(),
+            'std': self.volatility.std(),
+            'min': self.volatility.min,
+            'max': self.volatility.max,
+            'by_hour': {h: (st.mean, st.std()) for h, st in sorted(self.vol_by_hour.items())}
+        }
+        price = {
+            'first': self.first_price,
+            'last': self.last_price,
+            'ret_mean': self.returns.mean,
+            'ret_median': self.returns_median.value(),
+            'ret_std': self.returns.std()
+        }
+        model = {col: st.mean for col, st in self.model.items()}
+        return signals, volatility, price, model
+
+def _fmt(value, spec):
+    """Formatea un valor que puede no estar disponible (p.ej. mediana en SQLite)"""
+    return "n/d" if value is None or value != value else format(value, spec)
+
+def analyze_signals(signals):
     """Análisis de señales de trading"""
     print("\n" + "="*60)
     print("📊 ANÁLISIS DE SEÑALES")
     print("="*60)
     
-    signal_counts = df['signal'].value_counts()
     print(f"\nDistribución de Señales:")
-    for signal, count in signal_counts.items():
-        pct = (count / len(df)) * 100
+    for signal, count in sorted(signals['signal_counts'].items(), key=lambda x: -x[1]):
+        pct = (count / signals['total']) * 100
         print(f"  {signal}: {count} ({pct:.1f}%)")
     
     # Señales por rango de volatilidad
     print(f"\n📈 Señales por Rango de Volatilidad:")
-    df['vol_range'] = pd.cut(df['predicted_volatility'], 
-                              bins=[0, 1.5, 3.0, 100], 
-                              labels=['Baja (<1.5%)', 'Media (1.5-3%)', 'Alta (>3%)'])
-    
-    signal_by_vol = pd.crosstab(df['vol_range'], df['signal'], normalize='index') * 100
+    counts = pd.Series(signals['signal_by_vol'], dtype=float)
+    if counts.empty:
+        return
+    signal_by_vol = counts.unstack(fill_value=0).reindex([l for l in VOL_LABELS if l in counts.index.get_level_values(0)])
+    signal_by_vol.index.name = 'vol_range'
+    signal_by_vol.columns.name = 'signal'
+    signal_by_vol = signal_by_vol.div(signal_by_vol.sum(axis=1), axis=0) * 100
     print(signal_by_vol.round(1))
 
-def analyze_volatility(df):
+def analyze_volatility(volatility):
     """Análisis de volatilidad predicha"""
     print("\n" + "="*60)
     print("📉 ANÁLISIS DE VOLATILIDAD")
     print("="*60)
     
     print(f"\nEstadísticas de Volatilidad Predicha:")
-    print(f"  Media: {df['predicted_volatility'].mean():.4f}%")
-    print(f"  Mediana: {df['predicted_volatility'].median():.4f}%")
-    print(f"  Desv. Estándar: {df['predicted_volatility'].std():.4f}%")
-    print(f"  Mínimo: {df['predicted_volatility'].min():.4f}%")
-    print(f"  Máximo: {df['predicted_volatility'].max():.4f}%")
+    print(f"  Media: {volatility['mean']:.4f}%")
+    print(f"  Mediana (aprox.): {_fmt(volatility['median'], '.4f')}%")
+    print(f"  Desv. Estándar: {volatility['std']:.4f}%")
+    print(f"  Mínimo: {volatility['min']:.4f}%")
+    print(f"  Máximo: {volatility['max']:.4f}%")
     
     # Volatilidad en el tiempo
-    df['hour'] = df['timestamp'].dt.hour
-    vol_by_hour = df.groupby('hour')['predicted_volatility'].agg(['mean', 'std'])
+    vol_by_hour = pd.DataFrame.from_dict(volatility['by_hour'], orient='index', columns=['mean', 'std'])
+    vol_by_hour.index.name = 'hour'
     print(f"\n⏰ Volatilidad Promedio por Hora del Día:")
     print(vol_by_hour.round(4))
 
-def analyze_price_movements(df):
+def analyze_price_movements(price):
     """Análisis de movimientos de precio"""
     print("\n" + "="*60)
     print("💰 ANÁLISIS DE PRECIO BTC")
     print("="*60)
     
     print(f"\nEstadísticas de Precio:")
-    print(f"  Precio Inicial: ${df['current_price'].iloc[0]:,.2f}")
-    print(f"  Precio Final: ${df['current_price'].iloc[-1]:,.2f}")
-    print(f"  Cambio Total: ${df['current_price'].iloc[-1] - df['current_price'].iloc[0]:,.2f}")
-    print(f"  Cambio %: {((df['current_price'].iloc[-1] / df['current_price'].iloc[0]) - 1) * 100:.2f}%")
-    
-    # Calcular retornos
-    df['return'] = df['current_price'].pct_change() * 100
+    print(f"  Precio Inicial: ${price['first']:,.2f}")
+    print(f"  Precio Final: ${price['last']:,.2f}")
+    print(f"  Cambio Total: ${price['last'] - price['first']:,.2f}")
+    print(f"  Cambio %: {((price['last'] / price['first']) - 1) * 100:.2f}%")
     
     print(f"\n📊 Estadísticas de Retornos (%):")
-    print(f"  Media: {df['return'].mean():.4f}%")
-    print(f"  Mediana: {df['return'].median():.4f}%")
-    print(f"  Volatilidad Realizada: {df['return'].std():.4f}%")
+    print(f"  Media: {price['ret_mean']:.4f}%")
+    print(f"  Mediana (aprox.): {_fmt(price['ret_median'], '.4f')}%")
+    print(f"  Volatilidad Realizada: {price['ret_std']:.4f}%")
 
-def analyze_model_performance(df):
+def analyze_model_performance(model):
     """Análisis de rendimiento del modelo GARCH"""
     print("\n" + "="*60)
     print("🤖 ANÁLISIS DE MODELO GARCH")
     print("="*60)
     
     print(f"\nParámetros GARCH Promedio:")
-    print(f"  p (lags GARCH): {df['p'].mean():.2f}")
-    print(f"  q (lags ARCH): {df['q'].mean():.2f}")
-    print(f"  ω (omega): {df['omega'].mean():.6f}")
-    print(f"  α (alpha): {df['alpha'].mean():.6f}")
-    print(f"  β (beta): {df['beta'].mean():.6f}")
+    print(f"  p (lags GARCH): {model['p']:.2f}")
+    print(f"  q (lags ARCH): {model['q']:.2f}")
+    print(f"  ω (omega): {model['omega']:.6f}")
+    print(f"  α (alpha): {model['alpha']:.6f}")
+    print(f"  β (beta): {model['beta']:.6f}")
     
     # Persistencia de volatilidad
-    persistence = df['alpha'] + df['beta']
+    persistence = model['persistence']
     print(f"\n📌 Persistencia de Volatilidad (α + β):")
-    print(f"  Media: {persistence.mean():.4f}")
-    print(f"  Interpretación: {'Alta persistencia (shocks duraderos)' if persistence.mean() > 0.9 else 'Baja persistencia (shocks temporales)'}")
+    print(f"  Media: {persistence:.4f}")
+    print(f"  Interpretación: {'Alta persistencia (shocks duraderos)' if persistence > 0.9 else 'Baja persistencia (shocks temporales)'}")
     
     # Calidad del ajuste
     print(f"\n🎯 Calidad de Ajuste:")
-    print(f"  AIC Promedio: {df['aic'].mean():.2f}")
-    print(f"  BIC Promedio: {df['bic'].mean():.2f}")
-
-def export_to_csv(df):
-    """Exporta datos a CSV para análisis externo"""
-    filename = f"garch_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    df.to_csv(filename, index=False)
-    print(f"\n✅ Datos exportados a: {filename}")
+    print(f"  AIC Promedio: {model['aic']:.2f}")
+    print(f"  BIC Promedio: {model['bic']:.2f}")
+
+def export_to_csv(df, filename=None):
+    """Exporta una página de datos a CSV (añade al archivo si ya existe)"""
+    filename = filename or f"garch_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    df.to_csv(filename, mode='a', header=not os.path.exists(filename), index=False)
     return filename
 
+def fetch_summaries(backend):
+    """Agregados calculados en el servidor (solo filas de resumen)"""
+    return (
+        analytics_sql.signal_summary(backend),
+        analytics_sql.volatility_summary(backend),
+        analytics_sql.price_summary(backend),
+        analytics_sql.model_summary(backend)
+    )
+
 def main():
     print("🚀 Iniciando Metaanálisis del GARCH Trading Bot...")
     print(f"⏰ Fecha/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Extraer datos
-    print("\n📥 Extrayendo datos de BigQuery...")
-    df = fetch_data()
-    print(f"✅ {len(df)} registros extraídos")
+    use_mirror = '--local' in sys.argv
+    export = '--no-export' not in sys.argv
+    csv_file = None
     
-    # Análisis
-    analyze_signals(df)
-    analyze_volatility(df)
-    analyze_price_movements(df)
-    analyze_model_performance(df)
+    if use_mirror or export:
+        # Recorrer los datos página por página (memoria acotada)
+        print(f"\n📥 Extrayendo datos de {'espejo Parquet local' if use_mirror else 'BigQuery'}...")
+        acc = AnalysisAccumulator()
+        if export:
+            csv_file = f"garch_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        for page in iter_data(use_mirror=use_mirror):
+            acc.update(page)
+            if csv_file:
+                export_to_csv(page, csv_file)
+        print(f"✅ {acc.total} registros extraídos")
+        if csv_file:
+            print(f"\n✅ Datos exportados a: {csv_file}")
+        if acc.total == 0:
+            return
+        signals, volatility, price, model = acc.summaries()
+    else:
+        # Agregados en BigQuery: solo viajan filas de resumen
+        print("\n📥 Calculando agregados en BigQuery...")
+        backend = analytics_sql.BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID)
+        signals, volatility, price, model = fetch_summaries(backend)
+        print(f"✅ {signals['total']} registros agregados")
+        if signals['total'] == 0:
+            return
     
-    # Exportar
-    csv_file = export_to_csv(df)
+    # Análisis
+    analyze_signals(signals)
+    analyze_volatility(volatility)
+    analyze_price_movements(price)
+    analyze_model_performance(model)
     
     print("\n" + "="*60)
     print("✅ METAANÁLISIS COMPLETADO")
     print("="*60)
     print(f"\n💡 Próximos pasos:")
-    print(f"  1. Revisar el archivo CSV: {csv_file}")
+    print(f"  1. Revisar el archivo CSV: {csv_file or 'sin CSV (--no-export)'}")
     print(f"  2. Crear visualizaciones con pandas/matplotlib")
     print(f"  3. Comparar volatilidad predicha vs realizada")
     print(f"  4. Evaluar performance del portfolio backtest")
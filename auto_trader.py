@@ -6,14 +6,21 @@ Compra y vende basándose en predicciones y señales
 
 import os
 from dotenv import load_dotenv
-from binance.client import Client
+from rate_limit import GovernedClient
 from binance.exceptions import BinanceAPIException
-import json
 from datetime import datetime
 import time
+from trade_journal import TradeJournal, JOURNAL_FILE
 
 load_dotenv()
 
+# Símbolos con precio por WebSocket en el modo interactivo
+FEED_SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'BNBUSDT']
+
+# Caché de metadatos del exchange y del snapshot de cuenta
+SYMBOL_FILTERS_TTL = 3600   # segundos (filtros LOT_SIZE, etc. cambian muy poco)
+ACCOUNT_SNAPSHOT_TTL = 10   # segundos
+
 class Colors:
     GREEN = '\033[92m'
     RED = '\033[91m'
@@ -24,8 +31,56 @@ class Colors:
     RESET = '\033[0m'
     BOLD = '\033[1m'
 
+class TradingPolicy:
+    """Reglas pre-trade para ejecución no interactiva (reemplazan la confirmación manual)"""
+
+    def __init__(self, max_notional_usdt=100.0, allowed_symbols=None, dry_run=True, allow_live=False):
+        """
+        Args:
+            max_notional_usdt: Valor máximo por orden en USDT
+            allowed_symbols: Símbolos permitidos (None = todos)
+            dry_run: Si True, valida pero no envía órdenes
+            allow_live: Si True, permite operar fuera del testnet sin confirmación
+        """
+        self.max_notional_usdt = max_notional_usdt
+        self.allowed_symbols = set(allowed_symbols) if allowed_symbols else None
+        self.dry_run = dry_run
+        self.allow_live = allow_live
+
+    @classmethod
+    def from_env(cls):
+        """Política desde variables de entorno (ver .env.example)"""
+        symbols = os.getenv('ALLOWED_SYMBOLS', '')
+        return cls(
+            max_notional_usdt=float(os.getenv('MAX_NOTIONAL_USDT', '100')),
+            allowed_symbols=[s.strip().upper() for s in symbols.split(',') if s.strip()] or None,
+            dry_run=os.getenv('TRADING_DRY_RUN', 'true').lower() == 'true',
+            allow_live=os.getenv('TRADING_ALLOW_LIVE', 'false').lower() == 'true'
+        )
+
+    def check(self, symbol, quantity, price, reduces_position=False):
+        """
+        Validar una orden
+
+        Args:
+            reduces_position: True para ventas que cierran una posición; no
+                              se limitan por valor, o una posición acumulada
+                              por encima del máximo no podría cerrarse nunca
+
+        Returns:
+            (ok, motivo)
+        """
+        if self.allowed_symbols is not None and symbol not in self.allowed_symbols:
+            return False, f"Símbolo {symbol} no permitido por la política"
+        notional = quantity * price
+        if not reduces_position and notional > self.max_notional_usdt:
+            return False, f"Valor ${notional:.2f} supera el máximo ${self.max_notional_usdt:.2f}"
+        return True, "OK"
+
+
 class AutoTrader:
-    def __init__(self, api_key=None, secret_key=None, testnet=True):
+    def __init__(self, api_key=None, secret_key=None, testnet=True, policy=None, feed=None,
+                 journal_path=JOURNAL_FILE, feed_symbols=None):
         """
         Inicializar trading automatizado
 
@@ -33,10 +88,24 @@ class AutoTrader:
             api_key: Binance API Key (opcional, usa .env si no se proporciona)
             secret_key: Binance Secret Key (opcional, usa .env si no se proporciona)
             testnet: Si True, usa testnet; si False, usa producción (PELIGRO!)
+            policy: TradingPolicy para modo programático (sin input());
+                    si es None, cada orden pide confirmación interactiva
+            feed: MarketDataFeed ya iniciado (market_feed.py) para leer
+                  precios desde memoria; si es None, usa REST
+            feed_symbols: Si no se pasa feed, abrir un BinanceStreamFeed propio
+                          con estos símbolos (se cierra con close())
+            journal_path: Archivo del diario de trades (en Cloud Functions, bajo /tmp)
         """
 
+        self.policy = policy
+        self.feed = feed
+
         # Validación de seguridad
-        if not testnet:
+        if not testnet and policy is not None:
+            if not policy.allow_live:
+                print(f"{Colors.YELLOW}Política no permite API REAL. Usando testnet.{Colors.RESET}")
+                testnet = True
+        elif not testnet:
             confirm = input(f"{Colors.RED}⚠️  PELIGRO: ¿Estás seguro de usar API REAL? (escribe 'SI CONFIRMO'): {Colors.RESET}")
             if confirm != "SI CONFIRMO":
                 print(f"{Colors.YELLOW}Abortado por seguridad. Usando testnet.{Colors.RESET}")
@@ -49,28 +118,112 @@ class AutoTrader:
         if not self.api_key or not self.secret_key:
             raise ValueError("API keys no encontradas. Configura tu archivo .env")
 
-        self.client = Client(
+        self.client = GovernedClient(
             self.api_key,
             self.secret_key,
             testnet=self.testnet
         )
 
-        self.trades_log = "trades_history.json"
+        # Diario append-only (migra el historial JSON antiguo la primera vez)
+        self.journal = TradeJournal(journal_path)
+        if self.journal.count() == 0:
+            self.journal.import_legacy_json()
 
-    def get_balance(self, asset):
-        """Obtener balance disponible de un asset"""
+        self._owns_feed = False
+        if self.feed is None and feed_symbols:
+            self.start_feed(feed_symbols)
+
+        # Cachés (evitan round trips REST en cada orden)
+        self._symbol_filters = {}
+        self._symbol_filters_loaded_at = 0
+        self._account_snapshot = None
+        self._account_snapshot_at = 0
+
+    def start_feed(self, symbols):
+        """
+        Abrir el stream WebSocket de precios (ticker + bookTicker)
+
+        Si no se puede abrir, get_current_price sigue usando REST.
+        """
+        from market_feed import BinanceStreamFeed
+        feed = BinanceStreamFeed(testnet=self.testnet)
         try:
+            feed.start(symbols)
+        except Exception as e:
+            print(f"{Colors.YELLOW}⚠️  Feed WebSocket no disponible ({e}), usando REST{Colors.RESET}")
+            return
+        self.feed = feed
+        self._owns_feed = True
+
+    def close(self):
+        """Cerrar el feed propio y el diario"""
+        if self._owns_feed and self.feed is not None:
+            self.feed.stop()
+            self.feed = None
+            self._owns_feed = False
+        self.journal.close()
+
+    def _refresh_symbol_filters(self):
+        """Cargar los filtros de todos los símbolos con una sola llamada a exchange info"""
+        info = self.client.get_exchange_info()
+        self._symbol_filters = {
+            s['symbol']: {f['filterType']: f for f in s['filters']}
+            for s in info['symbols']
+        }
+        self._symbol_filters_loaded_at = time.time()
+
+    def get_symbol_filters(self, symbol):
+        """Filtros de un símbolo (desde caché, refrescada cada SYMBOL_FILTERS_TTL)"""
+        expired = time.time() - self._symbol_filters_loaded_at > SYMBOL_FILTERS_TTL
+        if expired or symbol not in self._symbol_filters:
+            self._refresh_symbol_filters()
+        if symbol not in self._symbol_filters:
+            raise ValueError(f"Símbolo no encontrado en exchange info: {symbol}")
+        return self._symbol_filters[symbol]
+
+    def _adjust_quantity(self, symbol, quantity):
+        """
+        Ajustar cantidad al step size del símbolo
+
+        Returns:
+            (quantity, min_qty): cantidad ajustada y mínimo permitido
+        """
+        lot_filter = self.get_symbol_filters(symbol)['LOT_SIZE']
+        step_size = float(lot_filter['stepSize'])
+        quantity = round(quantity / step_size) * step_size
+        return quantity, float(lot_filter['minQty'])
+
+    def get_account_snapshot(self, refresh=False):
+        """Snapshot de la cuenta compartido por todas las consultas de balance"""
+        expired = time.time() - self._account_snapshot_at > ACCOUNT_SNAPSHOT_TTL
+        if refresh or expired or self._account_snapshot is None:
             account = self.client.get_account()
-            for balance in account['balances']:
-                if balance['asset'] == asset:
-                    return float(balance['free'])
-            return 0.0
+            self._account_snapshot = {
+                b['asset']: {'free': float(b['free']), 'locked': float(b['locked'])}
+                for b in account['balances']
+            }
+            self._account_snapshot_at = time.time()
+        return self._account_snapshot
+
+    def invalidate_account_snapshot(self):
+        """Forzar recarga del snapshot (después de ejecutar órdenes)"""
+        self._account_snapshot = None
+
+    def get_balance(self, asset, refresh=False):
+        """Obtener balance disponible de un asset"""
+        try:
+            balances = self.get_account_snapshot(refresh=refresh)
+            return balances.get(asset, {}).get('free', 0.0)
         except BinanceAPIException as e:
             print(f"{Colors.RED}❌ Error obteniendo balance: {e.message}{Colors.RESET}")
             return None
 
     def get_current_price(self, symbol):
-        """Obtener precio actual de un símbolo"""
+        """Obtener precio actual de un símbolo (feed en memoria, REST como respaldo)"""
+        if self.feed is not None:
+            price = self.feed.get_price(symbol)
+            if price is not None:
+                return price
         try:
             ticker = self.client.get_symbol_ticker(symbol=symbol)
             return float(ticker['price'])
@@ -108,16 +261,10 @@ class AutoTrader:
                 print(f"{Colors.RED}❌ Debes especificar amount_usdt o quantity{Colors.RESET}")
                 return None
 
-            # Obtener info del símbolo para validar
-            symbol_info = self.client.get_symbol_info(symbol)
-
-            # Ajustar cantidad a step size
-            lot_filter = next(f for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE')
-            step_size = float(lot_filter['stepSize'])
-            quantity = round(quantity / step_size) * step_size
+            # Ajustar cantidad a step size (filtros desde caché)
+            quantity, min_qty = self._adjust_quantity(symbol, quantity)
 
             # Validar cantidad mínima
-            min_qty = float(lot_filter['minQty'])
             if quantity < min_qty:
                 print(f"{Colors.RED}❌ Cantidad {quantity} menor que mínimo {min_qty}{Colors.RESET}")
                 return None
@@ -129,11 +276,11 @@ class AutoTrader:
             print(f"   Valor total: ${quantity * current_price:.2f}")
             print()
 
-            # Confirmar
-            confirm = input(f"{Colors.YELLOW}¿Ejecutar compra? (s/n): {Colors.RESET}").lower()
-            if confirm not in ['s', 'si', 'y', 'yes']:
-                print(f"{Colors.YELLOW}⚠️  Compra cancelada{Colors.RESET}")
+            # Confirmar (input interactivo o política)
+            if not self._approve_order('compra', symbol, quantity, current_price):
                 return None
+            if self.policy is not None and self.policy.dry_run:
+                return self._dry_run_order(symbol, 'BUY', quantity, current_price)
 
             # Ejecutar orden
             print(f"{Colors.BLUE}🔄 Ejecutando orden...{Colors.RESET}")
@@ -197,7 +344,7 @@ class AutoTrader:
             # Si sell_all, obtener balance
             if sell_all:
                 base_asset = symbol.replace('USDT', '').replace('BUSD', '')
-                quantity = self.get_balance(base_asset)
+                quantity = self.get_balance(base_asset, refresh=True)
                 if not quantity or quantity == 0:
                     print(f"{Colors.RED}❌ No tienes {base_asset} para vender{Colors.RESET}")
                     return None
@@ -206,16 +353,10 @@ class AutoTrader:
                 print(f"{Colors.RED}❌ Debes especificar quantity o sell_all=True{Colors.RESET}")
                 return None
 
-            # Obtener info del símbolo
-            symbol_info = self.client.get_symbol_info(symbol)
-
-            # Ajustar cantidad a step size
-            lot_filter = next(f for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE')
-            step_size = float(lot_filter['stepSize'])
-            quantity = round(quantity / step_size) * step_size
+            # Ajustar cantidad a step size (filtros desde caché)
+            quantity, min_qty = self._adjust_quantity(symbol, quantity)
 
             # Validar cantidad mínima
-            min_qty = float(lot_filter['minQty'])
             if quantity < min_qty:
                 print(f"{Colors.RED}❌ Cantidad {quantity} menor que mínimo {min_qty}{Colors.RESET}")
                 return None
@@ -227,11 +368,11 @@ class AutoTrader:
             print(f"   Valor total: ${quantity * current_price:.2f}")
             print()
 
-            # Confirmar
-            confirm = input(f"{Colors.YELLOW}¿Ejecutar venta? (s/n): {Colors.RESET}").lower()
-            if confirm not in ['s', 'si', 'y', 'yes']:
-                print(f"{Colors.YELLOW}⚠️  Venta cancelada{Colors.RESET}")
+            # Confirmar (input interactivo o política)
+            if not self._approve_order('venta', symbol, quantity, current_price, reduces_position=True):
                 return None
+            if self.policy is not None and self.policy.dry_run:
+                return self._dry_run_order(symbol, 'SELL', quantity, current_price)
 
             # Ejecutar orden
             print(f"{Colors.BLUE}🔄 Ejecutando orden...{Colors.RESET}")
@@ -269,6 +410,80 @@ class AutoTrader:
             print(f"{Colors.RED}❌ Error inesperado: {e}{Colors.RESET}")
             return None
 
+    def _approve_order(self, action, symbol, quantity, price, reduces_position=False):
+        """Confirmación manual (sin política) o checks pre-trade (con política)"""
+        if self.policy is None:
+            confirm = input(f"{Colors.YELLOW}¿Ejecutar {action}? (s/n): {Colors.RESET}").lower()
+            if confirm not in ['s', 'si', 'y', 'yes']:
+                print(f"{Colors.YELLOW}⚠️  {action.capitalize()} cancelada{Colors.RESET}")
+                return False
+            return True
+
+        ok, reason = self.policy.check(symbol, quantity, price, reduces_position=reduces_position)
+        if not ok:
+            print(f"{Colors.YELLOW}⚠️  {action.capitalize()} rechazada: {reason}{Colors.RESET}")
+        return ok
+
+    def _dry_run_order(self, symbol, side, quantity, price):
+        """Orden simulada (dry-run): no se envía, se registra con dry_run"""
+        print(f"{Colors.CYAN}🧪 DRY-RUN: {side} {quantity:.8f} {symbol} @ ${price:,.2f}{Colors.RESET}\n")
+        order = {
+            'symbol': symbol,
+            'side': side,
+            'type': 'MARKET',
+            'status': 'DRY_RUN',
+            'origQty': f"{quantity:.8f}",
+            'executedQty': '0',
+            'price': f"{price:.8f}",
+            'dryRun': True
+        }
+        # Así last_side ve la posición simulada y las señales repetidas no se repiten
+        self._log_trade(order, side)
+        return order
+
+    def last_side(self, symbol):
+        """
+        Lado (BUY/SELL) del último trade registrado de un símbolo, None si no hay
+
+        En dry-run cuenta solo los trades simulados y en real solo los reales,
+        así pasar de uno a otro no bloquea la primera orden.
+        """
+        dry_run = self.policy is not None and self.policy.dry_run
+        trades = self.journal.last(1, symbol=symbol, dry_run=dry_run)
+        return trades[-1]['side'] if trades else None
+
+    def execute_signal(self, signal, symbol, amount_usdt, previous_signal=None):
+        """
+        Ejecutar una señal del modelo sin intervención humana
+
+        Solo opera cuando la señal cambia: una señal igual a la anterior
+        (previous_signal) o al último trade del diario no envía otra orden,
+        así las BUY horarias repetidas no acumulan posición.
+
+        Args:
+            signal: BUY, SELL o HOLD
+            symbol: Par de trading (ej: BTCUSDT)
+            amount_usdt: USDT a gastar en una señal BUY (SELL vende todo el balance)
+            previous_signal: Señal anterior del modelo (None si no se conoce)
+
+        Returns:
+            Order object (o simulado en dry-run), None si no hay orden
+        """
+        if self.policy is None:
+            raise ValueError("execute_signal requiere una TradingPolicy (modo no interactivo)")
+
+        if signal not in ('BUY', 'SELL'):
+            return None
+        if signal == previous_signal or signal == self.last_side(symbol):
+            print(f"{Colors.YELLOW}⏭️  {signal} {symbol}: la señal no cambió, sin orden{Colors.RESET}")
+            return None
+
+        if signal == 'BUY':
+            return self.buy_market(symbol, amount_usdt=amount_usdt)
+        elif signal == 'SELL':
+            return self.sell_market(symbol, sell_all=True)
+        return None
+
     def buy_limit(self, symbol, price, quantity):
         """Crear orden de compra límite"""
         try:
@@ -321,28 +536,23 @@ class AutoTrader:
 
     def _log_trade(self, order, side):
         """Registrar trade en historial"""
+        # Toda orden cambia los balances
+        self.invalidate_account_snapshot()
+
         trade = {
             'timestamp': datetime.now().isoformat(),
-            'order_id': order['orderId'],
+            'order_id': order.get('orderId'),
             'symbol': order['symbol'],
             'side': side,
             'type': order['type'],
             'status': order['status'],
-            'quantity': order['executedQty'],
-            'order': order
+            'quantity': order['origQty'] if order.get('dryRun') else order['executedQty'],
+            'order': order,
+            'dry_run': bool(order.get('dryRun'))
         }
 
-        # Cargar historial
-        history = []
-        if os.path.exists(self.trades_log):
-            with open(self.trades_log, 'r') as f:
-                history = json.load(f)
-
-        history.append(trade)
-
-        # Guardar
-        with open(self.trades_log, 'w') as f:
-            json.dump(history, f, indent=2)
+        # Append O(1), sin reescribir el historial
+        self.journal.append(trade)
 
 
 def interactive_trading():
@@ -353,7 +563,7 @@ def interactive_trading():
     print(f"{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
     try:
-        trader = AutoTrader(testnet=True)
+        trader = AutoTrader(testnet=True, feed_symbols=FEED_SYMBOLS)
         print(f"{Colors.GREEN}✅ Conexión exitosa{Colors.RESET}\n")
     except Exception as e:
         print(f"{Colors.RED}❌ Error de conexión: {e}{Colors.RESET}")
@@ -379,7 +589,7 @@ def interactive_trading():
         choice = input(f"{Colors.CYAN}Tu opción: {Colors.RESET}").strip()
 
         if choice == '1':
-            # Ver balances
+            # Ver balances (un solo snapshot de cuenta para todos)
             print(f"\n{Colors.BLUE}💰 Balances:{Colors.RESET}")
             for asset in ['BTC', 'ETH', 'BNB', 'USDT']:
                 balance = trader.get_balance(asset)
@@ -429,18 +639,19 @@ def interactive_trading():
                 print(f"{Colors.YELLOW}⚠️  No hay órdenes abiertas{Colors.RESET}\n")
 
         elif choice == '6':
-            # Historial
-            if os.path.exists(trader.trades_log):
-                with open(trader.trades_log, 'r') as f:
-                    history = json.load(f)
+            # Historial (solo los últimos 10, sin cargar todo)
+            history = trader.journal.last(10)
+            if history:
                 print(f"\n{Colors.BLUE}📜 Historial de trades:{Colors.RESET}")
-                for t in history[-10:]:  # Últimos 10
-                    print(f"   {t['timestamp']} | {t['side']} | {t['symbol']} | Qty: {t['quantity']}")
+                for t in history:
+                    dry = ' (dry-run)' if t['dry_run'] else ''
+                    print(f"   {t['timestamp']} | {t['side']}{dry} | {t['symbol']} | Qty: {t['quantity']}")
                 print()
             else:
                 print(f"{Colors.YELLOW}⚠️  No hay historial{Colors.RESET}\n")
 
         elif choice == '0':
+            trader.close()
             print(f"\n{Colors.GREEN}👋 ¡Hasta luego!{Colors.RESET}\n")
             break
 
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Benchmark de run_garch
+Mide cada etapa de /run (descarga, retornos, búsqueda de orden, ajuste final,
+pronóstico, umbrales, insert en BigQuery...) y de optimize_garch_params para
+varios tamaños de datos, con velas grabadas en fixtures y BigQuery simulado
+sobre SQLite; guarda JSON y compara contra un baseline para detectar regresiones
+
+Uso:
+    python benchmark_garch.py                          # todos los casos, compara con el baseline
+    python benchmark_garch.py --cases 7d-1h,30d-1h --repeat 5
+    python benchmark_garch.py --save-baseline          # guardar el resultado como nuevo baseline
+    python benchmark_garch.py record --source binance  # grabar fixtures (365 días de 1h y 5m)
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_FILE = os.path.join(BENCHMARK_DIR, "latest.json")
+
+BENCHMARK_ASSET = "BTC-USD"
+
+# (días, intervalo): los tamaños de datos medidos
+CASES = [(7, '1h'), (30, '1h'), (365, '1h'), (7, '5m'), (30, '5m'), (365, '5m')]
+FIXTURE_DAYS = 365
+
+# Regresión: más lento que el baseline en más de TOLERANCE y en más de MIN_DELTA segundos
+TOLERANCE = 0.25
+MIN_DELTA = 0.005
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def case_name(days, interval):
+    return f"{days}d-{interval}"
+
+
+def synthetic_candles(days, interval, seed=42):
+    """
+    Velas GARCH(1,1) deterministas para cuando no hay fixture grabado
+
+    Mismo seed -> mismas velas, así los tiempos son comparables entre
+    ejecuciones. Open es el cierre anterior y High/Low se extienden más allá
+    del cuerpo según la volatilidad de la vela, como en velas reales.
+    """
+    from market_data import INTERVAL_MS
+    n = days * 24 * 3_600_000 // INTERVAL_MS[interval]
+    scale = np.sqrt(INTERVAL_MS[interval] / 3_600_000)
+    rng = np.random.default_rng(seed)
+    omega, alpha, beta = 0.02, 0.08, 0.9
+    shocks = rng.standard_normal(n)
+    returns = np.empty(n)
+    sigmas = np.empty(n)
+    sigma2 = omega / (1 - alpha - beta)
+    for t in range(n):
+        sigmas[t] = np.sqrt(sigma2)
+        returns[t] = sigmas[t] * shocks[t]
+        sigma2 = omega + alpha * returns[t] ** 2 + beta * sigma2
+    close = 40_000 * np.exp(np.cumsum(returns * scale / 100))
+    open_ = np.concatenate([[40_000.0], close[:-1]])
+    # Mechas: fracción de la desviación de la vela por encima y por debajo del cuerpo
+    wick = sigmas * scale / 100
+    high = np.maximum(open_, close) * np.exp(wick * np.abs(rng.standard_normal(n)) / 2)
+    low = np.minimum(open_, close) * np.exp(-wick * np.abs(rng.standard_normal(n)) / 2)
+    volume = rng.lognormal(mean=np.log(100 * scale ** 2), sigma=0.5, size=n) * sigmas
+    index = pd.date_range(end=datetime(2025, 1, 1, tzinfo=timezone.utc), periods=n,
+                          freq=f"{INTERVAL_MS[interval] // 60_000}min", name='timestamp')
+    return pd.DataFrame({'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=index)
+
+
+def load_fixture(asset, interval):
+    """
+    Velas grabadas (fixtures/<asset>_<interval>.*) o sintéticas si no existen
+
+    Returns:
+        (DataFrame, origen): origen es 'fixture' o 'synthetic'
+    """
+    from market_data import FixtureSource
+    try:
+        data = FixtureSource().fetch(asset, datetime(2000, 1, 1), datetime(2100, 1, 1), interval)
+        if not data.empty:
+            return data, 'fixture'
+    except FileNotFoundError:
+        pass
+    return synthetic_candles(FIXTURE_DAYS, interval), 'synthetic'
+
+
+def record_fixtures(source=None, asset=BENCHMARK_ASSET, intervals=('1h', '5m'), days=FIXTURE_DAYS):
+    """Descargar y guardar las velas usadas por el benchmark"""
+    from market_data import fetch_candles, FIXTURE_DIR
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for interval in intervals:
+        data = fetch_candles(asset, days=days, interval=interval, source=source)
+        path = os.path.join(FIXTURE_DIR, f"{asset}_{interval}.parquet")
+        data.reset_index().to_parquet(path, index=False)
+        print(f"✅ {len(data):,} velas de {interval} guardadas en {path}")
+
+
+class StubBigQueryClient:
+    """Cliente de BigQuery simulado: serializa las filas como la API y las guarda en SQLite"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def insert_rows_json(self, table, rows):
+        json.dumps(rows)
+        self.backend.insert_rows(rows)
+        return []
+
+
+class RunEnvironment:
+    """
+    Estado aislado de una ejecución de /run: SQLite en memoria en lugar de
+    BigQuery y cachés (ajustes, umbrales, espejo Parquet) en un directorio temporal
+    """
+
+    def __init__(self):
+        from analytics_sql import SQLiteBackend
+        from rollups import create_rollup_tables
+        from model_selection import create_selection_table
+        from thresholds import create_threshold_table
+
+        self.tmp_dir = tempfile.mkdtemp(prefix="garch_bench_")
+        self.backend = SQLiteBackend()
+        self.backend.create_table()
+        create_rollup_tables(self.backend)
+        create_selection_table(self.backend)
+        create_threshold_table(self.backend)
+
+    def patches(self, candles):
+        import main
+        import model_zoo
+        from model_zoo import FitCache
+        from prediction_store import append_to_mirror
+        return [
+            mock.patch.object(main, 'fetch_candles', lambda *args, **kwargs: candles.copy()),
+            mock.patch.object(main, 'BigQueryBackend', lambda *args, **kwargs: self.backend),
+            mock.patch.object(main.bigquery, 'Client', lambda *args, **kwargs: StubBigQueryClient(self.backend)),
+            mock.patch.object(model_zoo, 'FitCache', partial(FitCache, path=os.path.join(self.tmp_dir, "fits.json"))),
+            mock.patch.object(main, 'append_to_mirror', partial(append_to_mirror, mirror_dir=os.path.join(self.tmp_dir, "mirror"))),
+            mock.patch.object(main, 'AUTO_TRADE_ENABLED', False)
+        ]
+
+    def run(self, candles, interval):
+        """Una llamada a /run; devuelve los tiempos por etapa de la respuesta"""
+        import main
+        patches = self.patches(candles)
+        for p in patches:
+            p.start()
+        try:
+            with open(os.devnull, 'w') as devnull, mock.patch('sys.stdout', devnull):
+                response = main.app.test_client().get(f"/run?asset={BENCHMARK_ASSET}&interval={interval}")
+        finally:
+            for p in reversed(patches):
+                p.stop()
+        body = response.get_json()
+        if response.status_code != 200:
+            raise RuntimeError(body.get('message'))
+        return body['timings']
+
+    def close(self):
+        self.backend.conn.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+
+def _median_timings(runs):
+    stages = sorted({stage for run in runs for stage in run})
+    return {stage: float(np.median([run.get(stage, 0.0) for run in runs])) for stage in stages}
+
+
+def bench_run(candles, interval, repeat, warm):
+    """
+    Tiempos de /run (mediana de `repeat` ejecuciones)
+
+    cold: sin selección de modelo ni cachés (búsqueda de orden + zoo completo).
+    warm: camino horario normal; se prepara con una ejecución sobre las
+    velas hasta la penúltima y se mide la llegada de una vela nueva.
+    """
+    runs = []
+    for _ in range(repeat):
+        env = RunEnvironment()
+        try:
+            if warm:
+                env.run(candles.iloc[:-1], interval)
+            runs.append(env.run(candles, interval))
+        finally:
+            env.close()
+    return _median_timings(runs)
+
+
+def bench_order_search(candles, repeat):
+    """Tiempo de optimize_garch_params y de cada ajuste candidato"""
+    import main
+    returns = (100 * candles['Close'].pct_change()).dropna()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, mock.patch('sys.stdout', devnull):
+            best, candidates = main.optimize_garch_params(returns)
+        seconds.append(time.perf_counter() - start)
+    fits = [c['seconds'] for c in candidates if 'seconds' in c]
+    return {
+        'total': float(np.median(seconds)),
+        'per_fit': float(np.mean(fits)) if fits else 0.0,
+        'fits': len(candidates),
+        'best_order': list(best)
+    }
+
+
+def run_benchmarks(cases, repeat=3):
+    results = {}
+    sources = {}
+    for days, interval in cases:
+        if interval not in sources:
+            sources[interval] = load_fixture(BENCHMARK_ASSET, interval)
+        data, origin = sources[interval]
+        candles = data[data.index > data.index[-1] - timedelta(days=days)]
+        name = case_name(days, interval)
+        print(f"⏱️  {name}: {len(candles):,} velas ({origin})...")
+
+        results[name] = {
+            'bars': len(candles),
+            'data': origin,
+            'run_cold': bench_run(candles, interval, repeat, warm=False),
+            'run_warm': bench_run(candles, interval, repeat, warm=True),
+            'order_search': bench_order_search(candles, repeat)
+        }
+    return results
+
+
+def metadata(repeat):
+    import arch
+    return {
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'arch': arch.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'repeat': repeat
+    }
+
+
+def flatten(results):
+    """caso/medición/etapa -> segundos (solo tiempos)"""
+    flat = {}
+    for case, result in results.items():
+        for measure in ('run_cold', 'run_warm'):
+            for stage, seconds in result[measure].items():
+                flat[f"{case}/{measure}/{stage}"] = seconds
+        flat[f"{case}/order_search/total"] = result['order_search']['total']
+        flat[f"{case}/order_search/per_fit"] = result['order_search']['per_fit']
+    return flat
+
+
+def compare(current, baseline, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    """
+    Comparar tiempos contra el baseline
+
+    Los casos medidos con otros datos que el baseline (fixture vs sintéticos)
+    no se comparan y quedan como 'new'.
+
+    Returns:
+        list de dicts: key, baseline, current, change_pct, status ('regression', 'improved', 'ok', 'new')
+    """
+    base = flatten(baseline['results'])
+    base_data = {case: result.get('data') for case, result in baseline['results'].items()}
+    rows = []
+    for key, seconds in flatten(current['results']).items():
+        case = key.split('/')[0]
+        if key not in base or base_data.get(case) != current['results'][case]['data']:
+            rows.append({'key': key, 'baseline': None, 'current': seconds, 'change_pct': None, 'status': 'new'})
+            continue
+        before = base[key]
+        change = (seconds - before) / before * 100 if before > 0 else 0.0
+        if seconds > before * (1 + tolerance) and seconds - before > min_delta:
+            status = 'regression'
+        elif seconds < before * (1 - tolerance) and before - seconds > min_delta:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({'key': key, 'baseline': before, 'current': seconds, 'change_pct': change, 'status': status})
+    return rows
+
+
+def print_results(results):
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'BENCHMARK DE RUN_GARCH'.center(80)}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.RESET}\n")
+
+    for case, result in results.items():
+        search = result['order_search']
+        print(f"{Colors.BOLD}{case}{Colors.RESET} ({result['bars']:,} velas, {result['data']})")
+        print(f"   {'Etapa':<20}{'Cold (s)':>12}{'Warm (s)':>12}")
+        stages = list(dict.fromkeys(list(result['run_cold']) + list(result['run_warm'])))
+        for stage in sorted(stages, key=lambda s: s == 'total'):
+            cold = result['run_cold'].get(stage)
+            warm = result['run_warm'].get(stage)
+            print(f"   {stage:<20}{cold if cold is not None else float('nan'):>12.4f}"
+                  f"{warm if warm is not None else float('nan'):>12.4f}")
+        print(f"   optimize_garch_params: {search['total']:.3f}s, {search['fits']} ajustes "
+              f"({search['per_fit']:.3f}s c/u), orden {tuple(search['best_order'])}\n")
+
+
+def print_comparison(rows):
+    flagged = [r for r in rows if r['status'] in ('regression', 'improved')]
+    regressions = [r for r in rows if r['status'] == 'regression']
+    print(f"{Colors.BOLD}Comparación con el baseline{Colors.RESET} "
+          f"(tolerancia {TOLERANCE * 100:.0f}%, mínimo {MIN_DELTA * 1000:.0f} ms)")
+    for r in flagged:
+        color = Colors.RED if r['status'] == 'regression' else Colors.GREEN
+        print(f"   {color}{r['key']:<45}{r['baseline']:>10.4f}s -> {r['current']:>8.4f}s "
+              f"({r['change_pct']:+.1f}%){Colors.RESET}")
+    if not flagged:
+        print(f"   {Colors.GREEN}✅ Sin cambios significativos ({len(rows)} mediciones){Colors.RESET}")
+    elif not regressions:
+        print(f"   {Colors.GREEN}✅ Sin regresiones{Colors.RESET}")
+    else:
+        print(f"   {Colors.RED}❌ {len(regressions)} regresiones{Colors.RESET}")
+    print()
+    return regressions
+
+
+def _arg(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+
+    if args and args[0] == 'record':
+        record_fixtures(source=_arg(args, '--source', None), asset=_arg(args, '--asset', BENCHMARK_ASSET))
+        return 0
+
+    repeat = int(_arg(args, '--repeat', 3))
+    cases = CASES
+    if '--cases' in args:
+        wanted = _arg(args, '--cases', '').split(',')
+        cases = [c for c in CASES if case_name(*c) in wanted]
+        if not cases:
+            print(f"{Colors.RED}❌ Casos desconocidos: {', '.join(wanted)} "
+                  f"(usa {', '.join(case_name(*c) for c in CASES)}){Colors.RESET}")
+            return 2
+
+    current = {'meta': metadata(repeat), 'results': run_benchmarks(cases, repeat)}
+    print_results(current['results'])
+
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    output = _arg(args, '--output', RESULTS_FILE)
+    with open(output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"💾 Resultados guardados en {output}")
+
+    if '--save-baseline' in args:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"💾 Baseline actualizado: {BASELINE_FILE}\n")
+        return 0
+
+    if not os.path.exists(BASELINE_FILE):
+        # Sin baseline no hay con qué comparar: fallar para que CI no pase en verde sin medir nada
+        print(f"{Colors.RED}❌ No hay baseline en {BASELINE_FILE} "
+              f"(genéralo con --save-baseline en la máquina de referencia){Colors.RESET}\n")
+        return 1
+
+    with open(BASELINE_FILE, 'r') as f:
+        baseline = json.load(f)
+    print()
+    regressions = print_comparison(compare(current, baseline))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Modelo de Costos de Ejecución
+Comisión maker/taker, medio spread y slippage dependiente del tamaño estimado
+desde snapshots del order book de Binance guardados en caché; el costo de
+cada trade es una fracción del nocional que los simuladores aplican con arrays
+
+Uso:
+    python cost_model.py snapshot BTCUSDT ETHUSDT   # guardar un snapshot del order book
+    python cost_model.py show BTCUSDT               # spread y curva de slippage estimados
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+
+# Comisiones spot de Binance (nivel VIP 0, sin descuento BNB)
+DEFAULT_TAKER_FEE = 0.001
+DEFAULT_MAKER_FEE = 0.001
+# Medio spread típico de un par líquido (1 bp) cuando no hay snapshots
+DEFAULT_HALF_SPREAD = 0.0001
+
+# Snapshots por símbolo en <ORDER_BOOK_CACHE_DIR>/<SYMBOL>.jsonl (append-only)
+ORDER_BOOK_CACHE_DIR = "/tmp/garch_order_books"
+ORDER_BOOK_DEPTH = 100      # niveles por lado (peso 5 en la API)
+MAX_SNAPSHOTS = 500         # solo los más recientes se usan para estimar
+
+# Tamaños (USDT) en los que se evalúa la curva de slippage
+IMPACT_SIZES_USDT = np.geomspace(10, 1_000_000, 41)
+
+
+def walk_book(levels, sizes):
+    """
+    Slippage de órdenes a mercado de varios tamaños contra un lado del book
+
+    Args:
+        levels: [[precio, cantidad], ...] del mejor al peor precio
+        sizes: Nocionales en USDT
+
+    Returns:
+        np.ndarray: |VWAP - mejor precio| / mejor precio (NaN si el book no alcanza)
+    """
+    book = np.asarray(levels, dtype=float)
+    prices, qtys = book[:, 0], book[:, 1]
+    cum_notional = np.cumsum(prices * qtys)
+    cum_qty = np.cumsum(qtys)
+    sizes = np.asarray(sizes, dtype=float)
+
+    # Nivel donde se completa cada orden y cantidad comprada hasta ahí
+    k = np.searchsorted(cum_notional, sizes)
+    inside = k < len(prices)
+    k = np.minimum(k, len(prices) - 1)
+    prev_notional = np.where(k > 0, cum_notional[k - 1], 0.0)
+    prev_qty = np.where(k > 0, cum_qty[k - 1], 0.0)
+    qty = prev_qty + (sizes - prev_notional) / prices[k]
+
+    slippage = np.abs(sizes / qty - prices[0]) / prices[0]
+    return np.where(inside, slippage, np.nan)
+
+
+class CostModel:
+    """
+    Costo de un trade como fracción de su nocional
+
+        costo(n) = comisión + medio spread + slippage(n)
+
+    slippage(n) se interpola en la curva estimada; más allá del último
+    tamaño observado crece con la raíz cuadrada del tamaño.
+    """
+
+    def __init__(self, taker_fee=DEFAULT_TAKER_FEE, maker_fee=DEFAULT_MAKER_FEE,
+                 half_spread=DEFAULT_HALF_SPREAD, impact_sizes=None, impact=None, order_type='taker'):
+        """
+        Args:
+            taker_fee, maker_fee: Comisiones (fracción del nocional)
+            half_spread: Medio spread relativo al precio medio
+            impact_sizes, impact: Curva de slippage (USDT -> fracción) más allá del mejor precio
+            order_type: 'taker' (a mercado: paga spread y slippage) o 'maker' (límite: solo comisión)
+        """
+        if order_type not in ('taker', 'maker'):
+            raise ValueError(f"Tipo de orden desconocido: {order_type} (usa 'taker' o 'maker')")
+        self.taker_fee = float(taker_fee)
+        self.maker_fee = float(maker_fee)
+        self.half_spread = float(half_spread)
+        self.impact_sizes = np.asarray(impact_sizes if impact_sizes is not None else [], dtype=float)
+        self.impact = np.asarray(impact if impact is not None else [], dtype=float)
+        self.order_type = order_type
+
+    @classmethod
+    def zero(cls):
+        """Sin costos (simulación ideal, como antes)"""
+        return cls(taker_fee=0.0, maker_fee=0.0, half_spread=0.0)
+
+    @classmethod
+    def from_env(cls, symbol=None):
+        """
+        Modelo configurado por entorno
+
+        BACKTEST_TAKER_FEE, BACKTEST_MAKER_FEE, BACKTEST_HALF_SPREAD y
+        BACKTEST_ORDER_TYPE; con symbol, el spread y el slippage salen de
+        los snapshots en caché si existen.
+        """
+        fees = {
+            'taker_fee': float(os.getenv('BACKTEST_TAKER_FEE', DEFAULT_TAKER_FEE)),
+            'maker_fee': float(os.getenv('BACKTEST_MAKER_FEE', DEFAULT_MAKER_FEE)),
+            'order_type': os.getenv('BACKTEST_ORDER_TYPE', 'taker').lower()
+        }
+        snapshots = load_snapshots(symbol) if symbol else []
+        if snapshots:
+            return cls.from_order_books(snapshots, **fees)
+        return cls(half_spread=float(os.getenv('BACKTEST_HALF_SPREAD', DEFAULT_HALF_SPREAD)), **fees)
+
+    @classmethod
+    def from_order_books(cls, snapshots, sizes=IMPACT_SIZES_USDT, **kwargs):
+        """
+        Estimar spread y slippage desde snapshots ({'bids': [...], 'asks': [...]})
+
+        Medianas sobre snapshots y ambos lados, para que un book puntualmente
+        delgado no domine la estimación.
+        """
+        half_spreads = []
+        curves = []
+        for snap in snapshots:
+            bids, asks = snap.get('bids'), snap.get('asks')
+            if not bids or not asks:
+                continue
+            best_bid, best_ask = float(bids[0][0]), float(asks[0][0])
+            half_spreads.append((best_ask - best_bid) / (best_ask + best_bid))
+            curves.append(walk_book(bids, sizes))
+            curves.append(walk_book(asks, sizes))
+
+        if not curves:
+            return cls(**kwargs)
+
+        curves = np.vstack(curves)
+        covered = np.isfinite(curves).any(axis=0)
+        impact = np.nanmedian(curves[:, covered], axis=0) if covered.any() else np.array([])
+        return cls(half_spread=float(np.median(half_spreads)), impact_sizes=np.asarray(sizes)[covered],
+                   impact=impact, **kwargs)
+
+    @property
+    def fee(self):
+        return self.maker_fee if self.order_type == 'maker' else self.taker_fee
+
+    def slippage(self, notional):
+        """Slippage más allá del mejor precio para nocionales en USDT"""
+        notional = np.abs(np.asarray(notional, dtype=float))
+        if self.order_type == 'maker' or len(self.impact) == 0:
+            return np.zeros_like(notional)
+        inside = np.interp(notional, self.impact_sizes, self.impact, left=0.0)
+        beyond = self.impact[-1] * np.sqrt(np.maximum(notional, self.impact_sizes[-1]) / self.impact_sizes[-1])
+        return np.where(notional > self.impact_sizes[-1], beyond, inside)
+
+    def rate(self, notional=0.0):
+        """
+        Costo total como fracción del nocional (acepta escalares o arrays)
+
+        Returns:
+            float o np.ndarray con la forma de notional
+        """
+        spread = 0.0 if self.order_type == 'maker' else self.half_spread
+        rate = self.fee + spread + self.slippage(notional)
+        return float(rate) if np.ndim(rate) == 0 else rate
+
+    def to_dict(self):
+        return {
+            'taker_fee': self.taker_fee,
+            'maker_fee': self.maker_fee,
+            'half_spread': self.half_spread,
+            'impact_sizes': self.impact_sizes.tolist(),
+            'impact': self.impact.tolist(),
+            'order_type': self.order_type
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(**d)
+
+    def __repr__(self):
+        return (f"CostModel({self.order_type}, fee={self.fee * 1e4:.1f}bp, "
+                f"half_spread={self.half_spread * 1e4:.2f}bp, impact_points={len(self.impact)})")
+
+
+def _snapshot_path(symbol, cache_dir=ORDER_BOOK_CACHE_DIR):
+    return os.path.join(cache_dir, f"{symbol.upper()}.jsonl")
+
+
+def save_snapshot(symbol, book, cache_dir=ORDER_BOOK_CACHE_DIR):
+    """Añadir un snapshot (respuesta de get_order_book) a la caché del símbolo"""
+    os.makedirs(cache_dir, exist_ok=True)
+    snapshot = {
+        'timestamp': int(time.time() * 1000),
+        'bids': [[float(p), float(q)] for p, q in book['bids']],
+        'asks': [[float(p), float(q)] for p, q in book['asks']]
+    }
+    with open(_snapshot_path(symbol, cache_dir), 'a') as f:
+        f.write(json.dumps(snapshot) + "\n")
+    return snapshot
+
+
+def load_snapshots(symbol, cache_dir=ORDER_BOOK_CACHE_DIR, limit=MAX_SNAPSHOTS):
+    """Últimos `limit` snapshots del símbolo (lista vacía si no hay caché)"""
+    path = _snapshot_path(symbol, cache_dir)
+    if not os.path.exists(path):
+        return []
+    snapshots = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                snapshots.append(json.loads(line))
+            except ValueError:
+                continue
+    return snapshots[-limit:]
+
+
+def fetch_snapshot(client, symbol, depth=ORDER_BOOK_DEPTH, cache_dir=ORDER_BOOK_CACHE_DIR):
+    """Descargar el order book actual y guardarlo en la caché"""
+    book = client.get_order_book(symbol=symbol.upper(), limit=depth)
+    return save_snapshot(symbol, book, cache_dir)
+
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else 'show'
+    symbols = [s.upper() for s in args[1:]] or ['BTCUSDT']
+
+    if command == 'snapshot':
+        from rate_limit import GovernedClient
+        client = GovernedClient("", "")
+        for symbol in symbols:
+            snap = fetch_snapshot(client, symbol)
+            print(f"✅ {symbol}: snapshot con {len(snap['bids'])} bids / {len(snap['asks'])} asks "
+                  f"({len(load_snapshots(symbol))} en caché)")
+    elif command == 'show':
+        for symbol in symbols:
+            snapshots = load_snapshots(symbol)
+            if not snapshots:
+                print(f"⚠️  {symbol}: sin snapshots (usa 'python cost_model.py snapshot {symbol}')")
+                continue
+            model = CostModel.from_order_books(snapshots)
+            print(f"📊 {symbol}: {len(snapshots)} snapshots, medio spread {model.half_spread * 1e4:.2f} bp, "
+                  f"comisión {model.fee * 1e4:.1f} bp")
+            for size in [100, 1_000, 10_000, 100_000, 1_000_000]:
+                print(f"   {size:>10,} USDT: slippage {model.slippage(size) * 1e4:7.2f} bp, "
+                      f"costo total {model.rate(size) * 1e4:7.2f} bp")
+    else:
+        print(f"❌ Comando desconocido: {command} (usa 'snapshot' o 'show')")
+
+
+if __name__ == "__main__":
+    main()
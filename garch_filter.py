@@ -0,0 +1,156 @@
+"""
+Native GARCH Filter for GARCH Trading Bot
+NumPy/SciPy GARCH(p,q) variance recursion and forecasts from stored parameters,
+so forecasts can be served between scheduled refits without running arch's optimizer
+"""
+
+import json
+import numpy as np
+from scipy.signal import lfilter, lfiltic
+
+
+# arch's backcast: exponentially weighted mean of the first squared residuals
+BACKCAST_LAGS = 75
+BACKCAST_DECAY = 0.94
+
+
+def backcast(resids):
+    """Initial variance used for pre-sample lags (same rule as arch)"""
+    tau = min(BACKCAST_LAGS, len(resids))
+    weights = BACKCAST_DECAY ** np.arange(tau)
+    weights /= weights.sum()
+    return float(np.sum(resids[:tau] ** 2 * weights))
+
+
+class GarchFilter:
+    """
+    GARCH(p,q) conditional variance with a constant mean
+
+        sigma2[t] = omega + sum(alpha[i] * eps[t-i]**2) + sum(beta[j] * sigma2[t-j])
+
+    Parameter names follow arch: p ARCH terms (alpha), q GARCH terms (beta).
+    """
+
+    def __init__(self, omega, alphas, betas, mu=0.0):
+        self.omega = float(omega)
+        self.alphas = np.atleast_1d(np.asarray(alphas, dtype=float))
+        self.betas = np.atleast_1d(np.asarray(betas, dtype=float))
+        self.mu = float(mu)
+        self.p = len(self.alphas)
+        self.q = len(self.betas)
+
+    @classmethod
+    def from_fitted(cls, result):
+        """Build from an arch ARCHModelResult (constant mean, GARCH volatility)"""
+        params = result.params
+        alphas = [params[k] for k in params.index if k.startswith('alpha[')]
+        betas = [params[k] for k in params.index if k.startswith('beta[')]
+        return cls(params['omega'], alphas, betas, mu=params.get('mu', 0.0))
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        Build from stored model_params (dict or JSON string)
+
+        Uses the full 'alphas'/'betas' lists when present; older rows only
+        stored a single 'alpha'/'beta' and are treated as GARCH(1,1).
+        """
+        if isinstance(params, str):
+            params = json.loads(params)
+        alphas = params.get('alphas') or [params['alpha']]
+        betas = params.get('betas') or [params['beta']]
+        return cls(params['omega'], alphas, betas, mu=params.get('mu', 0.0))
+
+    def to_params(self):
+        return {
+            'mu': self.mu,
+            'omega': self.omega,
+            'alphas': self.alphas.tolist(),
+            'betas': self.betas.tolist()
+        }
+
+    @property
+    def persistence(self):
+        return float(self.alphas.sum() + self.betas.sum())
+
+    def filter(self, returns):
+        """
+        Conditional variances for a return series
+
+        Args:
+            returns: Returns in the same units as the fit (run_garch uses %)
+
+        Returns:
+            (sigma2, resids): arrays aligned with returns
+        """
+        resids = np.asarray(returns, dtype=float) - self.mu
+        n = len(resids)
+        init = backcast(resids)
+
+        # Pre-sample lags are filled with the backcast
+        eps2 = np.concatenate([np.full(self.p, init), resids ** 2])
+
+        # ARCH part: omega + sum(alpha[i] * eps[t-i]**2), one convolution
+        arch_term = self.omega + np.convolve(eps2, self.alphas, mode='full')[self.p - 1:self.p - 1 + n]
+
+        # GARCH part is a linear recursion: an IIR filter over the ARCH term
+        zi = lfiltic([1.0], np.r_[1.0, -self.betas], y=np.full(self.q, init))
+        sigma2, _ = lfilter([1.0], np.r_[1.0, -self.betas], arch_term, zi=zi)
+
+        return sigma2, resids
+
+    def forecast(self, returns, horizon=1):
+        """
+        Variance forecasts for the next `horizon` periods
+
+        Future squared residuals are replaced by their expectation (the
+        forecast variance), as in arch's analytic forecasts.
+
+        Returns:
+            np.ndarray: Variances for steps 1..horizon
+        """
+        sigma2, resids = self.filter(returns)
+        return self.forecast_from_state(resids[-self.p:] ** 2, sigma2[-self.q:], horizon)
+
+    def forecast_from_state(self, last_eps2, last_sigma2, horizon=1):
+        """
+        Forecast from the last p squared residuals and q variances (oldest first)
+
+        Cheap enough to call per request once the state is cached.
+        """
+        eps2 = list(np.asarray(last_eps2, dtype=float)[-self.p:])
+        sigma2 = list(np.asarray(last_sigma2, dtype=float)[-self.q:])
+        # Beyond one step, E[eps**2] is the forecast variance itself
+        forecasts = np.empty(horizon)
+        for h in range(horizon):
+            s = self.omega
+            for i in range(self.p):
+                s += self.alphas[i] * eps2[-1 - i]
+            for j in range(self.q):
+                s += self.betas[j] * sigma2[-1 - j]
+            forecasts[h] = s
+            eps2.append(s)
+            sigma2.append(s)
+        return forecasts
+
+    def forecast_volatility(self, returns, horizon=1):
+        """Volatility (sqrt of variance) forecasts for steps 1..horizon"""
+        return np.sqrt(self.forecast(returns, horizon))
+
+    def term_structure(self, returns, steps):
+        """
+        Volatility over several horizons from one filter pass
+
+        The h-step volatility is the square root of the summed variances of
+        steps 1..h (e.g. 4 hourly steps -> 4h volatility).
+
+        Args:
+            returns: Return series
+            steps: Horizons in periods (e.g. [1, 4, 24, 168])
+
+        Returns:
+            np.ndarray: One volatility per horizon
+        """
+        variances = self.forecast(returns, max(steps))
+        cumulative = np.cumsum(variances)
+        return np.sqrt(cumulative[np.asarray(steps) - 1])
@@ -21,7 +21,8 @@ NOT intended for: Cryptocurrency trading, mining, or financial advice
 
 import os
 import json
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 import yfinance as yf
 import pandas as pd
 import numpy as np
@@ -33,8 +34,19 @@ import functions_framework
 import requests
 import google.generativeai as genai
 from pdf_generator import create_pdf_report
-from vector_db import store_report, search_similar_reports, get_report_stats
+from vector_db import store_report, search_similar_reports, get_report_stats, compute_report_id, get_report
 from whatsapp_client import send_whatsapp_message, send_whatsapp_pdf, get_whatsapp_qr
+from prediction_store import flatten_model_params, append_to_mirror
+from analytics_sql import BigQueryBackend, report_summary
+from market_data import fetch_candles, asset_to_symbol, INTERVAL_MS, DATA_SOURCES
+from garch_filter import GarchFilter
+from model_zoo import (ModelSpec, select_model, fit_candidates, forecast_variances, term_structure, filter_state,
+                       forecast_from_state, persistence)
+from model_selection import get_selection, save_selection, reselection_reason
+from thresholds import update_thresholds
+from stage_timer import StageTimer
+from cost_model import CostModel
+from rollups import update_rollups, rollup_stats, rollup_report_summary, get_portfolio_state, portfolio_stats
 from io import BytesIO
 
 # Create Flask app
@@ -46,37 +58,154 @@ DATASET_ID = "trading_bot"
 TABLE_ID = "garch_predictions"
 BUCKET_NAME = "travel-recomender-garch-reports"
 
-def optimize_garch_params(returns, max_p=3, max_q=3):
+# Automated order execution (opt-in, testnet only)
+AUTO_TRADE_ENABLED = os.getenv('AUTO_TRADE_ENABLED', 'false').lower() == 'true'
+AUTO_TRADE_AMOUNT_USDT = float(os.getenv('AUTO_TRADE_AMOUNT_USDT', '50'))
+# For Cloud Functions, use /tmp (the rest of the filesystem is read-only)
+AUTO_TRADE_JOURNAL_PATH = "/tmp/trades_history.db"
+# Read order prices from a WebSocket feed kept open across warm invocations (REST when stale)
+AUTO_TRADE_PRICE_FEED = os.getenv('AUTO_TRADE_PRICE_FEED', 'false').lower() == 'true'
+
+# Reused across warm invocations so symbol filters/balances stay cached
+_auto_trader = None
+
+# Forecast term structure stored with every /run (hours: 1h, 4h, 24h, 7d)
+FORECAST_HORIZONS_HOURS = [1, 4, 24, 168]
+
+# Optimizer iteration cap per candidate in the GARCH order search (SLSQP default: 100).
+# Converging fits took at most 37 iterations in benchmark_garch.py (365d of 5m candles),
+# so a candidate that needs more is unlikely to win and is cut short
+ORDER_SEARCH_MAXITER = 50
+
+# Candle sources /run may be asked for ('fixture' is for offline runs only)
+ALLOWED_DATA_SOURCES = [s.strip().lower() for s in os.getenv('GARCH_ALLOWED_SOURCES', 'yahoo,binance').split(',') if s.strip()]
+
+# Days of candles fetched on every /run
+RUN_HISTORY_DAYS = 30
+
+# Model selection criterion for the volatility model zoo ('aic' or 'bic')
+MODEL_SELECTION_CRITERION = os.getenv('GARCH_SELECTION_CRITERION', 'aic').lower()
+
+# Latest fitted parameters per asset, served by /forecast between /run refits
+MODEL_CACHE_TTL = 600  # seconds
+_model_cache = {}
+
+
+def load_previous_signal(asset):
+    """
+    Previous model signal of an asset (its rollup portfolio state)
+
+    Must be read before this run's rollups are updated, which overwrite it.
+
+    Returns:
+        str: BUY/SELL/HOLD, or None if unknown
+    """
+    try:
+        state = get_portfolio_state(BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID), asset)
+        return state['last_signal'] if state else None
+    except Exception as e:
+        print(f"⚠️ Could not load previous signal: {e}")
+        return None
+
+
+def execute_trading_signal(asset, signal, previous_signal=None):
     """
-    Grid search to find optimal GARCH(p,q) parameters using AIC criterion
+    Send the GARCH signal straight to the exchange without human confirmation
+
+    Orders go through AutoTrader's TradingPolicy (max notional, allowed
+    symbols, dry-run) configured from environment variables. An order is
+    only placed when the signal differs from the previous one and from the
+    last journaled trade (simulated trades included in dry-run).
+
+    Args:
+        asset: Yahoo Finance asset (e.g., 'BTC-USD')
+        signal: BUY, SELL or HOLD
+        previous_signal: Previous model signal (see load_previous_signal)
+
+    Returns:
+        dict: Order summary, or None if no order was placed
+    """
+    global _auto_trader
+    if not AUTO_TRADE_ENABLED or signal == 'HOLD':
+        return None
+
+    from auto_trader import AutoTrader, TradingPolicy
+    if _auto_trader is None:
+        _auto_trader = AutoTrader(testnet=True, policy=TradingPolicy.from_env(),
+                                  journal_path=AUTO_TRADE_JOURNAL_PATH,
+                                  feed_symbols=[asset_to_symbol(asset)] if AUTO_TRADE_PRICE_FEED else None)
+
+    order = _auto_trader.execute_signal(signal, asset_to_symbol(asset), AUTO_TRADE_AMOUNT_USDT,
+                                        previous_signal=previous_signal)
+    if not order:
+        return None
+    return {
+        "symbol": order.get('symbol'),
+        "side": order.get('side'),
+        "status": order.get('status'),
+        "order_id": order.get('orderId'),
+        "quantity": order.get('executedQty') if not order.get('dryRun') else order.get('origQty'),
+        "dry_run": bool(order.get('dryRun'))
+    }
+
+def optimize_garch_params(returns, max_p=3, max_q=3, maxiter=ORDER_SEARCH_MAXITER):
+    """
+    Find the GARCH(p,q) order with the lowest AIC, walking outward from GARCH(1,1)
+    
+    From the current best order only (p+1, q) and (p, q+1) are tried; the
+    search moves to the best neighbour that lowers AIC and stops as soon as
+    none does, so higher orders that already lose are never fitted.
     
     Args:
         returns: Time series of returns
         max_p: Maximum p value to test
         max_q: Maximum q value to test
+        maxiter: Optimizer iteration cap per candidate
     
     Returns:
-        tuple: (best_p, best_q)
+        tuple: ((best_p, best_q), candidates) where candidates lists every fit
+               with its AIC, convergence, iterations and time
     """
-    best_aic = np.inf
-    best_params = (1, 1)
+    fitted = {}
     
-    # Try different combinations of p and q
-    for p in range(1, max_p + 1):
-        for q in range(1, max_q + 1):
-            try:
-                model = arch_model(returns, vol='Garch', p=p, q=q)
-                fitted = model.fit(disp='off', show_warning=False)
-                
-                if fitted.aic < best_aic:
-                    best_aic = fitted.aic
-                    best_params = (p, q)
-                    print(f"  GARCH({p},{q}): AIC={fitted.aic:.2f} ✓")
-            except:
-                # Some combinations might not converge
-                continue
+    def evaluate(p, q):
+        if (p, q) in fitted:
+            return fitted[(p, q)]
+        started = time.time()
+        candidate = {"p": p, "q": q, "aic": None, "converged": False, "iterations": 0}
+        try:
+            model = arch_model(returns, vol='Garch', p=p, q=q)
+            result = model.fit(disp='off', show_warning=False, options={'maxiter': maxiter})
+            candidate.update(
+                aic=float(result.aic),
+                converged=result.convergence_flag == 0,
+                iterations=int(getattr(result.optimization_result, 'nit', 0))
+            )
+        except Exception as e:
+            candidate["error"] = str(e)
+        candidate["seconds"] = round(time.time() - started, 4)
+        fitted[(p, q)] = candidate
+        
+        if "error" in candidate:
+            print(f"  GARCH({p},{q}): failed ({candidate['error']})")
+        else:
+            flag = "" if candidate["converged"] else " (not converged)"
+            print(f"  GARCH({p},{q}): AIC={candidate['aic']:.2f}, {candidate['iterations']} it, {candidate['seconds']:.2f}s{flag}")
+        return candidate
+    
+    def usable(candidate):
+        return candidate["converged"] and candidate["aic"] is not None
+    
+    best = evaluate(1, 1)
+    while True:
+        neighbours = [(best["p"] + 1, best["q"]), (best["p"], best["q"] + 1)]
+        tried = [evaluate(p, q) for p, q in neighbours if p <= max_p and q <= max_q]
+        improved = [c for c in tried if usable(c) and (not usable(best) or c["aic"] < best["aic"])]
+        if not improved:
+            break
+        best = min(improved, key=lambda c: c["aic"])
     
-    return best_params
+    return (best["p"], best["q"]), list(fitted.values())
 
 def send_telegram_alert(message):
     """Send alert via Telegram Bot API"""
@@ -170,79 +299,68 @@ def generate_ai_report():
         genai.configure(api_key=api_key)
         model = genai.GenerativeModel('gemini-pro-latest')
         
-        # Fetch last 24 hours of data
-        client = bigquery.Client(project=PROJECT_ID)
-        query = f"""
-        SELECT 
-            timestamp,
-            current_price,
-            predicted_volatility,
-            signal,
-            model_params
-        FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
-        WHERE timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 24 HOUR)
-        ORDER BY timestamp DESC
-        """
-        
-        results = client.query(query).result()
-        predictions = []
+        # Read the last 24 hours from the hourly rollups (raw aggregate as fallback)
+        backend = BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID)
+        summary = rollup_report_summary(backend, hours=24) or report_summary(backend, hours=24)
         
-        for row in results:
-            # model_params is already a dict from BigQuery (JSON type)
-            if row.model_params:
-                params = row.model_params if isinstance(row.model_params, dict) else json.loads(row.model_params)
-            else:
-                params = {}
-            predictions.append({
-                'timestamp': row.timestamp.isoformat(),
-                'price': float(row.current_price),
-                'volatility': float(row.predicted_volatility),
-                'signal': row.signal,
-                'alpha': params.get('alpha', 0),
-                'beta': params.get('beta', 0)
-            })
-        
-        if not predictions:
+        if not summary:
             return "📊 No hay datos suficientes para generar reporte (últimas 24h)"
         
-        # Calculate statistics
-        prices = [p['price'] for p in predictions]
-        vols = [p['volatility'] for p in predictions]
-        signals = [p['signal'] for p in predictions]
+        # Statistics
+        current_price = summary['last_price']
+        price_change = summary['price_change_pct']
+        avg_vol = summary['vol_mean']
+        vol_std = summary['vol_std']
+        persistence = summary['persistence']
+        buy_pct = summary['buy_pct']
         
-        price_change = ((prices[0] - prices[-1]) / prices[-1]) * 100
-        avg_vol = np.mean(vols)
-        vol_std = np.std(vols)
-        persistence = np.mean([p['alpha'] + p['beta'] for p in predictions if p['alpha'] > 0])
+        # Prepare metadata for PDF and vector DB
+        metadata = {
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'price': current_price,
+            'volatility': avg_vol,
+            'signal': summary['last_signal'],  # Latest signal
+            'avg_volatility': avg_vol,
+            'persistence': persistence,
+            'num_predictions': summary['count'],
+            'price_change_24h': price_change,
+            'last_timestamp': summary['last_timestamp']
+        }
         
-        buy_pct = (signals.count('BUY') / len(signals)) * 100
+        # No new prediction since the last report -> reuse it instead of asking Gemini again
+        stored = get_report(compute_report_id(metadata))
+        if stored:
+            report, stored_metadata = stored
+            metadata['timestamp'] = stored_metadata.get('timestamp') or metadata['timestamp']
+            print("ℹ️  Summary unchanged, reusing stored report")
+            return report, metadata
         
         # Create advanced prompt for Gemini
         prompt = f"""You are a senior quantitative analyst at a hedge fund, specializing in cryptocurrency volatility modeling and GARCH econometrics. Analyze the following BTC market data with depth and nuance.
 
 **Market Data (Last 24h):**
-- Current Price: ${prices[0]:,.2f} USD
+- Current Price: ${current_price:,.2f} USD
 - Price Movement: {price_change:+.2f}%
-- Sample Size: {len(predictions)} observations
-- Price Range: ${min(prices):,.2f} - ${max(prices):,.2f}
+- Sample Size: {summary['count']} observations
+- Price Range: ${summary['price_min']:,.2f} - ${summary['price_max']:,.2f}
 
 **GARCH Model Diagnostics:**
 - Mean Predicted Volatility: {avg_vol:.4f}%
 - Volatility Std Dev: {vol_std:.4f}%
-- Persistence Coefficient (α+β): {persistence:.4f}
-- Volatility Range: {min(vols):.4f}% - {max(vols):.4f}%
+- Persistence Coefficient: {persistence:.4f}
+- Volatility Range: {summary['vol_min']:.4f}% - {summary['vol_max']:.4f}%
 - Coefficient of Variation: {(vol_std/avg_vol)*100 if avg_vol > 0 else 0:.2f}%
 
 **Trading Signal Distribution:**
 - BUY signals: {buy_pct:.1f}%
-- SELL signals: {signals.count('SELL')/len(signals)*100:.1f}%
-- HOLD signals: {signals.count('HOLD')/len(signals)*100:.1f}%
+- SELL signals: {summary['sell_pct']:.1f}%
+- HOLD signals: {summary['hold_pct']:.1f}%
 
 **Your Analysis Must Include:**
 
 1. **Market Regime Identification**: Is this a high/low volatility regime? Is volatility clustering present?
 
-2. **Persistence Interpretation**: With α+β = {persistence:.4f}, what does this tell us about volatility shocks? Will volatility mean-revert quickly or slowly?
+2. **Persistence Interpretation**: With persistence = {persistence:.4f}, what does this tell us about volatility shocks? Will volatility mean-revert quickly or slowly?
 
 3. **Risk Assessment**: Given the current volatility distribution, quantify the risk exposure. Are we seeing heteroskedasticity? What's the tail risk?
 
@@ -275,18 +393,6 @@ Generate a professional analysis that a PM would actually read and act on."""
 _Análisis generado por Gemini AI • Datos: últimas 24h_
 """
         
-        # Prepare metadata for PDF and vector DB
-        metadata = {
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'price': prices[0],
-            'volatility': avg_vol,
-            'signal': signals[0],  # Latest signal
-            'avg_volatility': avg_vol,
-            'persistence': persistence,
-            'num_predictions': len(predictions),
-            'price_change_24h': price_change
-        }
-        
         return report, metadata
         
     except Exception as e:
@@ -346,7 +452,7 @@ def get_top_volatile_cryptos(n=5):
     # Return top N symbols
     return [v['symbol'] for v in volatilities[:n]]
 
-def calculate_portfolio_performance(predictions):
+def calculate_portfolio_performance(predictions, costs=None):
     """
     Simulate a $1000 portfolio following GARCH signals
     
@@ -354,6 +460,7 @@ def calculate_portfolio_performance(predictions):
     
     Args:
         predictions: List of prediction dicts with price, signal, timestamp
+        costs: CostModel charged on every trade (default: CostModel.from_env for the asset)
     
     Returns:
         dict: Portfolio statistics
@@ -377,9 +484,14 @@ def calculate_portfolio_performance(predictions):
     last_signal = None
     trades = 0
     
+    # Fees, spread and slippage per trade (fraction of the traded notional)
+    if costs is None:
+        asset = predictions[0].get('asset')
+        costs = CostModel.from_env(asset_to_symbol(asset) if asset else None)
+    
     # Start with first prediction - assume BUY to compare fairly
     first_price = predictions[0]['price']
-    btc_holdings = initial_capital / first_price
+    btc_holdings = initial_capital * (1 - costs.rate(initial_capital)) / first_price
     cash = 0
     
     # Simulate trades based on signals
@@ -391,12 +503,13 @@ def calculate_portfolio_performance(predictions):
         if signal != last_signal:
             if signal == 'SELL' and btc_holdings > 0:
                 # Sell BTC to USD
-                cash = btc_holdings * current_price
+                notional = btc_holdings * current_price
+                cash = notional * (1 - costs.rate(notional))
                 btc_holdings = 0
                 trades += 1
             elif signal == 'BUY' and cash > 0:
                 # Buy BTC with USD
-                btc_holdings = cash / current_price
+                btc_holdings = cash * (1 - costs.rate(cash)) / current_price
                 cash = 0
                 trades += 1
         
@@ -406,8 +519,8 @@ def calculate_portfolio_performance(predictions):
     last_price = predictions[-1]['price']
     current_value = cash + (btc_holdings * last_price)
     
-    # Calculate buy & hold for comparison
-    hodl_btc = initial_capital / first_price
+    # Calculate buy & hold for comparison (same entry charge as the strategy)
+    hodl_btc = initial_capital * (1 - costs.rate(initial_capital)) / first_price
     hodl_value = hodl_btc * last_price
     
     return {
@@ -471,21 +584,31 @@ def get_predictions():
                 'params': row.model_params if row.model_params else {}
             })
         
-        # Calculate portfolio performance
-        portfolio_stats = calculate_portfolio_performance(predictions)
+        # Portfolio performance from the rollup state (O(1)), or recompute
+        portfolio = None
+        if predictions:
+            try:
+                backend = BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID, client=client)
+                asset = predictions[0]['asset']
+                state = get_portfolio_state(backend, asset)
+                if state:
+                    portfolio = portfolio_stats(state, CostModel.from_env(asset_to_symbol(asset)))
+            except Exception as e:
+                print(f"⚠️ Could not read portfolio rollup: {e}")
+        portfolio_stats_result = portfolio or calculate_portfolio_performance(predictions)
         
         # Check for alerts
         if predictions:
             latest = predictions[0]
             signal = latest['signal']
             current_price = latest['price']
-            check_and_alert(portfolio_stats, signal, current_price)
+            check_and_alert(portfolio_stats_result, signal, current_price)
         
         return jsonify({
             'status': 'success',
             'count': len(predictions),
             'predictions': predictions,
-            'portfolio': portfolio_stats
+            'portfolio': portfolio_stats_result
         })
     except Exception as e:
         return jsonify({
@@ -499,22 +622,38 @@ def run_garch():
 
     Query params or JSON body:
         asset: Cryptocurrency symbol (e.g., 'BTC-USD'). Default: BTC-USD
+        source: Candle source, one of GARCH_ALLOWED_SOURCES (default 'yahoo,binance').
+                Default: GARCH_DATA_SOURCE or yahoo
+        interval: Candle interval (e.g., '1h', '5m'). Default: 1h
     """
 
     # Get asset from query params or JSON body
     if request.method == 'POST' and request.is_json:
-        ASSET = request.json.get('asset', 'BTC-USD')
+        params = request.json
     else:
-        ASSET = request.args.get('asset', 'BTC-USD')
+        params = request.args
+    ASSET = params.get('asset', 'BTC-USD')
+    source = params.get('source')
+    interval = params.get('interval', '1h')
+    if interval not in INTERVAL_MS:
+        return jsonify({"status": "error", "message": f"Unknown interval: {interval} (use {', '.join(INTERVAL_MS)})"}), 400
+    if source is not None and source.lower() not in ALLOWED_DATA_SOURCES:
+        return jsonify({"status": "error", "message": f"Source not allowed: {source} (use {', '.join(ALLOWED_DATA_SOURCES)})"}), 400
+    # Each source has its own intervals and history depth (e.g. Yahoo: no 4h, 7 days of 1m)
+    source_class = DATA_SOURCES.get((source or os.getenv('GARCH_DATA_SOURCE', 'yahoo')).lower())
+    if source_class is not None:
+        try:
+            source_class.check(interval, RUN_HISTORY_DAYS)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+    # Wall-clock time per stage, returned in the response (see benchmark_garch.py)
+    timer = StageTimer()
     
     try:
-        # 1. Fetch recent price data (last 30 days for sufficient history)
-        print(f"Fetching data for {ASSET}...")
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=30)
-        
-        ticker = yf.Ticker(ASSET)
-        data = ticker.history(start=start_date, end=end_date, interval="1h")
+        # 1. Fetch recent price data (last RUN_HISTORY_DAYS for sufficient history)
+        print(f"Fetching data for {ASSET} ({source or os.getenv('GARCH_DATA_SOURCE', 'yahoo')}, {interval})...")
+        data = fetch_candles(ASSET, days=RUN_HISTORY_DAYS, interval=interval, source=source)
+        timer.lap('download')
         
         if len(data) < 100:
             raise ValueError(f"Insufficient data: only {len(data)} points")
@@ -524,31 +663,70 @@ def run_garch():
         data = data.dropna()
         
         current_price = float(data['Close'].iloc[-1])
+        timer.lap('returns')
         
-        # 3. Fit GARCH model with automatic p,q selection
-        print("Optimizing GARCH(p,q) parameters...")
-        best_p, best_q = optimize_garch_params(data['returns'])
-        print(f"Optimal parameters: GARCH({best_p},{best_q})")
-        
-        model = arch_model(data['returns'], vol='Garch', p=best_p, q=best_q)
-        model_fitted = model.fit(disp='off')
-        
-        # 4. Forecast volatility for next period
-        forecast = model_fitted.forecast(horizon=1)
-        predicted_volatility = float(np.sqrt(forecast.variance.values[-1, 0]))
+        # 3. Refit the cached model selection; re-run the full search only when it's stale
+        selection_backend = None
+        selection = None
+        try:
+            selection_backend = BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID)
+            selection = get_selection(selection_backend, ASSET)
+        except Exception as e:
+            print(f"⚠️ Could not load model selection: {e}")
+        timer.lap('selection_lookup')
+        
+        order_candidates = []
+        reselect_reason = "no cached selection"
+        if selection is not None:
+            spec = selection['spec']
+            print(f"Refitting cached model: {spec.key}")
+            fit = fit_candidates(data['returns'].values, [spec], asset=ASSET)[0]
+            timer.lap('final_fit')
+            reselect_reason = reselection_reason(selection, fit, data['returns'].values)
+            timer.lap('diagnostics')
+        
+        if reselect_reason:
+            print(f"Re-selecting model ({reselect_reason})...")
+            print("Optimizing GARCH(p,q) parameters...")
+            (best_p, best_q), order_candidates = optimize_garch_params(data['returns'])
+            print(f"Optimal parameters: GARCH({best_p},{best_q})")
+            timer.lap('order_search')
+            
+            # Fit GARCH/GJR/EGARCH x normal/t/skew-t at that order in parallel, keep the best
+            print(f"Fitting volatility model zoo ({MODEL_SELECTION_CRITERION.upper()})...")
+            spec, fit, _ = select_model(data['returns'].values, p=best_p, q=best_q, asset=ASSET,
+                                        criterion=MODEL_SELECTION_CRITERION)
+            timer.lap('final_fit')
+            if selection_backend is not None:
+                try:
+                    save_selection(selection_backend, ASSET, spec, fit, len(data), MODEL_SELECTION_CRITERION)
+                except Exception as e:
+                    print(f"⚠️ Could not save model selection: {e}")
+            timer.lap('selection_save')
+        
+        best_p, best_q = spec.p, spec.q
+        fitted_params = fit['params']
+        print(f"Selected model: {spec.key}")
+        
+        # 4. Forecast volatility term structure from the single fit
+        horizon_steps = [max(1, -(-h * 3_600_000 // INTERVAL_MS[interval])) for h in FORECAST_HORIZONS_HOURS]
+        volatility_forecasts = [float(v) for v in term_structure(spec, fitted_params, data['returns'].values, horizon_steps)]
+        predicted_volatility = volatility_forecasts[0] if horizon_steps[0] == 1 else \
+            float(np.sqrt(forecast_variances(spec, fitted_params, data['returns'].values, 1)[0]))
+        # Filter state at the last bar, so /forecast runs the recursion without the history
+        state = filter_state(spec, fitted_params, data['returns'].values)
+        timer.lap('forecast')
 
         # 5. Generate trading signal based on DYNAMIC volatility thresholds
-        # Calculate historical volatility distribution from recent data
-        historical_volatilities = data['returns'].rolling(window=24).std().dropna()
-
-        # Use percentiles for dynamic thresholds
-        vol_75_percentile = np.percentile(historical_volatilities, 75)
-        vol_25_percentile = np.percentile(historical_volatilities, 25)
-
-        # Add buffer to avoid too many trades (10% buffer)
-        buffer = (vol_75_percentile - vol_25_percentile) * 0.1
-        threshold_high = vol_75_percentile + buffer
-        threshold_low = vol_25_percentile - buffer
+        # 24-bar rolling volatility and its 75th/25th percentiles (+10% buffer),
+        # updated incrementally with only the bars added since the last run
+        thresholds, new_bars = update_thresholds(ASSET, data['returns'], interval=interval, backend=selection_backend)
+        vol_75_percentile = thresholds['vol_75_percentile']
+        vol_25_percentile = thresholds['vol_25_percentile']
+        threshold_high = thresholds['threshold_high']
+        threshold_low = thresholds['threshold_low']
+        print(f"Threshold engine: {new_bars} new bars")
+        timer.lap('thresholds')
 
         print(f"Dynamic thresholds: LOW={threshold_low:.4f}%, HIGH={threshold_high:.4f}%")
         print(f"Predicted volatility: {predicted_volatility:.4f}%")
@@ -562,28 +740,48 @@ def run_garch():
             signal = "HOLD"  # Medium volatility = wait
         
         # 6. Prepare data for BigQuery
+        model_params = {
+            "p": best_p,
+            "q": best_q,
+            "omega": fitted_params['omega'],
+            "alpha": fitted_params[f'alpha[{best_q}]'] if f'alpha[{best_q}]' in fitted_params else fitted_params['alpha[1]'],
+            "beta": fitted_params[f'beta[{best_p}]'] if f'beta[{best_p}]' in fitted_params else fitted_params['beta[1]'],
+            # Family-aware persistence (alpha/beta alone do not measure it for GJR/EGARCH)
+            "persistence": persistence(spec, fitted_params),
+            "aic": fit['aic'],
+            "bic": fit['bic'],
+            "threshold_high": float(threshold_high),
+            "threshold_low": float(threshold_low),
+            "vol_75_percentile": float(vol_75_percentile),
+            "vol_25_percentile": float(vol_25_percentile),
+            # Winning spec and its full parameter set, so /forecast can rebuild it without refitting
+            "model": spec.to_dict(),
+            "params": fitted_params,
+            "filter_state": state,
+            "interval": interval,
+            # Order search diagnostics: one entry per fitted candidate (empty when the cached spec was kept)
+            "order_search": order_candidates,
+            "reselected": reselect_reason is not None,
+            "reselect_reason": reselect_reason
+        }
         row = {
             "timestamp": datetime.utcnow().isoformat(),
             "asset": ASSET,
             "current_price": current_price,
             "predicted_volatility": predicted_volatility,
             "signal": signal,
-            "model_params": json.dumps({
-                "p": best_p,
-                "q": best_q,
-                "omega": float(model_fitted.params['omega']),
-                "alpha": float(model_fitted.params[f'alpha[{best_q}]']) if f'alpha[{best_q}]' in model_fitted.params else float(model_fitted.params['alpha[1]']),
-                "beta": float(model_fitted.params[f'beta[{best_p}]']) if f'beta[{best_p}]' in model_fitted.params else float(model_fitted.params['beta[1]']),
-                "aic": float(model_fitted.aic),
-                "bic": float(model_fitted.bic),
-                "threshold_high": float(threshold_high),
-                "threshold_low": float(threshold_low),
-                "vol_75_percentile": float(vol_75_percentile),
-                "vol_25_percentile": float(vol_25_percentile)
-            })
+            # Cumulative volatility for each of FORECAST_HORIZONS_HOURS
+            "volatility_forecasts": volatility_forecasts,
+            "model_params": json.dumps(model_params),
+            # Typed, flattened columns so analytics skip per-row JSON parsing
+            **flatten_model_params(model_params)
         }
+        timer.lap('prepare_row')
         
-        # 7. Insert into BigQuery
+        # 7. Previous signal, read before the rollups below overwrite it
+        previous_signal = load_previous_signal(ASSET) if AUTO_TRADE_ENABLED else None
+        
+        # 8. Insert into BigQuery (before any order: a failed insert leaves no order behind)
         print(f"Inserting to BigQuery: {signal} signal, volatility={predicted_volatility:.2f}")
         client = bigquery.Client(project=PROJECT_ID)
         table_ref = f"{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}"
@@ -591,16 +789,48 @@ def run_garch():
         
         if errors:
             raise Exception(f"BigQuery insert errors: {errors}")
+        timer.lap('bigquery_insert')
+        
+        # Update hourly/daily rollups and portfolio state (best effort)
+        try:
+            update_rollups(BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID, client=client), row)
+        except Exception as e:
+            print(f"⚠️ Could not update rollups: {e}")
+        timer.lap('rollups')
         
-        # 8. Return response
+        # Keep a local columnar mirror (best effort)
+        try:
+            append_to_mirror(row)
+        except Exception as e:
+            print(f"⚠️ Could not update Parquet mirror: {e}")
+        timer.lap('mirror')
+        
+        _model_cache[ASSET] = (time.time(), row["timestamp"], model_params, current_price)
+        
+        # 9. Execute the signal once persisted (opt-in via AUTO_TRADE_ENABLED)
+        order = None
+        try:
+            order = execute_trading_signal(ASSET, signal, previous_signal)
+        except Exception as e:
+            print(f"⚠️ Could not execute {signal} order: {e}")
+        timer.lap('order')
+        print(f"Stage timings: {timer.summary()}")
+        
+        # 10. Return response
         response = {
             "status": "success",
             "timestamp": row["timestamp"],
             "asset": ASSET,
             "price": current_price,
             "volatility": predicted_volatility,
-            "signal": signal
+            "volatility_term_structure": {
+                f"{h}h": v for h, v in zip(FORECAST_HORIZONS_HOURS, volatility_forecasts)
+            },
+            "signal": signal,
+            "timings": timer.as_dict()
         }
+        if order:
+            response["order"] = order
         
         print(f"Success: {response}")
         return jsonify(response)
@@ -610,6 +840,95 @@ def run_garch():
         print(error_msg)
         return jsonify({"status": "error", "message": error_msg}), 500
 
+def load_latest_model(asset):
+    """
+    Latest stored GARCH parameters for an asset (cached for MODEL_CACHE_TTL)
+
+    Returns:
+        tuple: (fitted_at, model_params dict, price at the fit), or (None, None, None)
+               if the asset was never fitted
+    """
+    cached = _model_cache.get(asset)
+    if cached and time.time() - cached[0] < MODEL_CACHE_TTL:
+        return cached[1], cached[2], cached[3]
+
+    client = bigquery.Client(project=PROJECT_ID)
+    query = f"""
+    SELECT timestamp, current_price, TO_JSON_STRING(model_params) AS model_params
+    FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+    WHERE asset = @asset AND model_params IS NOT NULL
+    ORDER BY timestamp DESC
+    LIMIT 1
+    """
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=[bigquery.ScalarQueryParameter("asset", "STRING", asset)]
+    )
+    rows = list(client.query(query, job_config=job_config).result())
+    if not rows:
+        return None, None, None
+
+    params = json.loads(rows[0].model_params)
+    if isinstance(params, str):
+        params = json.loads(params)
+    fitted_at = rows[0].timestamp.isoformat()
+    price = float(rows[0].current_price)
+    _model_cache[asset] = (time.time(), fitted_at, params, price)
+    return fitted_at, params, price
+
+
+@app.route('/forecast', methods=['GET'])
+def forecast_volatility():
+    """Volatility forecast from the last fitted parameters (no refit)
+
+    Forecasts start at the last bar of the fit and run from the filter state
+    stored with it; only rows stored before that state existed download candles.
+
+    Query params:
+        asset: Cryptocurrency symbol (e.g., 'BTC-USD'). Default: BTC-USD
+        horizon: Number of steps (bars of the fit's interval) to forecast. Default: 1
+    """
+    asset = request.args.get('asset', 'BTC-USD')
+
+    try:
+        try:
+            horizon = max(1, min(int(request.args.get('horizon', 1)), 24 * 30))
+        except ValueError:
+            return jsonify({"status": "error", "message": "horizon must be an integer"}), 400
+
+        fitted_at, params, price = load_latest_model(asset)
+        if params is None:
+            return jsonify({"status": "error", "message": f"No fitted model for {asset}, call /run first"}), 404
+        interval = params.get('interval', '1h')
+
+        if 'filter_state' in params:
+            spec = ModelSpec.from_dict(params['model'])
+            volatilities = np.sqrt(forecast_from_state(spec, params['params'], params['filter_state'], horizon))
+        else:
+            # Older rows: refilter the recent history of the fit's interval
+            data = fetch_candles(asset, days=30, interval=interval)
+            returns = (100 * data['Close'].pct_change()).dropna().values
+            price = float(data['Close'].iloc[-1])
+            if 'model' in params and 'params' in params:
+                spec = ModelSpec.from_dict(params['model'])
+                volatilities = np.sqrt(forecast_variances(spec, params['params'], returns, horizon))
+            else:
+                # Rows stored before the model zoo: plain GARCH parameters
+                volatilities = GarchFilter.from_params(params).forecast_volatility(returns, horizon)
+
+        return jsonify({
+            "status": "success",
+            "asset": asset,
+            "price": price,
+            "interval": interval,
+            "volatility": float(volatilities[0]),
+            "forecast": [float(v) for v in volatilities],
+            "model_fitted_at": fitted_at
+        })
+    except Exception as e:
+        error_msg = f"Error: {str(e)}"
+        print(error_msg)
+        return jsonify({"status": "error", "message": error_msg}), 500
+
 @app.route('/report', methods=['POST', 'GET'])
 def send_ai_report():
     """Generate and send AI-powered economic analysis report via Telegram with PDF
@@ -886,27 +1205,17 @@ _Bot con Gemini AI + Vector DB + WhatsApp_
             send_telegram_message(chat_id, help_text)
             
         elif command == '/stats':
-            # Quick stats from BigQuery
+            # Quick stats from the hourly rollups
             try:
-                client = bigquery.Client(project=PROJECT_ID)
-                query = f"""
-                SELECT 
-                    COUNT(*) as total,
-                    AVG(predicted_volatility) as avg_vol,
-                    MAX(current_price) as max_price,
-                    MIN(current_price) as min_price
-                FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
-                WHERE timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 24 HOUR)
-                """
-                
-                result = list(client.query(query).result())[0]
+                backend = BigQueryBackend(PROJECT_ID, DATASET_ID, TABLE_ID)
+                result = rollup_stats(backend, hours=24)
                 
                 stats_msg = f"""📊 *Estadísticas 24h*
 
-📈 Predicciones: {result.total}
-📉 Volatilidad promedio: {result.avg_vol:.4f}%
-💰 Precio máximo: ${result.max_price:,.2f}
-💵 Precio mínimo: ${result.min_price:,.2f}
+📈 Predicciones: {result['total']}
+📉 Volatilidad promedio: {result['avg_vol']:.4f}%
+💰 Precio máximo: ${result['max_price']:,.2f}
+💵 Precio mínimo: ${result['min_price']:,.2f}
 """
                 send_telegram_message(chat_id, stats_msg)
                 
@@ -940,12 +1249,20 @@ def send_telegram_message(chat_id, text):
 
 
 def upload_pdf_to_storage(pdf_bytes, filename):
-    """Upload PDF to Cloud Storage and return public URL"""
+    """Upload PDF to Cloud Storage and return public URL
+    
+    Filenames are content-addressed, so an existing blob already holds
+    the same PDF and the upload is skipped.
+    """
     try:
         storage_client = storage.Client(project=PROJECT_ID)
         bucket = storage_client.bucket(BUCKET_NAME)
         blob = bucket.blob(f"reports/{filename}")
         
+        if blob.exists():
+            print(f"ℹ️  PDF already uploaded, skipping: {blob.public_url}")
+            return blob.public_url
+        
         blob.upload_from_string(pdf_bytes, content_type='application/pdf')
         
         # Make blob publicly accessible
@@ -990,9 +1307,9 @@ def save_report_with_pdf(report_text, metadata):
         # Generate PDF
         pdf_bytes = create_pdf_report(pdf_data)
         
-        # Upload to Cloud Storage
-        timestamp_str = metadata.get('timestamp', datetime.now().strftime('%Y%m%d_%H%M%S'))
-        filename = f"garch_report_{timestamp_str}.pdf".replace(' ', '_').replace(':', '-')
+        # Upload to Cloud Storage (keyed by content hash, not timestamp)
+        report_id = compute_report_id(metadata)
+        filename = f"garch_report_{report_id[:16]}.pdf"
         pdf_url = upload_pdf_to_storage(pdf_bytes, filename)
         
         # Store in vector database
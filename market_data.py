@@ -0,0 +1,219 @@
+"""
+Market Data Sources for GARCH Trading Bot
+Pluggable OHLCV candle sources: Yahoo Finance, Binance klines and local fixtures
+"""
+
+import os
+import glob
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+
+# Normalized frame: UTC DatetimeIndex + these float columns
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Binance returns at most this many klines per request
+KLINES_PAGE_LIMIT = 1000
+
+# Interval lengths (shared by Yahoo and Binance interval strings)
+INTERVAL_MS = {
+    '1m': 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000
+}
+
+# Offline candles for tests: <FIXTURE_DIR>/<asset>_<interval>.csv
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def asset_to_symbol(asset):
+    """Map a Yahoo Finance asset (BTC-USD) to a Binance pair (BTCUSDT)"""
+    base = asset.split('-')[0].upper()
+    return f"{base}USDT"
+
+
+def _to_utc(dt):
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+class DataSource(ABC):
+    """Base class: fetch(asset, start, end, interval) -> normalized OHLCV DataFrame"""
+
+    name = None
+
+    # Supported intervals -> how many days back the source keeps them (None: no limit)
+    intervals = {interval: None for interval in INTERVAL_MS}
+
+    @classmethod
+    def check(cls, interval, days=None):
+        """
+        Raise ValueError if the source cannot serve `interval` candles `days` back
+
+        Args:
+            interval: Candle interval
+            days: Oldest candle wanted, in days before now (None: not checked)
+        """
+        if interval not in cls.intervals:
+            raise ValueError(f"{cls.name} has no {interval} candles (use {', '.join(cls.intervals)})")
+        limit = cls.intervals[interval]
+        if limit is not None and days is not None and days > limit:
+            raise ValueError(f"{cls.name} keeps only the last {limit} days of {interval} candles")
+
+    @abstractmethod
+    def fetch(self, asset, start, end, interval='1h'):
+        """Candles in [start, end) as a normalized OHLCV frame"""
+
+    @staticmethod
+    def normalize(df):
+        """UTC index, OHLCV float columns, sorted, no duplicate timestamps"""
+        df = df[OHLCV_COLUMNS].astype(float)
+        df.index = pd.DatetimeIndex(df.index)
+        df.index = df.index.tz_localize('UTC') if df.index.tz is None else df.index.tz_convert('UTC')
+        df.index.name = 'timestamp'
+        df = df[~df.index.duplicated(keep='last')]
+        return df.sort_index()
+
+
+class YahooSource(DataSource):
+    """Yahoo Finance history (original run_garch source)"""
+
+    name = 'yahoo'
+
+    # yfinance: no 4h bars, intraday history only for the last days
+    intervals = {'1m': 7, '5m': 60, '15m': 60, '30m': 60, '1h': 730, '1d': None}
+
+    def fetch(self, asset, start, end, interval='1h'):
+        self.check(interval, (datetime.now(timezone.utc) - _to_utc(start)).total_seconds() / 86_400)
+        import yfinance as yf
+        data = yf.Ticker(asset).history(start=start, end=end, interval=interval)
+        if data.empty:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+        return self.normalize(data)
+
+
+class BinanceKlinesSource(DataSource):
+    """
+    Binance spot klines
+
+    The requested range is split into pages of KLINES_PAGE_LIMIT candles and
+    the pages are fetched concurrently through the shared rate-limit governor.
+    """
+
+    name = 'binance'
+
+    def __init__(self, client=None, max_workers=4, testnet=False):
+        """
+        Args:
+            client: Binance client (default: public GovernedClient)
+            max_workers: Concurrent page requests
+            testnet: Use testnet market data (production data is public and deeper)
+        """
+        if client is None:
+            from rate_limit import GovernedClient
+            client = GovernedClient("", "", testnet=testnet)
+        self.client = client
+        self.max_workers = max_workers
+
+    def _pages(self, start_ms, end_ms, interval):
+        step = INTERVAL_MS[interval] * KLINES_PAGE_LIMIT
+        page_start = start_ms
+        while page_start < end_ms:
+            yield page_start, min(page_start + step, end_ms) - 1
+            page_start += step
+
+    def _fetch_page(self, symbol, interval, page):
+        start_ms, end_ms = page
+        return self.client.get_klines(
+            symbol=symbol,
+            interval=interval,
+            startTime=start_ms,
+            endTime=end_ms,
+            limit=KLINES_PAGE_LIMIT
+        )
+
+    def fetch(self, asset, start, end, interval='1h'):
+        symbol = asset_to_symbol(asset) if '-' in asset else asset.upper()
+        start_ms = int(_to_utc(start).timestamp() * 1000)
+        end_ms = int(_to_utc(end).timestamp() * 1000)
+        pages = list(self._pages(start_ms, end_ms, interval))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = pool.map(lambda page: self._fetch_page(symbol, interval, page), pages)
+            klines = [k for page in results for k in page]
+
+        if not klines:
+            return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+        # [open_time, open, high, low, close, volume, close_time, ...]
+        df = pd.DataFrame([k[:6] for k in klines], columns=['open_time'] + OHLCV_COLUMNS)
+        df.index = pd.to_datetime(df.pop('open_time'), unit='ms', utc=True)
+        return self.normalize(df)
+
+
+class FixtureSource(DataSource):
+    """
+    Local CSV/Parquet candles for offline tests
+
+    Files are named <asset>_<interval>.csv (or .parquet) with a timestamp
+    column plus OHLCV columns, e.g. fixtures/BTC-USD_1h.csv.
+    """
+
+    name = 'fixture'
+
+    def __init__(self, fixture_dir=FIXTURE_DIR):
+        self.fixture_dir = fixture_dir
+
+    def fetch(self, asset, start, end, interval='1h'):
+        matches = glob.glob(os.path.join(self.fixture_dir, f"{asset}_{interval}.*"))
+        if not matches:
+            raise FileNotFoundError(f"No fixture for {asset} {interval} in {self.fixture_dir}")
+
+        path = matches[0]
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        df = df.set_index(pd.to_datetime(df['timestamp'], utc=True))
+        df = self.normalize(df)
+        return df[(df.index >= _to_utc(start)) & (df.index < _to_utc(end))]
+
+
+DATA_SOURCES = {
+    'yahoo': YahooSource,
+    'binance': BinanceKlinesSource,
+    'fixture': FixtureSource
+}
+
+
+def get_data_source(name=None):
+    """
+    Build a data source by name
+
+    Args:
+        name (str): 'yahoo', 'binance' or 'fixture' (default: GARCH_DATA_SOURCE env, else 'yahoo')
+
+    Returns:
+        DataSource
+    """
+    name = (name or os.getenv('GARCH_DATA_SOURCE', 'yahoo')).lower()
+    if name not in DATA_SOURCES:
+        raise ValueError(f"Unknown data source: {name} (use {', '.join(DATA_SOURCES)})")
+    return DATA_SOURCES[name]()
+
+
+def fetch_candles(asset, days=30, interval='1h', source=None):
+    """
+    Fetch the last `days` of candles for an asset
+
+    Returns:
+        pd.DataFrame: Normalized OHLCV frame
+    """
+    if not isinstance(source, DataSource):
+        source = get_data_source(source)
+    end = datetime.now(timezone.utc)
+    return source.fetch(asset, end - timedelta(days=days), end, interval)
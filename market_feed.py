@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Feed de Datos de Mercado en Tiempo Real
+Mantiene en memoria el último precio y el top of book de cada símbolo
+a partir de los streams WebSocket de Binance (ticker + bookTicker)
+
+Uso:
+    python market_feed.py BTCUSDT ETHUSDT        # stream en vivo (testnet)
+    python market_feed.py --replay feed.jsonl    # reproducir mensajes grabados
+"""
+
+import sys
+import json
+import time
+import threading
+from abc import ABC, abstractmethod
+
+# Un precio más viejo que esto se considera obsoleto (se vuelve a REST)
+DEFAULT_MAX_AGE = 5  # segundos
+
+
+class MarketDataFeed(ABC):
+    """
+    Tabla en memoria de precios por símbolo
+
+    Las lecturas son locales (un dict protegido por lock), sin round trip
+    REST. Las subclases implementan start()/stop() y entregan los mensajes
+    a on_message(). La frescura se guarda por campo (price_at para el
+    ticker, book_at para el bookTicker): el tráfico del book no hace pasar
+    por fresco un precio de ticker viejo.
+    """
+
+    def __init__(self):
+        self._quotes = {}
+        self._lock = threading.Lock()
+
+    def on_message(self, msg):
+        """Procesar un mensaje de stream (directo o envuelto en un stream combinado)"""
+        if 'data' in msg and 'stream' in msg:
+            msg = msg['data']
+
+        event = msg.get('e')
+        symbol = msg.get('s')
+        if not symbol:
+            return
+
+        now = time.time()
+        if event in ('24hrTicker', '24hrMiniTicker'):
+            update = {'price': float(msg['c']), 'price_at': now}
+        elif event is None and 'b' in msg and 'a' in msg:
+            # bookTicker no lleva campo 'e'
+            update = {
+                'bid': float(msg['b']),
+                'bid_qty': float(msg['B']),
+                'ask': float(msg['a']),
+                'ask_qty': float(msg['A']),
+                'book_at': now
+            }
+        else:
+            return
+
+        with self._lock:
+            self._quotes.setdefault(symbol, {}).update(update)
+
+    def get_quote(self, symbol):
+        """Copia de la cotización de un símbolo (None si no hay datos)"""
+        with self._lock:
+            quote = self._quotes.get(symbol)
+            return dict(quote) if quote else None
+
+    def get_price(self, symbol, max_age=DEFAULT_MAX_AGE):
+        """
+        Último precio de un símbolo
+
+        Usa el último trade del ticker si está fresco; si no, el mid price
+        del bookTicker si ese está fresco.
+
+        Returns:
+            float o None si no hay datos o están obsoletos
+        """
+        quote = self.get_quote(symbol)
+        if not quote:
+            return None
+        now = time.time()
+        if 'price' in quote and now - quote['price_at'] <= max_age:
+            return quote['price']
+        if 'bid' in quote and now - quote['book_at'] <= max_age:
+            return (quote['bid'] + quote['ask']) / 2
+        return None
+
+    def get_book(self, symbol, max_age=DEFAULT_MAX_AGE):
+        """
+        Top of book de un símbolo
+
+        Returns:
+            dict con bid, bid_qty, ask, ask_qty (None si no hay datos frescos)
+        """
+        quote = self.get_quote(symbol)
+        if not quote or 'bid' not in quote or time.time() - quote['book_at'] > max_age:
+            return None
+        return {k: quote[k] for k in ('bid', 'bid_qty', 'ask', 'ask_qty')}
+
+    def symbols(self):
+        with self._lock:
+            return list(self._quotes)
+
+    @abstractmethod
+    def start(self, symbols):
+        """Empezar a recibir mensajes de los símbolos"""
+
+    @abstractmethod
+    def stop(self):
+        """Cerrar el stream"""
+
+
+class BinanceStreamFeed(MarketDataFeed):
+    """Feed en vivo con los streams <symbol>@ticker y <symbol>@bookTicker"""
+
+    def __init__(self, testnet=True):
+        super().__init__()
+        self.testnet = testnet
+        self._manager = None
+
+    def start(self, symbols):
+        """Abrir un stream combinado para todos los símbolos"""
+        from binance import ThreadedWebsocketManager
+
+        streams = []
+        for symbol in symbols:
+            streams.append(f"{symbol.lower()}@ticker")
+            streams.append(f"{symbol.lower()}@bookTicker")
+
+        self._manager = ThreadedWebsocketManager(testnet=self.testnet)
+        self._manager.start()
+        self._manager.start_multiplex_socket(callback=self.on_message, streams=streams)
+
+    def stop(self):
+        if self._manager:
+            self._manager.stop()
+            self._manager = None
+
+
+class ReplayFeed(MarketDataFeed):
+    """
+    Sustituto local del WebSocket: reproduce mensajes grabados
+
+    Útil para pruebas sin red. Los mensajes tienen el mismo formato que
+    los del stream (un JSON por línea si se cargan desde archivo).
+    """
+
+    def __init__(self, messages=None, path=None, interval=0.0):
+        super().__init__()
+        if path:
+            with open(path, 'r') as f:
+                messages = [json.loads(line) for line in f if line.strip()]
+        self.messages = messages or []
+        self.interval = interval
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def replay(self, symbols=None):
+        """Entregar todos los mensajes de forma síncrona"""
+        for msg in self.messages:
+            if self._stopped.is_set():
+                break
+            data = msg.get('data', msg)
+            if symbols is None or data.get('s') in symbols:
+                self.on_message(msg)
+            if self.interval:
+                time.sleep(self.interval)
+
+    def start(self, symbols=None):
+        """Reproducir en un hilo de fondo (como el feed en vivo)"""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.replay, args=(symbols,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    if args and args[0] == '--replay':
+        feed = ReplayFeed(path=args[1])
+        feed.replay()
+        for symbol in feed.symbols():
+            print(f"{symbol}: {feed.get_quote(symbol)}")
+    else:
+        symbols = [s.upper() for s in args] or ['BTCUSDT']
+        feed = BinanceStreamFeed(testnet=True)
+        feed.start(symbols)
+        print(f"📡 Escuchando {', '.join(symbols)} (Ctrl+C para salir)")
+        try:
+            while True:
+                time.sleep(1)
+                for symbol in symbols:
+                    price = feed.get_price(symbol)
+                    book = feed.get_book(symbol)
+                    if price and book:
+                        print(f"   {symbol}: ${price:,.2f}  bid {book['bid']:,.2f} / ask {book['ask']:,.2f}")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            feed.stop()
@@ -0,0 +1,129 @@
+"""
+Model Selection Cache for GARCH Trading Bot
+Selected volatility spec per asset, kept in a small table so the hourly /run
+fits one model and the full order search + model zoo only runs on a cadence
+or when diagnostics flag a regime change
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+from scipy import stats
+
+from model_zoo import ModelSpec, standardized_residuals
+from analytics_sql import upsert
+
+
+SELECTION_TABLE_ID = "garch_model_selection"
+
+SELECTION_SCHEMA = {
+    'asset': 'STRING', 'family': 'STRING', 'p': 'INT64', 'q': 'INT64', 'dist': 'STRING',
+    'criterion': 'STRING', 'loglik_per_obs': 'FLOAT64', 'selected_at': 'TIMESTAMP'
+}
+
+SELECTION_COLUMNS = list(SELECTION_SCHEMA)
+
+# Full re-selection cadence (hours)
+RESELECT_HOURS = float(os.getenv('GARCH_RESELECT_HOURS', '24'))
+
+# Re-select if the per-observation log-likelihood falls this much below the value at selection
+LOGLIK_DROP_THRESHOLD = float(os.getenv('GARCH_LOGLIK_DROP', '0.05'))
+
+# Ljung-Box on squared standardized residuals: remaining ARCH effects -> re-select
+LJUNG_BOX_LAGS = 10
+LJUNG_BOX_ALPHA = 0.01
+
+_SELECTION_UPDATES = {c: '{new}.' + c for c in SELECTION_COLUMNS if c != 'asset'}
+
+
+def create_selection_table(backend):
+    """Create the selection table on the SQLite stand-in (BigQuery: see README)"""
+    backend.execute(f"""
+        CREATE TABLE IF NOT EXISTS {backend.table_ref(SELECTION_TABLE_ID)} (
+            asset TEXT PRIMARY KEY, family TEXT, p INTEGER, q INTEGER, dist TEXT,
+            criterion TEXT, loglik_per_obs REAL, selected_at TEXT
+        )
+    """)
+
+
+def get_selection(backend, asset):
+    """Stored selection of an asset (None if it was never selected)"""
+    rows = backend.query(
+        f"SELECT {', '.join(SELECTION_COLUMNS)} FROM {backend.table_ref(SELECTION_TABLE_ID)} "
+        f"WHERE asset = {backend.placeholder('asset')}",
+        {'asset': asset}
+    )
+    if not rows:
+        return None
+    selection = rows[0]
+    selection['spec'] = ModelSpec(selection['family'], int(selection['p']), int(selection['q']), selection['dist'])
+    selected_at = selection['selected_at']
+    if isinstance(selected_at, str):
+        selected_at = datetime.fromisoformat(selected_at)
+    selection['selected_at'] = selected_at.replace(tzinfo=None)
+    return selection
+
+
+def save_selection(backend, asset, spec, fit, n_obs, criterion='aic', selected_at=None):
+    """Store (or replace) the selected spec of an asset"""
+    values = {
+        'asset': asset,
+        **spec.to_dict(),
+        'criterion': criterion,
+        'loglik_per_obs': fit['loglikelihood'] / n_obs,
+        'selected_at': (selected_at or datetime.utcnow()).isoformat()
+    }
+    upsert(backend, SELECTION_TABLE_ID, ['asset'], values, _SELECTION_UPDATES, SELECTION_SCHEMA)
+
+
+def ljung_box(x, lags=LJUNG_BOX_LAGS):
+    """
+    Ljung-Box Q statistic and p-value for autocorrelation up to `lags`
+
+    Returns:
+        (q_stat, p_value)
+    """
+    x = np.asarray(x, dtype=float)
+    x = x[np.isfinite(x)]
+    n = len(x)
+    x = x - x.mean()
+    denom = np.dot(x, x)
+    if n <= lags or denom == 0:
+        return 0.0, 1.0
+    acf = np.array([np.dot(x[k:], x[:-k]) / denom for k in range(1, lags + 1)])
+    q_stat = n * (n + 2) * np.sum(acf ** 2 / (n - np.arange(1, lags + 1)))
+    return float(q_stat), float(stats.chi2.sf(q_stat, lags))
+
+
+def reselection_reason(selection, fit, returns, now=None):
+    """
+    Why the cached spec should be re-selected (None if it can be kept)
+
+    Args:
+        selection: Stored selection (get_selection)
+        fit: Fit of the cached spec on the current data (model_zoo fit dict)
+        returns: Current return series
+    """
+    if selection is None:
+        return "no cached selection"
+    if 'error' in fit:
+        return f"cached spec failed to fit ({fit['error']})"
+    if not fit.get('converged', True):
+        return "cached spec did not converge"
+
+    now = now or datetime.utcnow()
+    age_hours = (now - selection['selected_at']).total_seconds() / 3600
+    if age_hours >= RESELECT_HOURS:
+        return f"selection is {age_hours:.0f}h old"
+
+    loglik_per_obs = fit['loglikelihood'] / len(returns)
+    if loglik_per_obs < selection['loglik_per_obs'] - LOGLIK_DROP_THRESHOLD:
+        return f"log-likelihood dropped ({selection['loglik_per_obs']:.4f} -> {loglik_per_obs:.4f} per obs)"
+
+    std_resid = standardized_residuals(selection['spec'], fit['params'], returns)
+    _, p_value = ljung_box(std_resid ** 2)
+    if p_value < LJUNG_BOX_ALPHA:
+        return f"ARCH effects left in residuals (Ljung-Box p={p_value:.4f})"
+
+    return None
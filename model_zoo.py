@@ -0,0 +1,376 @@
+"""
+Volatility Model Zoo for GARCH Trading Bot
+Registry of volatility specifications (GARCH, GJR-GARCH, EGARCH with normal,
+Student-t and skew-t errors) fitted through one parallel, warm-started,
+cached pipeline and selected by information criterion
+"""
+
+import os
+import json
+import hashlib
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from arch import arch_model
+from garch_filter import GarchFilter
+
+
+# Volatility families: arch_model keyword arguments (besides p, q)
+FAMILIES = {
+    'garch': {'vol': 'GARCH', 'o': 0},
+    'gjr': {'vol': 'GARCH', 'o': 1},
+    'egarch': {'vol': 'EGARCH', 'o': 1}
+}
+
+DISTRIBUTIONS = ['normal', 't', 'skewt']
+
+# Neutral starting values for parameters a simpler model doesn't have
+DEFAULT_STARTING_VALUES = {'gamma': 0.0, 'nu': 8.0, 'eta': 8.0, 'lambda': 0.0}
+
+# Fitted parameters per (asset, spec), reused as warm starts on the next run
+# For Cloud Functions, use /tmp (same as the other local caches)
+FIT_CACHE_PATH = "/tmp/garch_fit_cache.json"
+
+# Simulations for multi-step forecasts of models without an analytic form (EGARCH)
+FORECAST_SIMULATIONS = 1000
+FORECAST_SEED = 42  # same data and parameters -> same forecast
+
+
+class ModelSpec:
+    """One candidate volatility model"""
+
+    def __init__(self, family='garch', p=1, q=1, dist='normal'):
+        if family not in FAMILIES:
+            raise ValueError(f"Unknown volatility family: {family} (use {', '.join(FAMILIES)})")
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution: {dist} (use {', '.join(DISTRIBUTIONS)})")
+        self.family = family
+        self.p = p
+        self.q = q
+        self.dist = dist
+
+    @property
+    def key(self):
+        return f"{self.family}({self.p},{self.q})-{self.dist}"
+
+    @property
+    def is_garch(self):
+        """Plain GARCH variance recursion (any error distribution): GarchFilter applies"""
+        return self.family == 'garch'
+
+    def build(self, returns):
+        return arch_model(returns, p=self.p, q=self.q, dist=self.dist, **FAMILIES[self.family])
+
+    def to_dict(self):
+        return {'family': self.family, 'p': self.p, 'q': self.q, 'dist': self.dist}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d.get('family', 'garch'), d.get('p', 1), d.get('q', 1), d.get('dist', 'normal'))
+
+    def __repr__(self):
+        return self.key
+
+
+def candidate_specs(p=1, q=1, families=None, dists=None):
+    """All family x distribution combinations at one (p, q) order"""
+    return [ModelSpec(family, p, q, dist)
+            for family in families or FAMILIES
+            for dist in dists or DISTRIBUTIONS]
+
+
+def data_hash(returns):
+    """Fingerprint of a return series (identical data -> cached fit is reused)"""
+    return hashlib.sha256(np.ascontiguousarray(returns, dtype=float).tobytes()).hexdigest()
+
+
+class FitCache:
+    """
+    Fitted parameters per (asset, spec) in a small JSON file
+
+    An entry for the same data is returned as-is; otherwise its parameters
+    are the warm start for the new fit.
+    """
+
+    def __init__(self, path=FIT_CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, asset, spec):
+        return self.entries.get(f"{asset}|{spec.key}")
+
+    def put(self, asset, spec, fit):
+        self.entries[f"{asset}|{spec.key}"] = fit
+
+    def save(self):
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f)
+        except OSError as e:
+            print(f"⚠️ Could not save fit cache: {e}")
+
+
+def starting_values(model, known):
+    """
+    Starting vector in the model's parameter order
+
+    Parameters missing from `known` get a neutral default, or None is
+    returned so arch picks its own starting values.
+    """
+    values = []
+    for name in model._all_parameter_names():
+        base = name.split('[')[0]
+        if name in known:
+            values.append(known[name])
+        elif base in DEFAULT_STARTING_VALUES:
+            values.append(DEFAULT_STARTING_VALUES[base])
+        else:
+            return None
+    return np.array(values)
+
+
+def _fit_spec(args):
+    """Fit one spec (top-level so it can run in a worker process)"""
+    spec_dict, returns, warm_start = args
+    spec = ModelSpec.from_dict(spec_dict)
+    model = spec.build(returns)
+    start = starting_values(model, warm_start) if warm_start else None
+    try:
+        with warnings.catch_warnings():
+            # Warm starts outside the constraints are ignored by arch; that's fine
+            warnings.simplefilter('ignore')
+            result = model.fit(disp='off', show_warning=False, starting_values=start)
+    except Exception as e:
+        return {'spec': spec_dict, 'error': str(e)}
+    return {
+        'spec': spec_dict,
+        'params': {k: float(v) for k, v in result.params.items()},
+        'aic': float(result.aic),
+        'bic': float(result.bic),
+        'loglikelihood': float(result.loglikelihood),
+        'converged': result.convergence_flag == 0,
+        'iterations': int(getattr(result.optimization_result, 'nit', 0))
+    }
+
+
+def fit_candidates(returns, specs, asset=None, cache=None, max_workers=None):
+    """
+    Fit several specs in parallel
+
+    Args:
+        returns: Return series
+        specs: List of ModelSpec
+        asset: Asset name for the fit cache (None disables caching)
+        cache: FitCache (default: FIT_CACHE_PATH)
+        max_workers: Worker processes (default: one per CPU, sequential on a single CPU)
+
+    Returns:
+        list: One fit dict per spec (params, aic, bic, converged, ...) or {'error'}
+    """
+    returns = np.asarray(returns, dtype=float)
+    digest = data_hash(returns)
+    cache = cache if cache is not None else (FitCache() if asset else None)
+
+    results = {}
+    jobs = []
+    for spec in specs:
+        cached = cache.get(asset, spec) if cache else None
+        if cached and cached.get('data_hash') == digest:
+            results[spec.key] = cached
+            continue
+        warm_start = cached['params'] if cached else None
+        jobs.append((spec.to_dict(), returns, warm_start))
+
+    workers = max_workers or os.cpu_count() or 1
+    if jobs:
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                fits = list(pool.map(_fit_spec, jobs))
+        else:
+            fits = [_fit_spec(job) for job in jobs]
+
+        for fit in fits:
+            spec = ModelSpec.from_dict(fit['spec'])
+            results[spec.key] = fit
+            if cache and 'error' not in fit:
+                cache.put(asset, spec, dict(fit, data_hash=digest))
+        if cache:
+            cache.save()
+
+    return [results[spec.key] for spec in specs]
+
+
+def select_model(returns, p=1, q=1, asset=None, criterion='aic', families=None, dists=None, max_workers=None):
+    """
+    Fit the model zoo at one order and keep the best by AIC or BIC
+
+    Returns:
+        (ModelSpec, fit dict, all fits)
+    """
+    specs = candidate_specs(p, q, families, dists)
+    fits = fit_candidates(returns, specs, asset=asset, max_workers=max_workers)
+
+    valid = [(spec, fit) for spec, fit in zip(specs, fits) if 'error' not in fit and np.isfinite(fit[criterion])]
+    if not valid:
+        raise ValueError("No volatility model could be fitted")
+
+    for spec, fit in zip(specs, fits):
+        if 'error' in fit:
+            print(f"  {spec.key}: failed ({fit['error']})")
+        else:
+            print(f"  {spec.key}: {criterion.upper()}={fit[criterion]:.2f}")
+
+    spec, fit = min(valid, key=lambda sf: sf[1][criterion])
+    return spec, fit, fits
+
+
+def fixed_result(spec, params, returns, seed=None):
+    """arch result with fixed (already estimated) parameters, for forecasting"""
+    model = spec.build(returns)
+    if seed is not None:
+        # Simulation forecasts draw shocks from the distribution's own generator
+        model.distribution = type(model.distribution)(seed=seed)
+    names = model._all_parameter_names()
+    return model.fix(pd.Series(params)[names].values)
+
+
+def forecast_variances(spec, params, returns, horizon=1):
+    """
+    Variance forecasts for steps 1..horizon from stored parameters
+
+    Plain GARCH uses the native filter; GJR uses arch's analytic forecast and
+    EGARCH (no analytic multi-step form) arch's simulation forecast.
+    """
+    returns = np.asarray(returns, dtype=float)
+    if spec.is_garch:
+        alphas = [params[f'alpha[{i}]'] for i in range(1, spec.p + 1)]
+        betas = [params[f'beta[{j}]'] for j in range(1, spec.q + 1)]
+        return GarchFilter(params['omega'], alphas, betas, mu=params.get('mu', 0.0)).forecast(returns, horizon)
+
+    result = fixed_result(spec, params, returns, seed=FORECAST_SEED)
+    method = 'simulation' if spec.family == 'egarch' and horizon > 1 else 'analytic'
+    forecast = result.forecast(horizon=horizon, method=method, simulations=FORECAST_SIMULATIONS, reindex=False)
+    return forecast.variance.values[-1]
+
+
+def _lags(params, name, n):
+    return np.array([params[f'{name}[{i}]'] for i in range(1, n + 1)], dtype=float)
+
+
+def persistence(spec, params):
+    """
+    How long variance shocks last, comparable across families
+
+    GARCH: sum(alpha) + sum(beta); GJR: the asymmetric term adds gamma / 2
+    (shocks are negative half of the time); EGARCH: sum(beta), the
+    autoregressive coefficient of the log variance.
+    """
+    betas = _lags(params, 'beta', spec.q).sum()
+    if spec.family == 'egarch':
+        return float(betas)
+    alphas = _lags(params, 'alpha', spec.p).sum()
+    gamma = params.get('gamma[1]', 0.0) if spec.family == 'gjr' else 0.0
+    return float(alphas + gamma / 2 + betas)
+
+
+def filter_state(spec, params, returns):
+    """
+    Last residuals and conditional variances of a fitted model
+
+    Enough to forecast with forecast_from_state() without the return
+    history. Lists are oldest first.
+
+    Returns:
+        dict: resids and sigma2, the last max(p, q) residuals and variances
+    """
+    returns = np.asarray(returns, dtype=float)
+    if spec.is_garch:
+        sigma2, resids = GarchFilter(params['omega'], _lags(params, 'alpha', spec.p), _lags(params, 'beta', spec.q),
+                                     mu=params.get('mu', 0.0)).filter(returns)
+    else:
+        result = fixed_result(spec, params, returns)
+        sigma2 = np.asarray(result.conditional_volatility) ** 2
+        resids = np.asarray(result.resid)
+    lags = max(spec.p, spec.q)
+    return {
+        'resids': resids[-lags:].tolist(),
+        'sigma2': sigma2[-lags:].tolist()
+    }
+
+
+def forecast_from_state(spec, params, state, horizon=1):
+    """
+    Variance forecasts for steps 1..horizon from a stored filter_state()
+
+    Same recursions as forecast_variances() (GJR: future shocks are negative
+    half of the time; EGARCH: seeded simulation beyond one step), without
+    refiltering the history.
+    """
+    resids = np.asarray(state['resids'], dtype=float)
+    sigma2 = np.asarray(state['sigma2'], dtype=float)
+    omega = params['omega']
+    alphas = _lags(params, 'alpha', spec.p)
+    betas = _lags(params, 'beta', spec.q)
+
+    if spec.family != 'egarch':
+        eps2 = resids ** 2
+        if spec.family == 'gjr':
+            gamma = params['gamma[1]']
+            # The asymmetric term only depends on the last shock
+            first = (omega + alphas @ eps2[::-1][:spec.p] + gamma * eps2[-1] * (resids[-1] < 0)
+                     + betas @ sigma2[::-1][:spec.q])
+            # Later steps: the lag-1 shock is a future one, E[eps**2 * 1(eps < 0)] = sigma2 / 2
+            follow = GarchFilter(omega, alphas + np.r_[gamma / 2, np.zeros(spec.p - 1)], betas)
+            return np.r_[first, follow.forecast_from_state(np.r_[eps2, first][-spec.p:],
+                                                           np.r_[sigma2, first][-spec.q:], horizon - 1)][:horizon]
+        return GarchFilter(omega, alphas, betas).forecast_from_state(eps2, sigma2, horizon)
+
+    # EGARCH on log variance; z are standardized shocks (arch: E|z| = sqrt(2/pi))
+    gamma = params['gamma[1]']
+    abs_mean = np.sqrt(2 / np.pi)
+    z = resids / np.sqrt(sigma2)
+    log_s2 = np.log(sigma2)
+
+    def step(z_lags, log_lags):
+        # z_lags: (sims, p) newest first; log_lags: (sims, q) newest first
+        return omega + (np.abs(z_lags) - abs_mean) @ alphas + gamma * z_lags[:, 0] + log_lags @ betas
+
+    sims = FORECAST_SIMULATIONS if horizon > 1 else 1
+    z_lags = np.tile(z[::-1][:spec.p], (sims, 1))
+    log_lags = np.tile(log_s2[::-1][:spec.q], (sims, 1))
+    distribution = spec.build(np.zeros(10)).distribution
+    shocks = type(distribution)(seed=FORECAST_SEED).simulate(
+        [params[name] for name in distribution.parameter_names()])((sims, horizon))
+
+    forecasts = np.empty(horizon)
+    for h in range(horizon):
+        log_next = step(z_lags, log_lags)
+        forecasts[h] = np.exp(log_next).mean()
+        if h + 1 < horizon:
+            z_lags = np.column_stack([shocks[:, h], z_lags])[:, :spec.p]
+            log_lags = np.column_stack([log_next, log_lags])[:, :spec.q]
+    return forecasts
+
+
+def standardized_residuals(spec, params, returns):
+    """Residuals divided by their conditional volatility (for diagnostics)"""
+    returns = np.asarray(returns, dtype=float)
+    if spec.is_garch:
+        alphas = [params[f'alpha[{i}]'] for i in range(1, spec.p + 1)]
+        betas = [params[f'beta[{j}]'] for j in range(1, spec.q + 1)]
+        sigma2, resids = GarchFilter(params['omega'], alphas, betas, mu=params.get('mu', 0.0)).filter(returns)
+        return resids / np.sqrt(sigma2)
+    return np.asarray(fixed_result(spec, params, returns).std_resid)
+
+
+def term_structure(spec, params, returns, steps):
+    """Cumulative volatility for each horizon in `steps` (periods)"""
+    variances = forecast_variances(spec, params, returns, max(steps))
+    return np.sqrt(np.cumsum(variances)[np.asarray(steps) - 1])
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Gestor Asíncrono de Órdenes
+Envía órdenes de varios símbolos en paralelo (asyncio + AsyncClient) y sigue
+su estado con el user data stream en lugar de consultar get_open_orders
+
+Uso:
+    python order_manager.py BUY BTCUSDT ETHUSDT --amount 20
+    python order_manager.py SELL BTCUSDT ETHUSDT
+"""
+
+import os
+import sys
+import time
+import asyncio
+from dotenv import load_dotenv
+from binance import BinanceSocketManager
+from binance.exceptions import BinanceAPIException
+from rate_limit import GovernedAsyncClient
+
+load_dotenv()
+
+# Límite de órdenes de Binance Spot (ver GET /api/v3/exchangeInfo -> rateLimits);
+# el peso por minuto lo controla el gobernador compartido de rate_limit.py
+ORDERS_PER_10_SECONDS = 100
+
+# Estados finales de una orden
+FINAL_STATUSES = ('FILLED', 'CANCELED', 'REJECTED', 'EXPIRED', 'EXPIRED_IN_MATCH')
+
+
+class TokenBucket:
+    """
+    Token bucket asíncrono
+
+    Cada orden consume un token; los tokens se reponen a ritmo constante.
+    Si no hay suficientes, acquire() espera lo justo.
+    """
+
+    def __init__(self, capacity, refill_per_second):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.refill_per_second)
+        self._updated_at = now
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.refill_per_second)
+                self._refill()
+            self.tokens -= tokens
+
+
+class AsyncOrderManager:
+    """
+    Órdenes concurrentes para varios símbolos
+
+    El estado de cada orden (self.orders) y los balances (self.balances) se
+    actualizan con los eventos executionReport y outboundAccountPosition
+    del user data stream. El peso de cada request pasa por el gobernador
+    compartido (GovernedAsyncClient), el mismo que usan AutoTrader y la
+    descarga de velas.
+    """
+
+    def __init__(self, client, policy=None):
+        """
+        Args:
+            client: GovernedAsyncClient ya creado
+            policy: TradingPolicy (auto_trader.py) para checks pre-trade
+        """
+        self.client = client
+        self.policy = policy
+        self.order_bucket = TokenBucket(ORDERS_PER_10_SECONDS, ORDERS_PER_10_SECONDS / 10)
+
+        self.orders = {}        # clientOrderId -> último estado conocido
+        self.balances = {}      # asset -> {'free', 'locked'}
+        self.symbol_filters = {}
+        self._order_events = {}
+        self._stream_task = None
+
+    @classmethod
+    async def create(cls, api_key=None, secret_key=None, testnet=True, policy=None):
+        """Crear cliente asíncrono, cargar filtros y balances, y abrir el user data stream"""
+        client = await GovernedAsyncClient.create(
+            api_key or os.getenv('BINANCE_API_KEY'),
+            secret_key or os.getenv('BINANCE_SECRET_KEY'),
+            testnet=testnet
+        )
+        manager = cls(client, policy=policy)
+        await asyncio.gather(manager.load_symbol_filters(), manager.load_balances())
+        manager.start_user_stream()
+        return manager
+
+    async def load_symbol_filters(self):
+        info = await self.client.get_exchange_info()
+        self.symbol_filters = {
+            s['symbol']: {f['filterType']: f for f in s['filters']}
+            for s in info['symbols']
+        }
+
+    async def load_balances(self):
+        """Snapshot inicial; después se mantiene con el user data stream"""
+        account = await self.client.get_account()
+        self.balances = {
+            b['asset']: {'free': float(b['free']), 'locked': float(b['locked'])}
+            for b in account['balances']
+        }
+
+    def start_user_stream(self):
+        self._stream_task = asyncio.ensure_future(self._run_user_stream())
+
+    async def _run_user_stream(self):
+        socket = BinanceSocketManager(self.client).user_socket()
+        async with socket as stream:
+            while True:
+                self.handle_user_event(await stream.recv())
+
+    def handle_user_event(self, msg):
+        """Aplicar un evento del user data stream al estado local"""
+        event = msg.get('e')
+
+        if event == 'executionReport':
+            client_id = msg['c']
+            self.orders[client_id] = {
+                'symbol': msg['s'],
+                'side': msg['S'],
+                'orderId': msg['i'],
+                'status': msg['X'],
+                'executedQty': msg['z'],
+                'cummulativeQuoteQty': msg['Z'],
+                'updated_at': msg['E']
+            }
+            if msg['X'] in FINAL_STATUSES:
+                self._order_events.setdefault(client_id, asyncio.Event()).set()
+
+        elif event == 'outboundAccountPosition':
+            for b in msg['B']:
+                self.balances[b['a']] = {'free': float(b['f']), 'locked': float(b['l'])}
+
+    def _adjust_quantity(self, symbol, quantity):
+        lot_filter = self.symbol_filters[symbol]['LOT_SIZE']
+        step_size = float(lot_filter['stepSize'])
+        quantity = int(quantity / step_size) * step_size
+        decimals = max(0, len(lot_filter['stepSize'].rstrip('0').split('.')[-1]))
+        return f"{quantity:.{decimals}f}", quantity >= float(lot_filter['minQty'])
+
+    async def _last_price(self, symbol):
+        ticker = await self.client.get_symbol_ticker(symbol=symbol)
+        return float(ticker['price'])
+
+    async def submit_market(self, symbol, side, amount_usdt=None, quantity=None):
+        """
+        Enviar una orden de mercado
+
+        Args:
+            symbol: Par de trading (ej: BTCUSDT)
+            side: BUY o SELL
+            amount_usdt: USDT a gastar (solo BUY, usa quoteOrderQty)
+            quantity: Cantidad del asset base (None en SELL = todo el balance)
+
+        Returns:
+            dict: Respuesta de la orden, o dict con 'error'
+        """
+        if symbol not in self.symbol_filters:
+            return {'symbol': symbol, 'side': side, 'error': 'Símbolo no encontrado en exchange info'}
+
+        params = {'symbol': symbol, 'side': side, 'type': 'MARKET'}
+        if side == 'BUY' and amount_usdt:
+            params['quoteOrderQty'] = f"{amount_usdt:.2f}"
+            notional = amount_usdt
+        else:
+            if quantity is None:
+                base = symbol[:-4] if symbol.endswith('USDT') else symbol[:-3]
+                quantity = self.balances.get(base, {}).get('free', 0.0)
+            params['quantity'], ok = self._adjust_quantity(symbol, quantity)
+            if not ok:
+                return {'symbol': symbol, 'side': side, 'error': 'Cantidad menor al mínimo'}
+            notional = None
+
+        if self.policy is not None:
+            price = await self._last_price(symbol)
+            qty = notional / price if notional else float(params['quantity'])
+            ok, reason = self.policy.check(symbol, qty, price, reduces_position=side == 'SELL')
+            if not ok:
+                return {'symbol': symbol, 'side': side, 'error': reason}
+            if self.policy.dry_run:
+                return {'symbol': symbol, 'side': side, 'status': 'DRY_RUN', 'origQty': f"{qty:.8f}", 'dryRun': True}
+
+        await self.order_bucket.acquire(1)
+        try:
+            order = await self.client.create_order(**params)
+        except BinanceAPIException as e:
+            return {'symbol': symbol, 'side': side, 'error': e.message}
+
+        self._order_events.setdefault(order['clientOrderId'], asyncio.Event())
+        self.orders.setdefault(order['clientOrderId'], {
+            'symbol': symbol,
+            'side': side,
+            'orderId': order['orderId'],
+            'status': order['status'],
+            'executedQty': order['executedQty'],
+            'cummulativeQuoteQty': order['cummulativeQuoteQty'],
+            'updated_at': order['transactTime']
+        })
+        # El executionReport puede haber llegado antes que la respuesta REST
+        if self.orders[order['clientOrderId']]['status'] in FINAL_STATUSES or order['status'] in FINAL_STATUSES:
+            self._order_events[order['clientOrderId']].set()
+        return order
+
+    async def submit_many(self, orders):
+        """
+        Enviar varias órdenes en paralelo
+
+        Args:
+            orders: Lista de dicts con los argumentos de submit_market
+
+        Returns:
+            list: Resultados en el mismo orden
+        """
+        return await asyncio.gather(*(self.submit_market(**o) for o in orders))
+
+    async def wait_for(self, client_order_id, timeout=10):
+        """Esperar a que una orden llegue a un estado final (vía user data stream)"""
+        event = self._order_events.setdefault(client_order_id, asyncio.Event())
+        await asyncio.wait_for(event.wait(), timeout)
+        return self.orders[client_order_id]
+
+    async def close(self):
+        if self._stream_task:
+            self._stream_task.cancel()
+        await self.client.close_connection()
+
+
+async def execute_signals(signals, amount_usdt, testnet=True, policy=None):
+    """
+    Ejecutar señales de varios símbolos a la vez
+
+    Args:
+        signals: dict símbolo -> BUY/SELL/HOLD
+        amount_usdt: USDT por cada compra
+        testnet: Usar testnet
+        policy: TradingPolicy opcional
+
+    Returns:
+        list: Resultado de cada orden enviada
+    """
+    manager = await AsyncOrderManager.create(testnet=testnet, policy=policy)
+    try:
+        orders = []
+        for symbol, signal in signals.items():
+            if signal == 'BUY':
+                orders.append({'symbol': symbol, 'side': 'BUY', 'amount_usdt': amount_usdt})
+            elif signal == 'SELL':
+                orders.append({'symbol': symbol, 'side': 'SELL'})
+        return await manager.submit_many(orders)
+    finally:
+        await manager.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('BUY', 'SELL'):
+        print("Uso: python order_manager.py BUY|SELL SYMBOL [SYMBOL ...] [--amount USDT]")
+        sys.exit(1)
+
+    amount = 20.0
+    if '--amount' in args:
+        idx = args.index('--amount')
+        amount = float(args[idx + 1])
+        args = args[:idx] + args[idx + 2:]
+
+    side, symbols = args[0], [s.upper() for s in args[1:]]
+    start = time.time()
+    results = asyncio.run(execute_signals({s: side for s in symbols}, amount))
+    for r in results:
+        if 'error' in r:
+            print(f"❌ {r['symbol']} {r['side']}: {r['error']}")
+        else:
+            print(f"✅ {r['symbol']} {r['side']}: {r['status']} ({r.get('executedQty', r.get('origQty'))})")
+    print(f"⏱️  {len(results)} órdenes en {time.time() - start:.2f}s")
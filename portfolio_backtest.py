@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Backtest de Cartera Multi-Activo
+Sigue las señales GARCH de muchos activos a la vez, dimensiona cada posición
+por el inverso de su volatilidad pronosticada y reporta equity, drawdown y
+rotación, todo con matrices tiempo x activos
+
+Uso:
+    python portfolio_backtest.py                          # predicciones desde BigQuery
+    python portfolio_backtest.py --local                  # espejo Parquet local
+    python portfolio_backtest.py --assets BTC-USD,ETH-USD,SOL-USD --days 365
+                                                          # señales recalculadas desde velas
+    python portfolio_backtest.py --local --output equity.csv
+    python portfolio_backtest.py --local --no-costs       # sin comisiones, spread ni slippage
+"""
+
+import sys
+import numpy as np
+import pandas as pd
+from google.cloud import bigquery
+from market_data import fetch_candles, asset_to_symbol, INTERVAL_MS
+from cost_model import CostModel
+from prediction_store import iter_query_pages, load_mirror
+from threshold_sweep import precompute_volatility, BUY, HOLD, SELL
+
+PROJECT_ID = "travel-recomender"
+DATASET_ID = "trading_bot"
+TABLE_ID = "garch_predictions"
+
+INITIAL_CAPITAL = 1000
+
+# Umbrales de run_garch: std móvil de 24 velas, percentiles 75/25 sobre 30 días, buffer 10%
+SIGNAL_WINDOW = 24
+SIGNAL_HISTORY_DAYS = 30
+SIGNAL_HIGH_QUANTILE = 0.75
+SIGNAL_LOW_QUANTILE = 0.25
+SIGNAL_BUFFER = 0.1
+
+SIGNAL_CODES = {'BUY': BUY, 'HOLD': HOLD, 'SELL': SELL}
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def positions_from_signals(signals):
+    """
+    Matriz de posiciones (1 = invertido) a partir de señales BUY/HOLD/SELL
+
+    Cada activo mantiene la última señal distinta de HOLD; empieza en
+    efectivo hasta su primer BUY.
+    """
+    codes = signals.replace(HOLD, np.nan).ffill().fillna(SELL)
+    return (codes == BUY).astype(float)
+
+
+def inverse_vol_weights(positions, volatility):
+    """
+    Pesos objetivo por el inverso de la volatilidad pronosticada
+
+    El presupuesto se reparte entre todos los activos con volatilidad
+    conocida; la parte de los activos fuera de posición queda en efectivo.
+    """
+    inv_vol = 1.0 / volatility.where(volatility > 0)
+    budget = inv_vol.div(inv_vol.sum(axis=1), axis=0)
+    return (budget * positions).fillna(0.0)
+
+
+def backtest(prices, volatility, signals, initial_capital=INITIAL_CAPITAL, periods_per_year=24 * 365, costs=None):
+    """
+    Backtest vectorizado de una cartera que se rebalancea en cada vela
+
+    Args:
+        prices: DataFrame tiempo x activos con precios
+        volatility: DataFrame tiempo x activos con la volatilidad pronosticada (%)
+        signals: DataFrame tiempo x activos con BUY/HOLD/SELL (códigos o texto)
+        periods_per_year: Velas por año (para anualizar)
+        costs: CostModel común o dict activo -> CostModel (None = sin costos)
+
+    Returns:
+        dict: equity, drawdown, weights, turnover (series/frames) y métricas
+    """
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in signals.dtypes):
+        # Texto: object o el dtype str de pandas >= 3
+        signals = signals.replace(SIGNAL_CODES)
+    signals = signals.fillna(HOLD).astype(int)
+
+    weights = inverse_vol_weights(positions_from_signals(signals), volatility)
+    returns = prices.pct_change(fill_method=None).fillna(0.0)
+
+    # Los pesos decididos al cierre de t se aplican al retorno de t+1
+    held = weights.shift(1).fillna(0.0)
+    gross_returns = (held * returns).sum(axis=1)
+
+    # Rotación: distancia entre los pesos tras moverse los precios y el nuevo objetivo
+    drifted = held * (1 + returns)
+    drifted = drifted.div(1 + gross_returns, axis=0)
+    traded = (weights - drifted).abs()
+    turnover = traded.sum(axis=1)
+
+    # Costos del rebalanceo al cierre de t, como fracción del capital
+    cost = pd.Series(0.0, index=prices.index)
+    if costs is not None:
+        growth = 1 + gross_returns
+        # Nocional = fracción rotada x capital; la segunda pasada incluye los costos ya pagados
+        for _ in range(2):
+            capital = initial_capital * (growth * (1 - cost)).cumprod() / (1 - cost)
+            notional = traded.mul(capital, axis=0)
+            rates = pd.DataFrame({
+                asset: (costs.get(asset) if isinstance(costs, dict) else costs).rate(notional[asset].values)
+                for asset in traded.columns
+            }, index=traded.index)
+            cost = (traded * rates).sum(axis=1).clip(upper=1.0)
+
+    portfolio_returns = (1 + gross_returns) * (1 - cost) - 1
+    equity = initial_capital * (1 + portfolio_returns).cumprod()
+
+    drawdown = equity / equity.cummax() - 1
+
+    # Referencia: cartera equiponderada comprada al inicio de cada activo
+    first = prices.bfill().iloc[0]
+    hodl = initial_capital * (prices.ffill() / first).mean(axis=1)
+
+    n_periods = max(len(equity) - 1, 1)
+    total_return = equity.iloc[-1] / initial_capital - 1
+    vol = portfolio_returns.iloc[1:].std() * np.sqrt(periods_per_year)
+    metrics = {
+        'final': float(equity.iloc[-1]),
+        'return_pct': float(total_return * 100),
+        'annual_return_pct': float(((1 + total_return) ** (periods_per_year / n_periods) - 1) * 100),
+        'annual_vol_pct': float(vol * 100),
+        'sharpe': float(portfolio_returns.iloc[1:].mean() * periods_per_year / vol) if vol > 0 else np.nan,
+        'max_drawdown_pct': float(drawdown.min() * 100),
+        'turnover': float(turnover.sum()),
+        'annual_turnover': float(turnover.sum() * periods_per_year / n_periods),
+        'avg_exposure_pct': float(weights.sum(axis=1).mean() * 100),
+        'costs_paid': float((cost * equity / (1 - cost)).sum()),
+        'hodl_return_pct': float((hodl.iloc[-1] / initial_capital - 1) * 100)
+    }
+
+    return {
+        'equity': equity,
+        'drawdown': drawdown,
+        'weights': weights,
+        'traded': traded,
+        'turnover': turnover,
+        'cost': cost,
+        'hodl': hodl,
+        'asset_contribution': (held * returns).sum(),
+        'metrics': metrics
+    }
+
+
+def pivot_predictions(predictions, interval='1h'):
+    """
+    Predicciones (asset, timestamp, current_price, predicted_volatility, signal)
+    -> matrices tiempo x activos alineadas por vela
+
+    Returns:
+        (prices, volatility, signals)
+    """
+    df = predictions.copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.floor(f"{INTERVAL_MS[interval] // 60_000}min")
+    df = df.sort_values('timestamp').drop_duplicates(['timestamp', 'asset'], keep='last')
+    df['signal'] = df['signal'].map(SIGNAL_CODES)
+
+    index = pd.date_range(df['timestamp'].min(), df['timestamp'].max(), freq=f"{INTERVAL_MS[interval] // 60_000}min")
+    prices = df.pivot(index='timestamp', columns='asset', values='current_price').reindex(index).ffill()
+    volatility = df.pivot(index='timestamp', columns='asset', values='predicted_volatility').reindex(index).ffill()
+    # Sin predicción en una vela = mantener la posición
+    signals = df.pivot(index='timestamp', columns='asset', values='signal').reindex(index).fillna(HOLD)
+    return prices, volatility, signals
+
+
+def load_predictions(use_mirror=False):
+    """Predicciones de todos los activos (columnas mínimas)"""
+    columns = ['asset', 'timestamp', 'current_price', 'predicted_volatility', 'signal']
+    if use_mirror:
+        return load_mirror(columns=columns)
+
+    client = bigquery.Client(project=PROJECT_ID)
+    query = f"""
+    SELECT asset, timestamp, current_price, predicted_volatility, signal
+    FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+    WHERE predicted_volatility IS NOT NULL
+    ORDER BY timestamp
+    """
+    pages = list(iter_query_pages(client, query))
+    return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame(columns=columns)
+
+
+def signals_from_candles(assets, days=365, interval='1h', source=None):
+    """
+    Recalcular señales de run_garch desde velas para varios activos
+
+    La volatilidad viene de un solo ajuste GARCH(1,1) por activo (ver
+    threshold_sweep.precompute_volatility); los umbrales usan solo los
+    SIGNAL_HISTORY_DAYS anteriores a cada vela, como en run_garch.
+
+    Returns:
+        (prices, volatility, signals)
+    """
+    history = SIGNAL_HISTORY_DAYS * 24 * 3_600_000 // INTERVAL_MS[interval]
+    prices, volatility, signals = {}, {}, {}
+    for asset in assets:
+        print(f"   {asset}...")
+        data = fetch_candles(asset, days=days, interval=interval, source=source)
+        data['returns'] = 100 * data['Close'].pct_change()
+        data = data.dropna()
+        if len(data) < 100:
+            print(f"{Colors.YELLOW}⚠️  {asset}: datos insuficientes ({len(data)} velas), omitido{Colors.RESET}")
+            continue
+
+        vol = pd.Series(precompute_volatility(data['returns'].values), index=data.index)
+        rolling = data['returns'].rolling(SIGNAL_WINDOW).std()
+        high = rolling.rolling(history, min_periods=SIGNAL_WINDOW).quantile(SIGNAL_HIGH_QUANTILE)
+        low = rolling.rolling(history, min_periods=SIGNAL_WINDOW).quantile(SIGNAL_LOW_QUANTILE)
+        buffer = (high - low) * SIGNAL_BUFFER
+
+        prices[asset] = data['Close']
+        volatility[asset] = vol
+        signals[asset] = pd.Series(np.select([vol > high + buffer, vol < low - buffer], [SELL, BUY], HOLD),
+                                   index=data.index)
+
+    prices = pd.DataFrame(prices).ffill()
+    return prices, pd.DataFrame(volatility).ffill(), pd.DataFrame(signals).reindex(prices.index).fillna(HOLD)
+
+
+def print_results(result):
+    m = result['metrics']
+    n_assets = result['weights'].shape[1]
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'BACKTEST DE CARTERA (INVERSO DE VOLATILIDAD)'.center(80)}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.RESET}\n")
+
+    color = Colors.GREEN if m['return_pct'] >= m['hodl_return_pct'] else Colors.RED
+    print(f"   Activos:             {n_assets}")
+    print(f"   Velas:               {len(result['equity']):,}")
+    print(f"   Capital inicial:     ${INITIAL_CAPITAL:,.2f}")
+    print(f"   Capital final:       ${m['final']:,.2f}")
+    print(f"   Retorno:             {color}{m['return_pct']:+.2f}%{Colors.RESET} "
+          f"(HODL equiponderado {m['hodl_return_pct']:+.2f}%)")
+    print(f"   Retorno anualizado:  {m['annual_return_pct']:+.2f}%")
+    print(f"   Volatilidad anual:   {m['annual_vol_pct']:.2f}%")
+    print(f"   Sharpe:              {m['sharpe']:.2f}")
+    print(f"   Máximo drawdown:     {Colors.RED}{m['max_drawdown_pct']:.2f}%{Colors.RESET}")
+    print(f"   Rotación total:      {m['turnover']:.2f}x ({m['annual_turnover']:.1f}x anual)")
+    print(f"   Exposición media:    {m['avg_exposure_pct']:.1f}%")
+    print(f"   Costos pagados:      ${m['costs_paid']:,.2f}")
+
+    print(f"\n   {'Activo':<12}{'Peso medio':>12}{'Contribución':>14}")
+    contribution = result['asset_contribution'].sort_values(ascending=False)
+    for asset, value in contribution.items():
+        print(f"   {asset:<12}{result['weights'][asset].mean() * 100:>11.1f}%{value * 100:>+13.2f}%")
+    print()
+
+
+def _arg(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    interval = _arg(args, '--interval', '1h')
+    output = _arg(args, '--output', None)
+    periods_per_year = 365 * 24 * 3_600_000 // INTERVAL_MS[interval]
+
+    if '--assets' in args:
+        assets = _arg(args, '--assets', '').split(',')
+        days = int(_arg(args, '--days', 365))
+        print(f"📥 Recalculando señales desde {days} días de velas de {interval} ({len(assets)} activos)...")
+        prices, volatility, signals = signals_from_candles(assets, days, interval, _arg(args, '--source', None))
+    else:
+        use_mirror = '--local' in args
+        print(f"📥 Cargando predicciones ({'espejo Parquet' if use_mirror else 'BigQuery'})...")
+        predictions = load_predictions(use_mirror)
+        if predictions.empty:
+            print(f"{Colors.YELLOW}⚠️  No hay predicciones{Colors.RESET}")
+            return
+        prices, volatility, signals = pivot_predictions(predictions, interval)
+
+    if prices.empty or len(prices) < 2:
+        print(f"{Colors.YELLOW}⚠️  Datos insuficientes para el backtest{Colors.RESET}")
+        return
+
+    costs = None
+    if '--no-costs' not in args:
+        costs = {asset: CostModel.from_env(asset_to_symbol(asset)) for asset in prices.columns}
+
+    result = backtest(prices, volatility, signals, periods_per_year=periods_per_year, costs=costs)
+    print_results(result)
+
+    if output:
+        pd.DataFrame({
+            'equity': result['equity'],
+            'drawdown': result['drawdown'],
+            'turnover': result['turnover'],
+            'cost': result['cost'],
+            'hodl': result['hodl']
+        }).to_csv(output)
+        print(f"💾 Curva de equity guardada en {output}")
+
+
+if __name__ == "__main__":
+    main()
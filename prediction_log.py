@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Registro de Predicciones (SQLite)
+Predicciones indexadas por símbolo, tipo, estado y fecha de validación, con
+contadores agregados que se actualizan al validar (estadísticas en O(1))
+
+Uso:
+    python prediction_log.py import   # importar predictions_log.json antiguo
+    python prediction_log.py stats    # contadores agregados
+"""
+
+import os
+import sys
+import json
+import sqlite3
+
+PREDICTIONS_DB = "predictions_log.db"
+LEGACY_JSON_FILE = "predictions_log.json"
+
+
+class PredictionLog:
+    def __init__(self, path=PREDICTIONS_DB):
+        """Abrir (o crear) el registro de predicciones"""
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                id TEXT PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                prediction_type TEXT NOT NULL,
+                predicted_value TEXT,
+                current_price REAL,
+                prediction_time TEXT NOT NULL,
+                validation_time TEXT NOT NULL,
+                timeframe_hours REAL,
+                context TEXT,
+                validated INTEGER NOT NULL DEFAULT 0,
+                result TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_symbol ON predictions (symbol)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_type ON predictions (prediction_type)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pred_due ON predictions (validated, validation_time)")
+        # Un contador por (símbolo, tipo): las estadísticas nunca recorren el historial
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS prediction_stats (
+                symbol TEXT NOT NULL,
+                prediction_type TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                successful INTEGER NOT NULL DEFAULT 0,
+                accuracy_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (symbol, prediction_type)
+            )
+        """)
+        self.conn.commit()
+
+    def append(self, prediction):
+        """Añadir una predicción (dict con las mismas claves que el log JSON)"""
+        with self.conn:
+            self._insert(prediction)
+
+    def _insert(self, p):
+        self.conn.execute(
+            "INSERT OR IGNORE INTO predictions (id, symbol, prediction_type, predicted_value, current_price, "
+            "prediction_time, validation_time, timeframe_hours, context, validated, result) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                p['id'], p['symbol'], p['prediction_type'], json.dumps(p['predicted_value']),
+                p['current_price'], p['prediction_time'], p['validation_time'], p.get('timeframe_hours'),
+                json.dumps(p.get('context') or {}), int(bool(p.get('validated'))),
+                json.dumps(p['result']) if p.get('result') is not None else None
+            )
+        )
+
+    def due(self, now):
+        """Predicciones sin validar cuyo validation_time (ISO) ya pasó"""
+        rows = self.conn.execute(
+            "SELECT * FROM predictions WHERE validated = 0 AND validation_time <= ? ORDER BY validation_time",
+            (now,)
+        )
+        return [self._to_prediction(r) for r in rows]
+
+    def save_results(self, predictions, results):
+        """
+        Guardar resultados y actualizar contadores en una sola transacción
+
+        Args:
+            predictions: Predicciones validadas (dicts con id, symbol, prediction_type)
+            results: dict id -> resultado (las que no tienen resultado siguen pendientes)
+        """
+        counters = {}
+        with self.conn:
+            for p in predictions:
+                result = results.get(p['id'])
+                if result is None:
+                    continue
+                updated = self.conn.execute(
+                    "UPDATE predictions SET validated = 1, result = ? WHERE id = ? AND validated = 0",
+                    (json.dumps(result), p['id'])
+                ).rowcount
+                if not updated:
+                    continue
+                key = (p['symbol'], p['prediction_type'])
+                total, successful, accuracy = counters.get(key, (0, 0, 0.0))
+                counters[key] = (total + 1, successful + int(bool(result['success'])),
+                                 accuracy + float(result['accuracy']))
+
+            for (symbol, pred_type), (total, successful, accuracy) in counters.items():
+                self.conn.execute(
+                    "INSERT INTO prediction_stats (symbol, prediction_type, total, successful, accuracy_sum) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (symbol, prediction_type) DO UPDATE SET "
+                    "total = total + excluded.total, successful = successful + excluded.successful, "
+                    "accuracy_sum = accuracy_sum + excluded.accuracy_sum",
+                    (symbol, pred_type, total, successful, accuracy)
+                )
+
+    def stats(self):
+        """
+        Contadores agregados
+
+        Returns:
+            list de dicts: symbol, prediction_type, total, successful, accuracy_sum
+        """
+        return [dict(r) for r in self.conn.execute("SELECT * FROM prediction_stats")]
+
+    def rebuild_stats(self):
+        """Recalcular los contadores desde las predicciones validadas"""
+        with self.conn:
+            self.conn.execute("DELETE FROM prediction_stats")
+            self.conn.execute("""
+                INSERT INTO prediction_stats (symbol, prediction_type, total, successful, accuracy_sum)
+                SELECT symbol, prediction_type, COUNT(*),
+                       SUM(CASE WHEN json_extract(result, '$.success') THEN 1 ELSE 0 END),
+                       SUM(COALESCE(json_extract(result, '$.accuracy'), 0))
+                FROM predictions WHERE validated = 1
+                GROUP BY symbol, prediction_type
+            """)
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+    def import_legacy_json(self, json_path=LEGACY_JSON_FILE):
+        """
+        Importar el log antiguo (predictions_log.json) una sola vez
+
+        Returns:
+            int: Predicciones importadas
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r') as f:
+            predictions = json.load(f)
+        with self.conn:
+            for p in predictions:
+                self._insert(p)
+        self.rebuild_stats()
+        os.rename(json_path, json_path + ".imported")
+        return len(predictions)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _to_prediction(row):
+        return {
+            'id': row['id'],
+            'symbol': row['symbol'],
+            'prediction_type': row['prediction_type'],
+            'predicted_value': json.loads(row['predicted_value']),
+            'current_price': row['current_price'],
+            'prediction_time': row['prediction_time'],
+            'validation_time': row['validation_time'],
+            'timeframe_hours': row['timeframe_hours'],
+            'context': json.loads(row['context']) if row['context'] else {},
+            'validated': bool(row['validated']),
+            'result': json.loads(row['result']) if row['result'] else None
+        }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    log = PredictionLog()
+
+    if command == 'import':
+        imported = log.import_legacy_json()
+        print(f"✅ {imported} predicciones importadas desde {LEGACY_JSON_FILE}")
+    elif command == 'stats':
+        print(f"📊 {log.count()} predicciones registradas")
+        for row in log.stats():
+            print(f"   {row['symbol']} {row['prediction_type']}: {row['successful']}/{row['total']} exitosas")
+    else:
+        print(f"❌ Comando desconocido: {command} (usa 'import' o 'stats')")
+
+    log.close()
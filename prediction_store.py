@@ -0,0 +1,198 @@
+"""
+Prediction Store Module for GARCH Trading Bot
+Typed, flattened model parameter columns and a local Parquet mirror of predictions
+"""
+
+import os
+import glob
+import json
+from datetime import datetime
+import pandas as pd
+import pyarrow.parquet as pq
+
+try:
+    # Optional: BigQuery Storage Read API for faster streaming reads
+    from google.cloud import bigquery_storage
+except ImportError:
+    bigquery_storage = None
+
+
+# Local columnar mirror of garch_predictions
+# For Cloud Functions, use /tmp (same as the ChromaDB persist dir)
+PARQUET_MIRROR_DIR = "/tmp/garch_predictions_parquet"
+# Part files allowed before append_to_mirror merges them (about one day of hourly runs)
+MIRROR_COMPACT_PARTS = 24
+
+# Flattened model parameters and their types (BigQuery column -> Python type)
+PARAM_COLUMNS = {
+    'p': int,
+    'q': int,
+    'omega': float,
+    'alpha': float,
+    'beta': float,
+    'persistence': float,
+    'aic': float,
+    'bic': float,
+    'threshold_high': float,
+    'threshold_low': float
+}
+
+BIGQUERY_TYPES = {int: 'INT64', float: 'FLOAT64'}
+
+# Rows per page when streaming the predictions table
+PAGE_SIZE = 10000
+
+
+def flatten_model_params(params):
+    """
+    Flatten a model_params dict into typed columns
+
+    Args:
+        params (dict or str): Model parameters (dict or JSON string)
+
+    Returns:
+        dict: One typed value per column in PARAM_COLUMNS (None if missing)
+    """
+    if isinstance(params, str):
+        params = json.loads(params)
+    params = params or {}
+
+    columns = {}
+    for name, cast in PARAM_COLUMNS.items():
+        value = params.get(name)
+        columns[name] = cast(value) if value is not None else None
+    return columns
+
+
+def param_expr(name):
+    """
+    BigQuery expression for one typed parameter column
+
+    Rows written before the typed columns existed only have model_params,
+    so the column falls back to a server-side JSON_VALUE extraction.
+    """
+    bq_type = BIGQUERY_TYPES[PARAM_COLUMNS[name]]
+    return f"COALESCE({name}, SAFE_CAST(JSON_VALUE(model_params, '$.{name}') AS {bq_type}))"
+
+
+def param_select_sql(column_names=None):
+    """
+    SELECT expressions for the typed parameter columns
+
+    Args:
+        column_names (list): Subset of PARAM_COLUMNS to select (default: all)
+
+    Returns:
+        str: Comma-separated SQL expressions
+    """
+    expressions = [f"{param_expr(name)} AS {name}" for name in column_names or PARAM_COLUMNS]
+    return ",\n        ".join(expressions)
+
+
+def iter_query_pages(client, query, page_size=PAGE_SIZE):
+    """
+    Stream the results of a query as one DataFrame per page
+
+    Uses the BigQuery Storage Read API when google-cloud-bigquery-storage is
+    installed, otherwise paged REST results. Only one page is held in memory.
+
+    Args:
+        client (bigquery.Client): BigQuery client
+        query (str): SQL query
+        page_size (int): Rows per page
+
+    Yields:
+        pd.DataFrame: One page of results
+    """
+    bqstorage_client = bigquery_storage.BigQueryReadClient() if bigquery_storage else None
+    rows = client.query(query).result(page_size=page_size)
+    for page in rows.to_dataframe_iterable(bqstorage_client=bqstorage_client):
+        yield page
+
+
+def append_to_mirror(row, mirror_dir=PARQUET_MIRROR_DIR, compact_parts=MIRROR_COMPACT_PARTS):
+    """
+    Append one prediction row to the local Parquet mirror
+
+    Each insert writes a small part file; once `compact_parts` of them have
+    accumulated they are merged with compact_mirror(), so the mirror stays at
+    a handful of files.
+
+    Args:
+        row (dict): Prediction row as inserted into BigQuery
+        mirror_dir (str): Mirror directory
+        compact_parts (int): Part files that trigger a compaction (None to never compact)
+
+    Returns:
+        str: Path of the written part file (merged away if this insert compacted)
+    """
+    os.makedirs(mirror_dir, exist_ok=True)
+
+    record = {k: v for k, v in row.items() if k != 'model_params'}
+    df = pd.DataFrame([record])
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+
+    path = os.path.join(mirror_dir, f"part-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}.parquet")
+    df.to_parquet(path, index=False)
+
+    if compact_parts and len(glob.glob(os.path.join(mirror_dir, "part-*.parquet"))) >= compact_parts:
+        compact_mirror(mirror_dir)
+    return path
+
+
+def compact_mirror(mirror_dir=PARQUET_MIRROR_DIR):
+    """
+    Merge all part files of the mirror into a single sorted Parquet file
+
+    Returns:
+        int: Number of rows in the compacted mirror
+    """
+    parts = sorted(glob.glob(os.path.join(mirror_dir, "*.parquet")))
+    if len(parts) <= 1:
+        return len(pd.read_parquet(parts[0])) if parts else 0
+
+    df = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True)
+    df = df.sort_values('timestamp').reset_index(drop=True)
+
+    compacted = os.path.join(mirror_dir, f"compacted-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}.parquet")
+    df.to_parquet(compacted, index=False)
+    for p in parts:
+        os.remove(p)
+
+    return len(df)
+
+
+def load_mirror(columns=None, mirror_dir=PARQUET_MIRROR_DIR):
+    """
+    Load the local Parquet mirror
+
+    Args:
+        columns (list): Columns to read (default: all)
+        mirror_dir (str): Mirror directory
+
+    Returns:
+        pd.DataFrame: Predictions sorted by timestamp (empty if no mirror)
+    """
+    parts = sorted(glob.glob(os.path.join(mirror_dir, "*.parquet")))
+    if not parts:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.concat([pd.read_parquet(p, columns=columns) for p in parts], ignore_index=True)
+    if 'timestamp' in df.columns:
+        df = df.sort_values('timestamp').reset_index(drop=True)
+    return df
+
+
+def iter_mirror(columns=None, batch_size=PAGE_SIZE, mirror_dir=PARQUET_MIRROR_DIR):
+    """
+    Stream the local Parquet mirror in record batches
+
+    Part files are read in name order (compacted file first, then parts in
+    insertion order), so batches come out in timestamp order.
+
+    Yields:
+        pd.DataFrame: One batch of predictions
+    """
+    for path in sorted(glob.glob(os.path.join(mirror_dir, "*.parquet"))):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Control de Rate Limit para la API de Binance
+Un gobernador compartido por todos los clientes del proceso: estima el peso
+de cada request, lo corrige con el header X-MBX-USED-WEIGHT-1M y espera lo
+necesario para no pasar del límite (evita 429 y baneos 418)
+"""
+
+import time
+import asyncio
+import threading
+from urllib.parse import urlparse
+from binance import AsyncClient
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+# Límite de peso por minuto e IP (GET /api/v3/exchangeInfo -> rateLimits)
+REQUEST_WEIGHT_LIMIT = 6000
+# Fracción del límite que nos permitimos usar (margen para otros procesos)
+SAFETY_FACTOR = 0.9
+# Reintentos cuando Binance devuelve 429
+MAX_RETRIES = 3
+
+
+def _depth_weight(params):
+    limit = int(params.get('limit', 100))
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 25
+    if limit <= 1000:
+        return 50
+    return 250
+
+
+# Peso de los endpoints usados en este repo (los demás cuentan como DEFAULT_WEIGHT)
+ENDPOINT_WEIGHTS = {
+    '/api/v3/ping': lambda p: 1,
+    '/api/v3/time': lambda p: 1,
+    '/api/v3/exchangeInfo': lambda p: 20,
+    '/api/v3/ticker/price': lambda p: 2 if 'symbol' in p else 4,
+    '/api/v3/ticker/24hr': lambda p: 2 if 'symbol' in p else 80,
+    '/api/v3/depth': _depth_weight,
+    '/api/v3/trades': lambda p: 25,
+    '/api/v3/klines': lambda p: 2,
+    '/api/v3/account': lambda p: 20,
+    '/api/v3/openOrders': lambda p: 6 if 'symbol' in p else 80,
+    '/api/v3/order': lambda p: 1,
+}
+DEFAULT_WEIGHT = 2
+
+
+def request_weight(uri, params=None):
+    """Peso estimado de un request a partir de su ruta y parámetros"""
+    path = urlparse(uri).path
+    weight = ENDPOINT_WEIGHTS.get(path)
+    return weight(params or {}) if weight else DEFAULT_WEIGHT
+
+
+class RateLimitGovernor:
+    """
+    Presupuesto de peso por ventana de un minuto
+
+    Binance cuenta el peso en ventanas fijas alineadas al minuto. Antes de
+    cada request se reserva su peso estimado; después, el valor real del
+    header reemplaza la estimación.
+    """
+
+    def __init__(self, limit=REQUEST_WEIGHT_LIMIT, safety_factor=SAFETY_FACTOR):
+        self.limit = limit
+        self.budget = int(limit * safety_factor)
+        self.used = 0
+        self.blocked_until = 0.0
+        self._window = self._current_window()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _current_window():
+        return int(time.time() // 60)
+
+    def _roll_window(self):
+        window = self._current_window()
+        if window != self._window:
+            self._window = window
+            self.used = 0
+
+    def _reserve(self, weight):
+        """Reservar el peso si hay presupuesto; si no, segundos a esperar"""
+        with self._lock:
+            now = time.time()
+            if now >= self.blocked_until:
+                self._roll_window()
+                if self.used + weight <= self.budget:
+                    self.used += weight
+                    return 0
+                wait = (self._window + 1) * 60 - now
+            else:
+                wait = self.blocked_until - now
+        return max(wait, 0.01)
+
+    def acquire(self, weight):
+        """Bloquear hasta que haya presupuesto para un request de este peso"""
+        while True:
+            wait = self._reserve(weight)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, weight):
+        """Como acquire, sin bloquear el event loop (clientes asyncio)"""
+        while True:
+            wait = self._reserve(weight)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def update(self, response):
+        """Sincronizar con los headers de la respuesta (X-MBX-USED-WEIGHT-1M, Retry-After)"""
+        if response is None:
+            return
+        headers = response.headers
+        used = headers.get('X-MBX-USED-WEIGHT-1M') or headers.get('X-MBX-USED-WEIGHT')
+        # requests: status_code, aiohttp: status
+        status = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+        with self._lock:
+            if used is not None:
+                self._roll_window()
+                self.used = int(used)
+            if status in (418, 429):
+                retry_after = float(headers.get('Retry-After', 60))
+                self.blocked_until = max(self.blocked_until, time.time() + retry_after)
+
+    def remaining(self):
+        with self._lock:
+            self._roll_window()
+            return self.budget - self.used
+
+
+# Un único gobernador por proceso: el límite es por IP, no por cliente
+GOVERNOR = RateLimitGovernor()
+
+
+class GovernedClient(Client):
+    """binance.client.Client que pasa cada request por el gobernador compartido"""
+
+    def __init__(self, *args, governor=None, **kwargs):
+        self.governor = governor or GOVERNOR
+        super().__init__(*args, **kwargs)
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        data = kwargs.get('data')
+        weight = request_weight(uri, data if isinstance(data, dict) else None)
+
+        for attempt in range(MAX_RETRIES + 1):
+            self.governor.acquire(weight)
+            self.response = None
+            # El cliente firma modificando 'data'; cada intento parte de una copia limpia
+            attempt_kwargs = dict(kwargs)
+            if isinstance(data, dict):
+                attempt_kwargs['data'] = dict(data)
+            try:
+                return super()._request(method, uri, signed, force_params, **attempt_kwargs)
+            except BinanceAPIException as e:
+                # 429: esperar Retry-After y reintentar; 418 (baneo) no se reintenta
+                if e.status_code != 429 or attempt == MAX_RETRIES:
+                    raise
+            finally:
+                self.governor.update(self.response)
+
+
+class GovernedAsyncClient(AsyncClient):
+    """binance.AsyncClient que pasa cada request por el gobernador compartido"""
+
+    def __init__(self, *args, governor=None, **kwargs):
+        self.governor = governor or GOVERNOR
+        super().__init__(*args, **kwargs)
+
+    async def _request(self, method, uri, signed, force_params=False, **kwargs):
+        data = kwargs.get('data')
+        weight = request_weight(uri, data if isinstance(data, dict) else None)
+
+        for attempt in range(MAX_RETRIES + 1):
+            await self.governor.acquire_async(weight)
+            self.response = None
+            attempt_kwargs = dict(kwargs)
+            if isinstance(data, dict):
+                attempt_kwargs['data'] = dict(data)
+            try:
+                return await super()._request(method, uri, signed, force_params, **attempt_kwargs)
+            except BinanceAPIException as e:
+                if e.status_code != 429 or attempt == MAX_RETRIES:
+                    raise
+            finally:
+                self.governor.update(self.response)
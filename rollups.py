@@ -0,0 +1,313 @@
+"""
+Rollup Tables for GARCH Trading Bot
+Pre-aggregated hourly/daily summaries and portfolio state per asset
+
+run_garch updates the rollups on every insert, so /stats, /api/predictions
+and report generation read a handful of summary rows instead of scanning
+garch_predictions.
+"""
+
+from datetime import datetime
+
+from analytics_sql import _std, _float, _iso, upsert
+from cost_model import CostModel
+from market_data import asset_to_symbol
+
+
+ROLLUP_TABLE_ID = "garch_rollups"
+PORTFOLIO_TABLE_ID = "garch_portfolio_state"
+
+INITIAL_CAPITAL = 1000
+
+# Bucket start format per granularity (ISO strings sort chronologically)
+GRANULARITIES = {
+    'hour': '%Y-%m-%dT%H:00:00',
+    'day': '%Y-%m-%dT00:00:00'
+}
+
+# Column -> BigQuery type (same schemas as the bq mk commands in the README)
+ROLLUP_SCHEMA = {
+    'asset': 'STRING', 'granularity': 'STRING', 'bucket_start': 'TIMESTAMP', 'n': 'INT64',
+    'vol_sum': 'FLOAT64', 'vol_sumsq': 'FLOAT64', 'vol_min': 'FLOAT64', 'vol_max': 'FLOAT64',
+    'price_open': 'FLOAT64', 'price_close': 'FLOAT64', 'price_min': 'FLOAT64', 'price_max': 'FLOAT64',
+    'buy_count': 'INT64', 'sell_count': 'INT64', 'hold_count': 'INT64',
+    'persistence_sum': 'FLOAT64', 'persistence_n': 'INT64',
+    'last_signal': 'STRING', 'first_ts': 'TIMESTAMP', 'last_ts': 'TIMESTAMP'
+}
+
+PORTFOLIO_SCHEMA = {
+    'asset': 'STRING', 'cash': 'FLOAT64', 'holdings': 'FLOAT64', 'first_price': 'FLOAT64',
+    'last_price': 'FLOAT64', 'last_signal': 'STRING', 'trades': 'INT64', 'updated_at': 'TIMESTAMP'
+}
+
+ROLLUP_COLUMNS = list(ROLLUP_SCHEMA)
+PORTFOLIO_COLUMNS = list(PORTFOLIO_SCHEMA)
+
+# Columns merged on update ({old}: existing row, {new}: incoming row)
+_ROLLUP_UPDATES = {
+    'n': '{old}.n + {new}.n',
+    'vol_sum': '{old}.vol_sum + {new}.vol_sum',
+    'vol_sumsq': '{old}.vol_sumsq + {new}.vol_sumsq',
+    'vol_min': '{least}({old}.vol_min, {new}.vol_min)',
+    'vol_max': '{greatest}({old}.vol_max, {new}.vol_max)',
+    'price_close': '{new}.price_close',
+    'price_min': '{least}({old}.price_min, {new}.price_min)',
+    'price_max': '{greatest}({old}.price_max, {new}.price_max)',
+    'buy_count': '{old}.buy_count + {new}.buy_count',
+    'sell_count': '{old}.sell_count + {new}.sell_count',
+    'hold_count': '{old}.hold_count + {new}.hold_count',
+    'persistence_sum': '{old}.persistence_sum + {new}.persistence_sum',
+    'persistence_n': '{old}.persistence_n + {new}.persistence_n',
+    'last_signal': '{new}.last_signal',
+    'last_ts': '{new}.last_ts'
+}
+
+_PORTFOLIO_UPDATES = {c: '{new}.' + c for c in PORTFOLIO_COLUMNS if c != 'asset'}
+
+
+def create_rollup_tables(backend):
+    """Create the rollup tables on the SQLite stand-in (BigQuery: see README)"""
+    backend.execute(f"""
+        CREATE TABLE IF NOT EXISTS {backend.table_ref(ROLLUP_TABLE_ID)} (
+            asset TEXT, granularity TEXT, bucket_start TEXT, n INTEGER,
+            vol_sum REAL, vol_sumsq REAL, vol_min REAL, vol_max REAL,
+            price_open REAL, price_close REAL, price_min REAL, price_max REAL,
+            buy_count INTEGER, sell_count INTEGER, hold_count INTEGER,
+            persistence_sum REAL, persistence_n INTEGER,
+            last_signal TEXT, first_ts TEXT, last_ts TEXT,
+            PRIMARY KEY (asset, granularity, bucket_start)
+        )
+    """)
+    backend.execute(f"""
+        CREATE TABLE IF NOT EXISTS {backend.table_ref(PORTFOLIO_TABLE_ID)} (
+            asset TEXT PRIMARY KEY, cash REAL, holdings REAL, first_price REAL,
+            last_price REAL, last_signal TEXT, trades INTEGER, updated_at TEXT
+        )
+    """)
+
+
+def update_rollups(backend, row):
+    """
+    Fold one prediction row (as inserted by run_garch) into the rollups
+
+    Updates the hourly and daily buckets of the row's asset and steps the
+    asset's simulated portfolio. Cost is O(1) per insert.
+
+    Args:
+        backend: analytics_sql backend
+        row (dict): Prediction row
+    """
+    ts = datetime.fromisoformat(row['timestamp'])
+    vol = float(row['predicted_volatility'])
+    price = float(row['current_price'])
+    signal = row['signal']
+    persistence = row.get('persistence')
+    if persistence is None:
+        # Rows without the stored value: GARCH(1,1) alpha + beta, when fitted
+        alpha = row.get('alpha') or 0
+        persistence = alpha + (row.get('beta') or 0) if alpha > 0 else None
+
+    for granularity, bucket_format in GRANULARITIES.items():
+        values = {
+            'asset': row['asset'],
+            'granularity': granularity,
+            'bucket_start': ts.strftime(bucket_format),
+            'n': 1,
+            'vol_sum': vol,
+            'vol_sumsq': vol * vol,
+            'vol_min': vol,
+            'vol_max': vol,
+            'price_open': price,
+            'price_close': price,
+            'price_min': price,
+            'price_max': price,
+            'buy_count': int(signal == 'BUY'),
+            'sell_count': int(signal == 'SELL'),
+            'hold_count': int(signal == 'HOLD'),
+            'persistence_sum': float(persistence) if persistence is not None else 0.0,
+            'persistence_n': int(persistence is not None),
+            'last_signal': signal,
+            'first_ts': row['timestamp'],
+            'last_ts': row['timestamp']
+        }
+        upsert(backend, ROLLUP_TABLE_ID, ['asset', 'granularity', 'bucket_start'], values, _ROLLUP_UPDATES, ROLLUP_SCHEMA)
+
+    state = get_portfolio_state(backend, row['asset'])
+    state = step_portfolio(state, price, signal, costs=CostModel.from_env(asset_to_symbol(row['asset'])))
+    state['asset'] = row['asset']
+    state['updated_at'] = row['timestamp']
+    upsert(backend, PORTFOLIO_TABLE_ID, ['asset'], state, _PORTFOLIO_UPDATES, PORTFOLIO_SCHEMA)
+
+
+def step_portfolio(state, price, signal, costs=None):
+    """
+    Advance the simulated $1000 portfolio by one prediction
+
+    Same rules as main.calculate_portfolio_performance: start fully invested
+    at the first price, then trade only when the signal changes.
+
+    Args:
+        state (dict or None): Current state (None before the first prediction)
+        price (float): Prediction price
+        signal (str): BUY/SELL/HOLD
+        costs (CostModel): Charged on every trade (None: no costs)
+
+    Returns:
+        dict: New state
+    """
+    costs = costs or CostModel.zero()
+    if state is None:
+        return {
+            'cash': 0.0,
+            'holdings': INITIAL_CAPITAL * (1 - costs.rate(INITIAL_CAPITAL)) / price,
+            'first_price': price,
+            'last_price': price,
+            'last_signal': None,
+            'trades': 0
+        }
+
+    state = dict(state)
+    if signal != state['last_signal']:
+        if signal == 'SELL' and state['holdings'] > 0:
+            notional = state['holdings'] * price
+            state['cash'] = notional * (1 - costs.rate(notional))
+            state['holdings'] = 0.0
+            state['trades'] += 1
+        elif signal == 'BUY' and state['cash'] > 0:
+            state['holdings'] = state['cash'] * (1 - costs.rate(state['cash'])) / price
+            state['cash'] = 0.0
+            state['trades'] += 1
+    state['last_signal'] = signal
+    state['last_price'] = price
+    return state
+
+
+def get_portfolio_state(backend, asset):
+    """Current portfolio state of an asset (None if it has no predictions yet)"""
+    rows = backend.query(
+        f"SELECT cash, holdings, first_price, last_price, last_signal, trades "
+        f"FROM {backend.table_ref(PORTFOLIO_TABLE_ID)} WHERE asset = {backend.placeholder('asset')}",
+        {'asset': asset}
+    )
+    return rows[0] if rows else None
+
+
+def portfolio_stats(state, costs=None):
+    """
+    Portfolio state -> same dict as main.calculate_portfolio_performance
+
+    Args:
+        state (dict or None): Portfolio state (get_portfolio_state)
+        costs (CostModel): The model the state was built with; HODL pays
+            the same entry charge (None: no costs)
+    """
+    if not state:
+        return {
+            "initial": INITIAL_CAPITAL,
+            "current": INITIAL_CAPITAL,
+            "return_pct": 0,
+            "vs_hodl": 0,
+            "trades": 0
+        }
+
+    costs = costs or CostModel.zero()
+    current_value = state['cash'] + state['holdings'] * state['last_price']
+    hodl_value = INITIAL_CAPITAL * (1 - costs.rate(INITIAL_CAPITAL)) / state['first_price'] * state['last_price']
+    return {
+        "initial": INITIAL_CAPITAL,
+        "current": round(current_value, 2),
+        "return_pct": round(((current_value - INITIAL_CAPITAL) / INITIAL_CAPITAL) * 100, 2),
+        "vs_hodl": round(((current_value - hodl_value) / hodl_value) * 100, 2),
+        "hodl_value": round(hodl_value, 2),
+        "trades": state['trades']
+    }
+
+
+def _window(backend, hours, asset):
+    """WHERE clause over hourly buckets in the last `hours` hours"""
+    where = f"WHERE granularity = 'hour' AND bucket_start >= {backend.since(hours)}"
+    params = {}
+    if asset:
+        where += f" AND asset = {backend.placeholder('asset')}"
+        params['asset'] = asset
+    return where, params
+
+
+def rollup_stats(backend, hours=24, asset=None):
+    """
+    /stats figures from the hourly rollups (at most `hours` + 1 rows per asset)
+
+    Returns:
+        dict: total, avg_vol, max_price, min_price
+    """
+    where, params = _window(backend, hours, asset)
+    row = backend.query(f"""
+    SELECT
+        SUM(n) AS total,
+        SUM(vol_sum) / SUM(n) AS avg_vol,
+        MAX(price_max) AS max_price,
+        MIN(price_min) AS min_price
+    FROM {backend.table_ref(ROLLUP_TABLE_ID)}
+    {where}
+    """, params)[0]
+    return {
+        'total': row['total'] or 0,
+        'avg_vol': _float(row['avg_vol']),
+        'max_price': _float(row['max_price']),
+        'min_price': _float(row['min_price'])
+    }
+
+
+def rollup_report_summary(backend, hours=24, asset=None):
+    """
+    Same dict as analytics_sql.report_summary, from the hourly rollups
+
+    Returns:
+        dict or None: Summary statistics (None if there are no rollups)
+    """
+    table = backend.table_ref(ROLLUP_TABLE_ID)
+    where, params = _window(backend, hours, asset)
+    row = backend.query(f"""
+    SELECT
+        SUM(n) AS n,
+        SUM(vol_sum) AS vol_sum,
+        SUM(vol_sumsq) AS vol_sumsq,
+        MIN(vol_min) AS vol_min,
+        MAX(vol_max) AS vol_max,
+        MIN(price_min) AS price_min,
+        MAX(price_max) AS price_max,
+        SUM(buy_count) AS buy_count,
+        SUM(sell_count) AS sell_count,
+        SUM(hold_count) AS hold_count,
+        SUM(persistence_sum) AS persistence_sum,
+        SUM(persistence_n) AS persistence_n,
+        MAX(last_ts) AS last_timestamp,
+        (SELECT price_close FROM {table} {where} ORDER BY last_ts DESC LIMIT 1) AS last_price,
+        (SELECT last_signal FROM {table} {where} ORDER BY last_ts DESC LIMIT 1) AS last_signal,
+        (SELECT price_open FROM {table} {where} ORDER BY first_ts ASC LIMIT 1) AS first_price
+    FROM {table}
+    {where}
+    """, params)[0]
+
+    n = row['n'] or 0
+    if n == 0:
+        return None
+
+    return {
+        'count': n,
+        'last_price': float(row['last_price']),
+        'first_price': float(row['first_price']),
+        'last_signal': row['last_signal'],
+        'price_min': float(row['price_min']),
+        'price_max': float(row['price_max']),
+        'price_change_pct': (row['last_price'] - row['first_price']) / row['first_price'] * 100,
+        'vol_mean': row['vol_sum'] / n,
+        'vol_std': _std(n, row['vol_sum'], row['vol_sumsq'], ddof=0),
+        'vol_min': float(row['vol_min']),
+        'vol_max': float(row['vol_max']),
+        'persistence': row['persistence_sum'] / row['persistence_n'] if row['persistence_n'] else float('nan'),
+        'buy_pct': row['buy_count'] / n * 100,
+        'sell_pct': row['sell_count'] / n * 100,
+        'hold_pct': row['hold_count'] / n * 100,
+        'last_timestamp': _iso(row['last_timestamp'])
+    }
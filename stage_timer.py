@@ -0,0 +1,42 @@
+"""
+Stage Timer for GARCH Trading Bot
+Wall-clock time of the consecutive stages of a request; run_garch reports
+them in its response and benchmark_garch.py aggregates them
+"""
+
+import time
+
+
+class StageTimer:
+    """
+    Lap timer: each lap(name) records the time since the previous lap
+
+        timer = StageTimer()
+        data = fetch(...)
+        timer.lap('download')
+
+    Repeated names accumulate.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._last = self._start
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - self._last
+        self._last = now
+        return self.stages[name]
+
+    def total(self):
+        return self._last - self._start
+
+    def as_dict(self, digits=4):
+        """Seconds per stage plus 'total'"""
+        timings = {name: round(seconds, digits) for name, seconds in self.stages.items()}
+        timings['total'] = round(self.total(), digits)
+        return timings
+
+    def summary(self):
+        return ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.stages.items())
@@ -0,0 +1,285 @@
+"""
+Streaming Statistics for GARCH Trading Bot
+Constant-memory accumulators for analytics over arbitrarily long prediction histories
+"""
+
+import math
+from collections import deque
+import numpy as np
+
+
+class RunningStats:
+    """
+    Count, mean, variance, min and max updated one batch at a time
+
+    Batches are merged with Chan's parallel variant of Welford's algorithm,
+    so each page of data is reduced with NumPy and then discarded.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Add a batch of values (NaNs are ignored)"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        n_b = len(values)
+        if n_b == 0:
+            return
+
+        mean_b = values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self._m2 += m2_b + delta ** 2 * self.count * n_b / n
+        self.count = n
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def merge(self, other):
+        """Merge another RunningStats into this one"""
+        if other.count == 0:
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self._m2 += other._m2 + delta ** 2 * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self, ddof=1):
+        if self.count - ddof <= 0:
+            return np.nan
+        return self._m2 / (self.count - ddof)
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.variance(ddof)))
+
+
+class P2Quantile:
+    """
+    Streaming quantile estimate with the P² algorithm (Jain & Chlamtac, 1985)
+
+    Keeps five markers regardless of how many values are observed.
+    """
+
+    def __init__(self, q):
+        self.q = q
+        self.count = 0
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self._increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def update(self, x):
+        """Add one observation"""
+        if x != x:  # NaN
+            return
+        self.count += 1
+
+        if self.count <= 5:
+            self._heights.append(x)
+            self._heights.sort()
+            return
+
+        h = self._heights
+        n = self._positions
+
+        # Find cell k containing x and adjust extreme markers
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # Adjust the three middle markers
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not h[i - 1] < candidate < h[i + 1]:
+                    candidate = h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+                h[i] = candidate
+                n[i] += d
+
+    def extend(self, values):
+        """Add a batch of observations"""
+        for x in np.asarray(values, dtype=float):
+            self.update(float(x))
+
+    def value(self):
+        """Current quantile estimate (exact while fewer than 5 values)"""
+        if self.count == 0:
+            return np.nan
+        if self.count <= 5:
+            return float(np.percentile(self._heights, self.q * 100))
+        return float(self._heights[2])
+
+    def _parabolic(self, i, d):
+        h = self._heights
+        n = self._positions
+        return h[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def to_dict(self):
+        return {
+            'q': self.q,
+            'count': self.count,
+            'heights': list(self._heights),
+            'positions': list(self._positions),
+            'desired': list(self._desired)
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        estimator = cls(d['q'])
+        estimator.count = d['count']
+        estimator._heights = list(d['heights'])
+        estimator._positions = list(d['positions'])
+        estimator._desired = list(d['desired'])
+        return estimator
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy (log-spaced bins, as in DDSketch)
+
+    Each positive value is counted in the bin [gamma^(i-1), gamma^i), so any
+    quantile is returned within `relative_accuracy` of the exact order
+    statistic. Unlike P², sketches of separate blocks can be merged, which
+    lets callers keep a sliding window of blocks.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, x):
+        """Add one observation (non-positive values share a zero bin)"""
+        if x != x:  # NaN
+            return
+        self.count += 1
+        if x <= 0:
+            self.zero_count += 1
+            return
+        i = math.ceil(math.log(x) / self._log_gamma)
+        self.bins[i] = self.bins.get(i, 0) + 1
+
+    def merge(self, other):
+        """Add the counts of another sketch with the same accuracy"""
+        for i, n in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def _value_at(self, rank, sorted_bins):
+        """Estimate of the order statistic with 0-based `rank`"""
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for i, n in sorted_bins:
+            seen += n
+            if rank < seen:
+                return 2 * self._gamma ** i / (self._gamma + 1)
+        return 2 * self._gamma ** sorted_bins[-1][0] / (self._gamma + 1)
+
+    def quantile(self, q):
+        """
+        Quantile estimate, interpolated between order statistics like
+        np.percentile (NaN while empty)
+        """
+        if self.count == 0:
+            return np.nan
+        sorted_bins = sorted(self.bins.items())
+        rank = q * (self.count - 1)
+        lower = self._value_at(math.floor(rank), sorted_bins)
+        upper = self._value_at(math.ceil(rank), sorted_bins)
+        return float(lower + (upper - lower) * (rank - math.floor(rank)))
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(i): n for i, n in self.bins.items()},
+            'zero_count': self.zero_count
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d['relative_accuracy'])
+        sketch.bins = {int(i): int(n) for i, n in d['bins'].items()}
+        sketch.zero_count = int(d['zero_count'])
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+class RollingStd:
+    """
+    Standard deviation of the last `window` values, O(1) per value
+
+    Mean and sum of squared deviations are slid with Welford's update (one
+    value in, one out), so no window is ever rescanned. Matches pandas
+    rolling(window).std(): NaN until the window is full.
+    """
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self._values = deque(maxlen=window)
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        """Add one value and return the current std"""
+        x = float(x)
+        if len(self._values) < self.window:
+            self._values.append(x)
+            n = len(self._values)
+            delta = x - self._mean
+            self._mean += delta / n
+            self._m2 += delta * (x - self._mean)
+        else:
+            old = self._values[0]
+            self._values.append(x)
+            old_mean = self._mean
+            self._mean += (x - old) / self.window
+            self._m2 += (x - old) * (x - self._mean + old - old_mean)
+        return self.std()
+
+    def std(self):
+        if len(self._values) < self.window or self.window - self.ddof <= 0:
+            return np.nan
+        return float(np.sqrt(max(self._m2, 0.0) / (self.window - self.ddof)))
+
+    def to_dict(self):
+        return {'window': self.window, 'ddof': self.ddof, 'values': list(self._values)}
+
+    @classmethod
+    def from_dict(cls, d):
+        rolling = cls(d['window'], d.get('ddof', 1))
+        for x in d['values']:
+            rolling.update(x)
+        return rolling
@@ -6,7 +6,7 @@ Obtiene información de precios, orderbook, y datos históricos
 
 import os
 from dotenv import load_dotenv
-from binance.client import Client
+from rate_limit import GovernedClient
 from binance.exceptions import BinanceAPIException
 import sys
 from datetime import datetime, timedelta
@@ -56,7 +56,7 @@ def test_market_data():
         sys.exit(1)
 
     try:
-        client = Client(
+        client = GovernedClient(
             api_key=api_key,
             api_secret=secret_key,
             testnet=use_testnet
@@ -129,7 +129,7 @@ def test_market_data():
         print_info(f"Test 5: Obteniendo velas (últimas 5 horas)...")
         klines = client.get_klines(
             symbol=trading_pair,
-            interval=Client.KLINE_INTERVAL_1HOUR,
+            interval=GovernedClient.KLINE_INTERVAL_1HOUR,
             limit=5
         )
 
@@ -218,6 +218,9 @@ def test_market_data():
         print_info("Próximo paso: python test_binance_trading.py")
         print()
 
+        print_info(f"Peso de API usado este minuto: {client.governor.used}/{client.governor.limit}")
+        print()
+
         return True
 
     except BinanceAPIException as e:
@@ -4,7 +4,7 @@ Test de Binance usando SOLO datos públicos
 NO requiere API Keys ni permisos especiales
 """
 
-from binance.client import Client
+from rate_limit import GovernedClient
 from binance.exceptions import BinanceAPIException
 import sys
 from datetime import datetime
@@ -43,7 +43,7 @@ def main():
 
     try:
         # Crear cliente público (sin credenciales)
-        client = Client("", "", testnet=True)
+        client = GovernedClient("", "", testnet=True)
 
         # Test 1: Conectividad
         print_info("Test 1: Verificando conectividad con Binance Testnet...")
@@ -158,7 +158,7 @@ def main():
         print_info("Test 7: Velas de BTC/USDT (últimas 5 horas)...")
         klines = client.get_klines(
             symbol="BTCUSDT",
-            interval=Client.KLINE_INTERVAL_1HOUR,
+            interval=GovernedClient.KLINE_INTERVAL_1HOUR,
             limit=5
         )
 
@@ -231,6 +231,9 @@ def main():
         print_data("  • Análisis técnico con IA (Gemini)")
         print()
 
+        print_info(f"Peso de API usado este minuto: {client.governor.used}/{client.governor.limit}")
+        print()
+
         return True
 
     except BinanceAPIException as e:
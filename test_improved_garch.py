@@ -9,6 +9,7 @@ import pandas as pd
 import numpy as np
 from arch import arch_model
 from datetime import datetime, timedelta
+from cost_model import CostModel
 
 class Colors:
     GREEN = '\033[92m'
@@ -69,10 +70,11 @@ def generate_signals_new(volatilities):
 
     return signals, threshold_low, threshold_high
 
-def simulate_strategy(prices, signals):
-    """Simular trading con señales"""
+def simulate_strategy(prices, signals, costs=None):
+    """Simular trading con señales (costs: CostModel por trade, None = sin costos)"""
     if len(prices) != len(signals):
         return None
+    costs = costs or CostModel.zero()
 
     initial_capital = 1000
     cash = 0
@@ -83,7 +85,7 @@ def simulate_strategy(prices, signals):
     # Empezar con primera señal
     first_price = prices[0]
     if signals[0] == 'BUY':
-        btc = initial_capital / first_price
+        btc = initial_capital * (1 - costs.rate(initial_capital)) / first_price
         position = 'BUY'
     else:
         cash = initial_capital
@@ -95,12 +97,12 @@ def simulate_strategy(prices, signals):
 
         if signal != position:
             if signal == 'SELL' and btc > 0:
-                cash = btc * price
+                cash = btc * price * (1 - costs.rate(btc * price))
                 btc = 0
                 trades.append({'type': 'SELL', 'price': price, 'index': i})
                 position = 'SELL'
             elif signal == 'BUY' and cash > 0:
-                btc = cash / price
+                btc = cash * (1 - costs.rate(cash)) / price
                 cash = 0
                 trades.append({'type': 'BUY', 'price': price, 'index': i})
                 position = 'BUY'
@@ -182,6 +184,11 @@ def run_comparison_test():
     print_success(f"Volatilidades calculadas: {len(volatilities)}")
     print()
 
+    # Comisión, spread y slippage por trade (ver cost_model.py)
+    costs = CostModel.from_env("BTCUSDT")
+    print_info(f"Costos por trade: {costs}")
+    print()
+
     # Estadísticas de volatilidad
     print_info("📊 Estadísticas de Volatilidad:")
     print(f"   Promedio: {np.mean(volatilities):.4f}%")
@@ -215,7 +222,7 @@ def run_comparison_test():
     print()
 
     # Simular
-    results_old = simulate_strategy(prices, signals_old)
+    results_old = simulate_strategy(prices, signals_old, costs)
 
     if results_old:
         print_info("Performance:")
@@ -249,7 +256,7 @@ def run_comparison_test():
     print()
 
     # Simular
-    results_new = simulate_strategy(prices, signals_new)
+    results_new = simulate_strategy(prices, signals_new, costs)
 
     if results_new:
         print_info("Performance:")
@@ -0,0 +1,69 @@
+"""Order book walk and cost rates against hand-walked books"""
+
+import numpy as np
+import pytest
+
+from cost_model import CostModel, walk_book
+
+
+ASKS = [[100.0, 1.0], [101.0, 2.0], [102.0, 5.0]]   # 100 + 202 + 510 = 812 USDT
+BIDS = [[99.0, 1.0], [98.0, 2.0]]                   # 99 + 196 = 295 USDT
+
+
+def test_walk_book_asks():
+    slippage = walk_book(ASKS, [50, 150, 302, 500, 812, 10_000])
+    # 50: half a unit at the best price
+    assert slippage[0] == pytest.approx(0.0)
+    # 150: 1 @ 100, then 50 USDT @ 101
+    assert slippage[1] == pytest.approx((150 / (1 + 50 / 101) - 100) / 100)
+    # 302: exactly the first two levels, 3 units
+    assert slippage[2] == pytest.approx((302 / 3 - 100) / 100)
+    # 500: two levels, then 198 USDT @ 102
+    assert slippage[3] == pytest.approx((500 / (3 + 198 / 102) - 100) / 100)
+    # 812: the whole book, 8 units
+    assert slippage[4] == pytest.approx((812 / 8 - 100) / 100)
+    # Deeper than the book
+    assert np.isnan(slippage[5])
+
+
+def test_walk_book_bids():
+    slippage = walk_book(BIDS, [148])
+    # 1 @ 99, then 49 USDT @ 98: VWAP below the best bid
+    assert slippage[0] == pytest.approx((99 - 148 / (1 + 49 / 98)) / 99)
+
+
+def test_rate_adds_fee_spread_and_slippage():
+    costs = CostModel(taker_fee=0.001, half_spread=0.0002, impact_sizes=[100, 1000], impact=[0.0, 0.01])
+    assert costs.rate(0) == pytest.approx(0.0012)
+    # Linear between the curve points
+    assert costs.rate(550) == pytest.approx(0.0012 + 0.005)
+    # Square root beyond the last point
+    assert costs.rate(4000) == pytest.approx(0.0012 + 0.01 * 2)
+    np.testing.assert_allclose(costs.rate(np.array([0, 550])), [0.0012, 0.0062])
+
+
+def test_maker_pays_only_the_fee():
+    costs = CostModel(taker_fee=0.001, maker_fee=0.0002, half_spread=0.0002,
+                      impact_sizes=[100, 1000], impact=[0.0, 0.01], order_type='maker')
+    assert costs.rate(4000) == pytest.approx(0.0002)
+    with pytest.raises(ValueError):
+        CostModel(order_type='stop')
+
+
+def test_zero_costs():
+    assert CostModel.zero().rate(1e6) == 0.0
+
+
+def test_from_order_books():
+    sizes = [50, 150, 302]
+    costs = CostModel.from_order_books([{'bids': BIDS, 'asks': ASKS}], sizes=sizes, taker_fee=0.001)
+    assert costs.half_spread == pytest.approx((100 - 99) / (100 + 99))
+    # Median over both sides of the book; 302 USDT is deeper than the bids
+    expected = np.nanmedian([walk_book(BIDS, sizes), walk_book(ASKS, sizes)], axis=0)
+    np.testing.assert_allclose(costs.impact, expected)
+    assert CostModel.from_dict(costs.to_dict()).rate(200) == pytest.approx(costs.rate(200))
+
+
+def test_from_order_books_drops_sizes_no_book_covers():
+    costs = CostModel.from_order_books([{'bids': BIDS, 'asks': ASKS}], sizes=[50, 1000])
+    np.testing.assert_array_equal(costs.impact_sizes, [50])
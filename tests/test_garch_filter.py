@@ -0,0 +1,67 @@
+"""Native GARCH filter against arch's own filter and forecasts"""
+
+import numpy as np
+import pytest
+from arch import arch_model
+from arch.univariate import ConstantMean, GARCH, Normal
+
+from garch_filter import GarchFilter, backcast
+
+
+@pytest.fixture(scope='module')
+def returns():
+    model = ConstantMean(volatility=GARCH(p=1, q=1), distribution=Normal(seed=np.random.default_rng(0)))
+    data = model.simulate([0.02, 0.05, 0.08, 0.9], 1500, burn=500)
+    return data['data'].values
+
+
+@pytest.fixture(scope='module', params=[(1, 1), (2, 1), (1, 2)])
+def fitted(request, returns):
+    p, q = request.param
+    return arch_model(returns, vol='Garch', p=p, q=q).fit(disp='off', show_warning=False)
+
+
+def test_backcast_matches_arch(returns, fitted):
+    resids = returns - fitted.params['mu']
+    assert backcast(resids) == pytest.approx(fitted.model.volatility.backcast(resids))
+
+
+def test_filter_matches_conditional_volatility(returns, fitted):
+    garch = GarchFilter.from_fitted(fitted)
+    sigma2, resids = garch.filter(returns)
+    np.testing.assert_allclose(resids, fitted.resid, rtol=1e-12)
+    # arch takes the backcast from the residuals at its starting mean; the
+    # difference from the fitted mean decays away within the first bars
+    np.testing.assert_allclose(np.sqrt(sigma2[300:]), fitted.conditional_volatility[300:], rtol=1e-8)
+
+
+@pytest.mark.parametrize('p, q', [(1, 1), (2, 2)])
+def test_filter_matches_zero_mean_fit_exactly(returns, p, q):
+    fitted = arch_model(returns, mean='Zero', vol='Garch', p=p, q=q).fit(disp='off', show_warning=False)
+    sigma2, _ = GarchFilter.from_fitted(fitted).filter(returns)
+    np.testing.assert_allclose(np.sqrt(sigma2), fitted.conditional_volatility, rtol=1e-10)
+
+
+def test_forecast_matches_arch(returns, fitted):
+    garch = GarchFilter.from_fitted(fitted)
+    expected = fitted.forecast(horizon=10, reindex=False).variance.values[-1]
+    np.testing.assert_allclose(garch.forecast(returns, 10), expected, rtol=1e-8)
+
+
+def test_term_structure_sums_variances(returns, fitted):
+    garch = GarchFilter.from_fitted(fitted)
+    variances = fitted.forecast(horizon=24, reindex=False).variance.values[-1]
+    expected = np.sqrt(np.cumsum(variances)[[0, 3, 23]])
+    np.testing.assert_allclose(garch.term_structure(returns, [1, 4, 24]), expected, rtol=1e-8)
+
+
+def test_params_round_trip(returns, fitted):
+    garch = GarchFilter.from_fitted(fitted)
+    restored = GarchFilter.from_params(garch.to_params())
+    np.testing.assert_allclose(restored.forecast(returns, 5), garch.forecast(returns, 5))
+
+
+def test_legacy_params_are_garch_11():
+    garch = GarchFilter.from_params('{"omega": 0.05, "alpha": 0.1, "beta": 0.85}')
+    assert (garch.p, garch.q, garch.mu) == (1, 1, 0.0)
+    assert garch.persistence == pytest.approx(0.95)
@@ -0,0 +1,45 @@
+"""Per-source candle intervals and history limits"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from market_data import BinanceKlinesSource, FixtureSource, YahooSource, INTERVAL_MS
+
+
+def test_yahoo_intervals_and_lookback():
+    assert '4h' not in YahooSource.intervals
+    with pytest.raises(ValueError, match="no 4h candles"):
+        YahooSource.check('4h', 30)
+    with pytest.raises(ValueError, match="last 7 days of 1m"):
+        YahooSource.check('1m', 30)
+    YahooSource.check('1m', 7)
+    YahooSource.check('5m', 30)
+    YahooSource.check('1d', 10_000)
+
+
+def test_binance_and_fixtures_serve_every_interval():
+    for source in (BinanceKlinesSource, FixtureSource):
+        assert set(source.intervals) == set(INTERVAL_MS)
+        for interval in INTERVAL_MS:
+            source.check(interval, 365)
+
+
+def test_yahoo_fetch_rejects_before_downloading():
+    now = datetime.now(timezone.utc)
+    with pytest.raises(ValueError):
+        YahooSource().fetch('BTC-USD', now - timedelta(days=30), now, '1m')
+    with pytest.raises(ValueError):
+        YahooSource().fetch('BTC-USD', now - timedelta(days=1), now, '4h')
+
+
+@pytest.mark.parametrize('query, message', [
+    ('interval=4h&source=yahoo', 'no 4h candles'),
+    ('interval=1m&source=yahoo', 'last 7 days of 1m'),
+    ('interval=2h', 'Unknown interval'),
+])
+def test_run_rejects_unsupported_intervals(query, message):
+    main = pytest.importorskip('main')
+    response = main.app.test_client().get(f"/run?{query}")
+    assert response.status_code == 400
+    assert message in response.get_json()['message']
@@ -0,0 +1,61 @@
+"""Re-selection trigger of the cached model selection"""
+
+from datetime import datetime
+
+import numpy as np
+from arch.univariate import ConstantMean, GARCH, Normal
+
+from model_selection import LJUNG_BOX_ALPHA, ljung_box, reselection_reason
+from model_zoo import ModelSpec, fit_candidates
+
+
+N_BARS = 720  # 30 days of 1h candles
+SEEDS = range(20)
+
+
+def simulate_garch(seed, n=N_BARS, omega=0.05, alpha=0.08, beta=0.9):
+    """Percent returns from a GARCH(1,1) with normal innovations"""
+    model = ConstantMean(volatility=GARCH(p=1, q=1), distribution=Normal(seed=np.random.default_rng(seed)))
+    return model.simulate([0.0, omega, alpha, beta], n, burn=500)['data'].values
+
+
+def fresh_selection(spec, fit, n):
+    return {
+        'spec': spec,
+        'loglik_per_obs': fit['loglikelihood'] / n,
+        'selected_at': datetime.utcnow()
+    }
+
+
+def test_ljung_box_on_white_noise_is_not_significant():
+    rng = np.random.default_rng(0)
+    rejections = sum(ljung_box(rng.standard_normal(N_BARS) ** 2)[1] < LJUNG_BOX_ALPHA for _ in range(200))
+    # Expected about 1% of 200
+    assert rejections <= 8
+
+
+def test_ljung_box_detects_arch_effects_in_raw_returns():
+    _, p_value = ljung_box(simulate_garch(0, n=2000) ** 2)
+    assert p_value < LJUNG_BOX_ALPHA
+
+
+def test_reselection_does_not_fire_on_most_runs():
+    spec = ModelSpec('garch', 1, 1, 'normal')
+    reasons = []
+    for seed in SEEDS:
+        returns = simulate_garch(seed)
+        fit = fit_candidates(returns, [spec], max_workers=1)[0]
+        reasons.append(reselection_reason(fresh_selection(spec, fit, len(returns)), fit, returns))
+
+    fired = [r for r in reasons if r is not None]
+    # A correctly specified model should keep its selection; allow a couple of false alarms
+    assert len(fired) <= 2, fired
+
+
+def test_reselection_fires_when_selection_is_stale():
+    spec = ModelSpec('garch', 1, 1, 'normal')
+    returns = simulate_garch(1)
+    fit = fit_candidates(returns, [spec], max_workers=1)[0]
+    selection = fresh_selection(spec, fit, len(returns))
+    selection['selected_at'] = datetime(2020, 1, 1)
+    assert 'old' in reselection_reason(selection, fit, returns)
@@ -0,0 +1,97 @@
+"""Incremental prediction counters against a full recount"""
+
+import numpy as np
+import pytest
+
+from prediction_log import PredictionLog
+
+
+SYMBOLS = ['BTCUSDT', 'ETHUSDT', 'SOLUSDT']
+TYPES = ['price_up', 'price_down', 'price_target', 'change_percentage']
+
+
+def prediction(i, rng):
+    return {
+        'id': f"pred_{i}",
+        'symbol': SYMBOLS[rng.integers(len(SYMBOLS))],
+        'prediction_type': TYPES[rng.integers(len(TYPES))],
+        'predicted_value': float(rng.uniform(90, 110)),
+        'current_price': 100.0,
+        'prediction_time': f"2024-01-01T{i % 24:02d}:00:00",
+        'validation_time': f"2024-01-02T{i % 24:02d}:00:00",
+        'timeframe_hours': 24,
+        'context': {'i': i}
+    }
+
+
+def recount(log):
+    """Counters from a scan of every validated prediction"""
+    counts = {}
+    for row in log.conn.execute("SELECT * FROM predictions WHERE validated = 1"):
+        p = log._to_prediction(row)
+        key = (p['symbol'], p['prediction_type'])
+        total, successful, accuracy = counts.get(key, (0, 0, 0.0))
+        counts[key] = (total + 1, successful + int(p['result']['success']), accuracy + p['result']['accuracy'])
+    return counts
+
+
+def as_counts(stats):
+    return {(s['symbol'], s['prediction_type']): (s['total'], s['successful'], s['accuracy_sum']) for s in stats}
+
+
+def assert_counts_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, (total, successful, accuracy) in expected.items():
+        assert actual[key][:2] == (total, successful)
+        assert actual[key][2] == pytest.approx(accuracy)
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = PredictionLog(str(tmp_path / "predictions.db"))
+    yield log
+    log.close()
+
+
+def test_counters_match_recount_after_batches(log):
+    rng = np.random.default_rng(7)
+    predictions = [prediction(i, rng) for i in range(300)]
+    for p in predictions:
+        log.append(p)
+    assert log.count() == 300
+
+    for batch_start in range(0, 300, 60):
+        batch = predictions[batch_start:batch_start + 80]
+        # Some predictions get no result in this batch and stay pending
+        results = {
+            p['id']: {'success': bool(rng.random() < 0.5), 'accuracy': float(rng.uniform(0, 100))}
+            for p in batch if rng.random() < 0.8
+        }
+        log.save_results(batch, results)
+        assert_counts_equal(as_counts(log.stats()), recount(log))
+
+    # Overlapping batches: an already validated prediction is never counted twice
+    validated = sum(total for total, _, _ in recount(log).values())
+    pending = log.count() - validated
+    assert pending > 0
+    assert len(log.due("2024-01-03T00:00:00")) == pending
+
+    incremental = as_counts(log.stats())
+    log.rebuild_stats()
+    assert_counts_equal(incremental, as_counts(log.stats()))
+
+
+def test_saving_the_same_results_twice_does_not_double_count(log):
+    rng = np.random.default_rng(1)
+    batch = [prediction(i, rng) for i in range(10)]
+    for p in batch:
+        log.append(p)
+    results = {p['id']: {'success': True, 'accuracy': 50.0} for p in batch}
+    log.save_results(batch, results)
+    log.save_results(batch, results)
+
+    stats = log.stats()
+    assert sum(s['total'] for s in stats) == 10
+    assert sum(s['successful'] for s in stats) == 10
+    assert sum(s['accuracy_sum'] for s in stats) == pytest.approx(500.0)
+    assert log.due("2024-01-03T00:00:00") == []
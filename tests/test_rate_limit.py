@@ -0,0 +1,91 @@
+"""Shared weight governor with the asyncio order client"""
+
+import asyncio
+import time
+
+from binance import AsyncClient
+from binance.exceptions import BinanceAPIException
+
+from rate_limit import GovernedAsyncClient, RateLimitGovernor
+
+
+class FakeResponse:
+    def __init__(self, status, used, retry_after=None):
+        self.status = status
+        self.headers = {'X-MBX-USED-WEIGHT-1M': str(used)}
+        if retry_after is not None:
+            self.headers['Retry-After'] = str(retry_after)
+
+
+def test_async_requests_are_charged_to_the_governor(monkeypatch):
+    governor = RateLimitGovernor(limit=1000, safety_factor=1.0)
+    calls = []
+    # Estimated weight reserved before each request: order (1), then 10 reported + account (20)
+    reserved = [1, 30]
+
+    async def fake_request(self, method, uri, signed, force_params=False, **kwargs):
+        assert governor.used == reserved[len(calls)]
+        calls.append(uri)
+        self.response = FakeResponse(200, used=len(calls) * 10)
+        return {}
+
+    monkeypatch.setattr(AsyncClient, '_request', fake_request)
+
+    async def run():
+        client = GovernedAsyncClient('key', 'secret', governor=governor)
+        try:
+            await client._request('post', 'https://api.binance.com/api/v3/order', True, data={'symbol': 'BTCUSDT'})
+            await client._request('get', 'https://api.binance.com/api/v3/account', True, data={})
+        finally:
+            await client.close_connection()
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    # The header replaces the estimate
+    assert governor.used == 20
+
+
+def test_async_client_retries_429_and_waits_for_retry_after(monkeypatch):
+    governor = RateLimitGovernor(limit=1000, safety_factor=1.0)
+    attempts = []
+
+    async def fake_request(self, method, uri, signed, force_params=False, **kwargs):
+        attempts.append(uri)
+        if len(attempts) == 1:
+            self.response = FakeResponse(429, used=100, retry_after=0.05)
+            raise BinanceAPIException(self.response, 429, '{"code": -1003, "msg": "Too many requests"}')
+        self.response = FakeResponse(200, used=5)
+        return {'ok': True}
+
+    monkeypatch.setattr(AsyncClient, '_request', fake_request)
+
+    async def run():
+        client = GovernedAsyncClient('key', 'secret', governor=governor)
+        try:
+            return await client._request('post', 'https://api.binance.com/api/v3/order', True, data={})
+        finally:
+            await client.close_connection()
+
+    started = time.time()
+    assert asyncio.run(run()) == {'ok': True}
+    assert len(attempts) == 2
+    assert time.time() - started >= 0.05
+    assert governor.used == 5
+
+
+def test_acquire_async_does_not_block_the_loop():
+    governor = RateLimitGovernor(limit=10, safety_factor=1.0)
+    governor.blocked_until = time.time() + 0.1
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(governor.acquire_async(3), ticker())
+
+    asyncio.run(run())
+    assert len(ticks) == 5
+    assert governor.used == 3
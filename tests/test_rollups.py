@@ -0,0 +1,69 @@
+"""Incremental portfolio state against the original one-pass portfolio loop"""
+
+import numpy as np
+import pytest
+
+from cost_model import CostModel
+from rollups import INITIAL_CAPITAL, portfolio_stats, step_portfolio
+
+
+def calculate_portfolio_performance(prices, signals, costs=None):
+    """main.calculate_portfolio_performance before the rollups (one pass over all predictions)"""
+    rate = costs.rate if costs is not None else (lambda notional: 0.0)
+    btc_holdings = INITIAL_CAPITAL * (1 - rate(INITIAL_CAPITAL)) / prices[0]
+    cash = 0
+    last_signal = None
+    trades = 0
+    for price, signal in zip(prices[1:], signals[1:]):
+        if signal != last_signal:
+            if signal == 'SELL' and btc_holdings > 0:
+                cash = btc_holdings * price * (1 - rate(btc_holdings * price))
+                btc_holdings = 0
+                trades += 1
+            elif signal == 'BUY' and cash > 0:
+                btc_holdings = cash * (1 - rate(cash)) / price
+                cash = 0
+                trades += 1
+        last_signal = signal
+    hodl = INITIAL_CAPITAL * (1 - rate(INITIAL_CAPITAL)) / prices[0] * prices[-1]
+    return {'current': cash + btc_holdings * prices[-1], 'hodl': hodl, 'trades': trades}
+
+
+def random_walk(seed, n=500):
+    rng = np.random.default_rng(seed)
+    prices = 40_000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    # Runs of the same signal, like thresholded volatility
+    signals = np.repeat(rng.choice(['SELL', 'HOLD', 'BUY'], size=n // 5 + 1), 5)[:n]
+    return prices, signals
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('costs', [None, CostModel(taker_fee=0.001, half_spread=0.0002)])
+def test_step_portfolio_matches_full_recompute(seed, costs):
+    prices, signals = random_walk(seed)
+    state = None
+    for price, signal in zip(prices, signals):
+        state = step_portfolio(state, float(price), str(signal), costs)
+
+    expected = calculate_portfolio_performance(prices, signals, costs)
+    stats = portfolio_stats(state, costs)
+    assert state['cash'] + state['holdings'] * state['last_price'] == pytest.approx(expected['current'], rel=1e-12)
+    assert stats['trades'] == expected['trades']
+    assert stats['current'] == round(expected['current'], 2)
+    assert stats['hodl_value'] == round(expected['hodl'], 2)
+
+
+def test_hodl_pays_the_same_entry_charge():
+    costs = CostModel(taker_fee=0.001, half_spread=0.0002)
+    state = None
+    for price in (40_000.0, 41_000.0, 42_000.0):
+        state = step_portfolio(state, price, 'HOLD', costs)
+    # Never traded after the entry: identical to buy & hold
+    stats = portfolio_stats(state, costs)
+    assert stats['trades'] == 0
+    assert stats['vs_hodl'] == 0
+    assert stats['current'] == stats['hodl_value']
+
+
+def test_portfolio_stats_without_state():
+    assert portfolio_stats(None) == {"initial": 1000, "current": 1000, "return_pct": 0, "vs_hodl": 0, "trades": 0}
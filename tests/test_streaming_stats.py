@@ -0,0 +1,104 @@
+"""Streaming accumulators against NumPy/pandas on the full data"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming_stats import P2Quantile, QuantileSketch, RollingStd, RunningStats
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).lognormal(size=10_000)
+
+
+def test_running_stats_matches_numpy_in_batches(values):
+    stats = RunningStats()
+    for batch in np.array_split(values, 37):
+        stats.update(batch)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance() == pytest.approx(values.var(ddof=1))
+    assert stats.std(ddof=0) == pytest.approx(values.std())
+    assert (stats.min, stats.max) == (values.min(), values.max())
+
+
+def test_running_stats_merge_and_nans(values):
+    left, right = RunningStats(), RunningStats()
+    left.update(np.r_[values[:3000], np.nan])
+    right.update(values[3000:])
+    left.merge(right)
+    assert left.count == len(values)
+    assert left.mean == pytest.approx(values.mean())
+    assert left.variance() == pytest.approx(values.var(ddof=1))
+
+
+def test_running_stats_empty():
+    stats = RunningStats()
+    stats.update([])
+    assert stats.count == 0
+    assert np.isnan(stats.variance())
+
+
+@pytest.mark.parametrize('q', [0.25, 0.5, 0.75, 0.95])
+def test_p2_quantile_close_to_numpy(values, q):
+    estimator = P2Quantile(q)
+    estimator.extend(values)
+    assert estimator.count == len(values)
+    assert estimator.value() == pytest.approx(np.percentile(values, q * 100), rel=0.03)
+
+
+def test_p2_quantile_exact_below_five_values():
+    estimator = P2Quantile(0.5)
+    estimator.extend([3.0, 1.0, 2.0, np.nan])
+    assert estimator.value() == np.percentile([1.0, 2.0, 3.0], 50)
+    assert np.isnan(P2Quantile(0.5).value())
+
+
+def test_p2_quantile_round_trip(values):
+    estimator = P2Quantile(0.75)
+    estimator.extend(values[:500])
+    restored = P2Quantile.from_dict(estimator.to_dict())
+    estimator.extend(values[500:])
+    restored.extend(values[500:])
+    assert restored.value() == estimator.value()
+
+
+@pytest.mark.parametrize('q', [0.0, 0.25, 0.5, 0.75, 1.0])
+def test_quantile_sketch_within_relative_accuracy(values, q):
+    sketch = QuantileSketch(0.01)
+    for x in values:
+        sketch.update(x)
+    assert sketch.quantile(q) == pytest.approx(np.percentile(values, q * 100), rel=0.01)
+
+
+def test_quantile_sketch_merge_equals_union(values):
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for x in values:
+        whole.update(x)
+    for x in values[:4000]:
+        left.update(x)
+    for x in np.r_[values[4000:], 0.0, np.nan]:
+        right.update(x)
+    whole.update(0.0)
+    left.merge(right)
+    assert left.count == whole.count == len(values) + 1
+    assert left.quantile(0.3) == whole.quantile(0.3)
+    assert QuantileSketch.from_dict(left.to_dict()).quantile(0.9) == left.quantile(0.9)
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+
+@pytest.mark.parametrize('window', [2, 24])
+def test_rolling_std_matches_pandas(values, window):
+    rolling = RollingStd(window)
+    result = np.array([rolling.update(x) for x in values[:2000]])
+    expected = pd.Series(values[:2000]).rolling(window).std().values
+    np.testing.assert_allclose(result, expected, rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+def test_rolling_std_round_trip(values):
+    rolling = RollingStd(24)
+    for x in values[:100]:
+        rolling.update(x)
+    restored = RollingStd.from_dict(rolling.to_dict())
+    assert restored.update(values[100]) == pytest.approx(rolling.update(values[100]))
@@ -0,0 +1,75 @@
+"""Vectorized strategy simulation against the original per-row simulate_strategy loop"""
+
+import numpy as np
+import pytest
+
+from cost_model import CostModel
+from threshold_sweep import BUY, HOLD, SELL, simulate_signals
+
+
+SIGNAL_NAMES = np.array(['SELL', 'HOLD', 'BUY'])
+
+
+def simulate_strategy(prices, signals, costs=None):
+    """test_improved_garch.simulate_strategy as originally written, with an optional cost per trade"""
+    rate = costs.rate if costs is not None else (lambda notional: 0.0)
+    initial_capital = 1000
+    cash = 0
+    btc = 0
+    trades = 0
+
+    first_price = prices[0]
+    if signals[0] == 'BUY':
+        btc = initial_capital * (1 - rate(initial_capital)) / first_price
+        position = 'BUY'
+    else:
+        cash = initial_capital
+        position = 'HOLD'
+
+    for i in range(1, len(signals)):
+        signal = signals[i]
+        price = prices[i]
+        if signal != position:
+            if signal == 'SELL' and btc > 0:
+                cash = btc * price * (1 - rate(btc * price))
+                btc = 0
+                trades += 1
+                position = 'SELL'
+            elif signal == 'BUY' and cash > 0:
+                btc = cash * (1 - rate(cash)) / price
+                cash = 0
+                trades += 1
+                position = 'BUY'
+
+    final_value = btc * prices[-1] if btc > 0 else cash
+    return {'final': final_value, 'trades': trades}
+
+
+def random_walk(seed, n=500):
+    rng = np.random.default_rng(seed)
+    prices = 40_000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    # Runs of the same signal, like thresholded volatility
+    codes = np.repeat(rng.choice([SELL, HOLD, BUY], size=n // 5 + 1), 5)[:n]
+    return prices, codes
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('costs', [None, CostModel(taker_fee=0.001, half_spread=0.0002)])
+def test_simulate_signals_matches_per_row_loop(seed, costs):
+    prices, codes = random_walk(seed)
+    # Several signal series at once, one starting with BUY
+    signals = np.vstack([codes, np.roll(codes, 7), np.r_[BUY, codes[1:]]])
+    result = simulate_signals(prices, signals, costs=costs)
+    for i, row in enumerate(signals):
+        expected = simulate_strategy(prices, SIGNAL_NAMES[row + 1], costs)
+        assert result['final'][i] == pytest.approx(expected['final'], rel=1e-9)
+        assert result['trades'][i] == expected['trades']
+        assert result['return_pct'][i] == pytest.approx((expected['final'] - 1000) / 10, rel=1e-9)
+
+
+def test_simulate_signals_costs_are_reported():
+    prices, codes = random_walk(0)
+    free = simulate_signals(prices, codes)
+    paid = simulate_signals(prices, codes, costs=CostModel(taker_fee=0.001, half_spread=0.0))
+    assert free['costs_pct'][0] == pytest.approx(0.0)
+    assert paid['costs_pct'][0] == pytest.approx(free['return_pct'][0] - paid['return_pct'][0])
@@ -0,0 +1,111 @@
+"""Windowed threshold engine against the original np.percentile thresholds"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from arch.univariate import ConstantMean, GARCH, Normal
+
+from analytics_sql import SQLiteBackend
+from thresholds import (ThresholdEngine, create_threshold_table, get_engine, horizon_bars,
+                        update_thresholds)
+
+
+def garch_returns(n, seed=0, omega=0.05, alpha=0.08, beta=0.9):
+    model = ConstantMean(volatility=GARCH(p=1, q=1), distribution=Normal(seed=np.random.default_rng(seed)))
+    returns = model.simulate([0.0, omega, alpha, beta], n, burn=500)['data']
+    returns.index = pd.date_range('2026-01-01', periods=n, freq='h', tz='UTC')
+    return returns
+
+
+def original_thresholds(returns):
+    """run_garch before the engine: percentiles of the 24-bar rolling std of the candle window"""
+    historical_volatilities = returns.rolling(window=24).std().dropna()
+    vol_75_percentile = np.percentile(historical_volatilities, 75)
+    vol_25_percentile = np.percentile(historical_volatilities, 25)
+    buffer = (vol_75_percentile - vol_25_percentile) * 0.1
+    return {
+        'threshold_high': vol_75_percentile + buffer,
+        'threshold_low': vol_25_percentile - buffer,
+        'vol_75_percentile': vol_75_percentile,
+        'vol_25_percentile': vol_25_percentile
+    }
+
+
+@pytest.fixture
+def backend():
+    backend = SQLiteBackend()
+    create_threshold_table(backend)
+    yield backend
+    backend.conn.close()
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_first_run_matches_original_percentiles(seed):
+    returns = garch_returns(horizon_bars('1h'), seed)
+    engine = ThresholdEngine(horizon=horizon_bars('1h'))
+    engine.update_series(returns)
+    expected = original_thresholds(returns)
+    for key, value in engine.thresholds().items():
+        assert value == pytest.approx(expected[key], rel=0.02)
+
+
+def test_percentiles_follow_the_trailing_window():
+    # Calm month followed by a month of triple volatility
+    calm = garch_returns(720, seed=1)
+    stressed = garch_returns(1440, seed=2, omega=0.45)
+    returns = pd.concat([calm, stressed.iloc[720:]])
+    engine = ThresholdEngine(horizon=horizon_bars('1h'))
+    engine.update_series(returns)
+
+    trailing = original_thresholds(returns.iloc[-720:])
+    all_history = original_thresholds(returns)
+    thresholds = engine.thresholds()
+    assert thresholds['vol_75_percentile'] == pytest.approx(trailing['vol_75_percentile'], rel=0.02)
+    assert thresholds['vol_25_percentile'] == pytest.approx(trailing['vol_25_percentile'], rel=0.02)
+    assert abs(thresholds['vol_25_percentile'] - all_history['vol_25_percentile']) > 0.1
+
+
+def test_engine_state_survives_the_backend(backend):
+    returns = garch_returns(1000, seed=3)
+    single_pass = ThresholdEngine(horizon=horizon_bars('1h'))
+    single_pass.update_series(returns)
+
+    # Hourly runs over a sliding 30-day candle window
+    processed = 0
+    for end in range(720, 1001, 40):
+        _, new_bars = update_thresholds('BTC-USD', returns.iloc[max(0, end - 720):end], backend=backend)
+        processed += new_bars
+    assert processed == 1000
+
+    stored = get_engine(backend, 'BTC-USD')
+    assert stored.last_timestamp == returns.index[-1]
+    assert stored.thresholds() == pytest.approx(single_pass.thresholds())
+    # Engines are kept per interval
+    assert get_engine(backend, 'BTC-USD', '5m').last_timestamp is None
+
+
+def test_without_backend_uses_the_candle_window():
+    returns = garch_returns(720, seed=4)
+    thresholds, processed = update_thresholds('BTC-USD', returns)
+    assert processed == 720
+    assert thresholds['threshold_high'] == pytest.approx(original_thresholds(returns)['threshold_high'], rel=0.02)
+
+
+def test_open_candle_is_applied_once_it_closes(backend):
+    returns = garch_returns(800, seed=5)
+    single_pass = ThresholdEngine(horizon=horizon_bars('1h'))
+    single_pass.update_series(returns)
+
+    for end in range(720, 801, 10):
+        window = returns.iloc[:end].copy()
+        # The last fetched kline is still forming: partial return, closes an hour after it opened
+        window.iloc[-1] *= 0.3
+        now = window.index[-1] + pd.Timedelta(minutes=20)
+        _, new_bars = update_thresholds('BTC-USD', window, backend=backend, now=now)
+        assert new_bars == (719 if end == 720 else 10)
+
+    # Close the last candle
+    update_thresholds('BTC-USD', returns, backend=backend, now=returns.index[-1] + pd.Timedelta(hours=1))
+    stored = get_engine(backend, 'BTC-USD')
+    assert stored.thresholds() == pytest.approx(single_pass.thresholds())
+    assert stored.rolling.to_dict() == single_pass.rolling.to_dict()
@@ -0,0 +1,105 @@
+"""Append-only trade journal: lookups, compaction and crash recovery"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from trade_journal import TradeJournal
+
+
+def trade(i, symbol='BTCUSDT', side='BUY', **extra):
+    return {
+        'timestamp': f"2024-01-01T00:{i:02d}:00",
+        'order_id': 1000 + i,
+        'symbol': symbol,
+        'side': side,
+        'type': 'MARKET',
+        'status': 'FILLED',
+        'quantity': '0.001',
+        'order': {'orderId': 1000 + i},
+        **extra
+    }
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = TradeJournal(str(tmp_path / "trades.db"))
+    yield journal
+    journal.close()
+
+
+def test_append_and_read_back(journal):
+    journal.append(trade(1))
+    journal.append(trade(2, side='SELL'))
+    assert journal.count() == 2
+    first, second = journal.last(10)
+    assert first['order_id'] == 1001 and first['side'] == 'BUY'
+    assert second['order'] == {'orderId': 1002}
+    assert second['dry_run'] is False
+
+
+def test_last_entry_per_symbol_and_mode(journal):
+    journal.append(trade(1, side='BUY'))
+    journal.append(trade(2, symbol='ETHUSDT', side='SELL'))
+    journal.append(trade(3, side='SELL', dry_run=True))
+    journal.append(trade(4, symbol='ETHUSDT', side='BUY'))
+
+    assert journal.last(1)[0]['order_id'] == 1004
+    assert journal.last(1, symbol='BTCUSDT')[0]['side'] == 'SELL'
+    assert journal.last(1, symbol='BTCUSDT', dry_run=False)[0]['side'] == 'BUY'
+    assert journal.last(1, symbol='BTCUSDT', dry_run=True)[0]['dry_run'] is True
+    assert journal.last(1, symbol='SOLUSDT') == []
+    # Chronological order, most recent last
+    assert [t['order_id'] for t in journal.last(2, symbol='BTCUSDT')] == [1001, 1003]
+    assert [t['order_id'] for t in journal.between('2024-01-01T00:02:00', '2024-01-01T00:04:00')] == [1002, 1003]
+
+
+def test_compaction_keeps_every_trade(journal):
+    for i in range(50):
+        journal.append(trade(i, side='BUY' if i % 2 else 'SELL'))
+    before = journal.last(50)
+    journal.compact()
+
+    assert os.path.getsize(journal.path + "-wal") == 0
+    assert journal.count() == 50
+    assert journal.last(50) == before
+    journal.append(trade(50))
+    assert journal.count() == 51
+
+
+def test_torn_last_write_is_dropped_on_recovery(tmp_path):
+    path = str(tmp_path / "trades.db")
+    journal = TradeJournal(path)
+    journal.append(trade(1))
+    journal.append(trade(2))
+    wal_committed = os.path.getsize(path + "-wal")
+    journal.append(trade(3))
+
+    # Crash before any checkpoint: copy the files as they are on disk,
+    # with the last WAL frame only half written
+    crashed = str(tmp_path / "crashed.db")
+    shutil.copy(path, crashed)
+    shutil.copy(path + "-wal", crashed + "-wal")
+    journal.close()
+    wal_size = os.path.getsize(crashed + "-wal")
+    assert wal_size > wal_committed
+    with open(crashed + "-wal", 'r+b') as f:
+        f.truncate(wal_committed + (wal_size - wal_committed) // 2)
+
+    recovered = TradeJournal(crashed)
+    assert [t['order_id'] for t in recovered.last(10)] == [1001, 1002]
+    recovered.append(trade(4))
+    assert [t['order_id'] for t in recovered.last(10)] == [1001, 1002, 1004]
+    recovered.close()
+
+
+def test_legacy_json_is_imported_once(journal, tmp_path):
+    legacy = tmp_path / "trades_history.json"
+    legacy.write_text(json.dumps([trade(1), trade(2, side='SELL')]))
+
+    assert journal.import_legacy_json(str(legacy)) == 2
+    assert journal.import_legacy_json(str(legacy)) == 0
+    assert (tmp_path / "trades_history.json.imported").exists()
+    assert [t['side'] for t in journal.last(10)] == ['BUY', 'SELL']
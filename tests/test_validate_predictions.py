@@ -0,0 +1,127 @@
+"""Vectorized prediction scoring and the validation price lookup"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from validate_predictions import score_predictions, price_windows, prices_at
+
+
+def score_one(kind, predicted, initial, actual):
+    """Per-prediction rules, one row at a time"""
+    change = (actual - initial) / initial * 100
+    if kind == 'price_up':
+        return change > 0, min(max(change * 10, 0), 100), 0.0
+    if kind == 'price_down':
+        return change < 0, min(abs(change) * 10, 100), 0.0
+    if kind == 'price_target':
+        err = abs((actual - predicted) / predicted) * 100
+        return err < 5, max(0, 100 - err), err
+    if kind == 'price_range':
+        inside = predicted[0] <= actual <= predicted[1]
+        return inside, 100.0 if inside else 0.0, 0.0
+    err = abs(change - predicted)
+    return err < 2, max(0, 100 - err * 10), err
+
+
+def test_direction_and_accuracy_clip():
+    scored = score_predictions(['price_up', 'price_up', 'price_up', 'price_down', 'price_down'],
+                               [None] * 5, [100] * 5, [101, 120, 99, 97, 103])
+    assert scored['success'].tolist() == [True, True, False, True, False]
+    # 1% -> 10, 20% clipped to 100, wrong direction -> 0
+    assert scored['accuracy'][:3] == pytest.approx([10, 100, 0])
+    assert scored['accuracy'][3] == pytest.approx(30)
+    # price_down scores the size of the move even when it went up
+    assert scored['accuracy'][4] == pytest.approx(30)
+    assert scored['price_change_pct'] == pytest.approx([1, 20, -1, -3, 3])
+
+
+def test_price_target_within_5_percent():
+    scored = score_predictions(['price_target'] * 3, [100, '100', 100], [90] * 3, [104.9, 95, 110])
+    assert scored['success'].tolist() == [True, False, False]
+    assert scored['error'] == pytest.approx([4.9, 5, 10])
+    assert scored['accuracy'] == pytest.approx([95.1, 95, 90])
+
+
+def test_price_range_bounds_inclusive():
+    ranges = [(95, 105), (95, 105), (95, 105), (95, 105)]
+    scored = score_predictions(['price_range'] * 4, ranges, [100] * 4, [95, 105, 94.99, 105.01])
+    assert scored['success'].tolist() == [True, True, False, False]
+    assert scored['accuracy'].tolist() == [100, 100, 0, 0]
+
+
+def test_change_percentage_within_2_points():
+    scored = score_predictions(['change_percentage'] * 3, [5, 5, -1], [100] * 3, [103.5, 102.5, 105])
+    assert scored['success'].tolist() == [True, False, False]
+    assert scored['error'] == pytest.approx([1.5, 2.5, 6])
+    assert scored['accuracy'] == pytest.approx([85, 75, 40])
+
+
+def test_mixed_batch_matches_row_by_row():
+    rng = np.random.default_rng(3)
+    kinds = ['price_up', 'price_down', 'price_target', 'price_range', 'change_percentage']
+    types, predicted, initial, actual = [], [], [], []
+    for _ in range(200):
+        kind = kinds[rng.integers(len(kinds))]
+        start = rng.uniform(50, 150)
+        end = start * (1 + rng.normal(0, 0.05))
+        if kind == 'price_target':
+            value = start * (1 + rng.normal(0, 0.05))
+        elif kind == 'price_range':
+            lo = start * (1 - rng.uniform(0, 0.05))
+            value = (lo, lo + start * rng.uniform(0, 0.1))
+        elif kind == 'change_percentage':
+            value = rng.normal(0, 5)
+        else:
+            value = None
+        types.append(kind)
+        predicted.append(value)
+        initial.append(start)
+        actual.append(end)
+
+    predicted_values = np.empty(len(predicted), dtype=object)
+    predicted_values[:] = predicted
+    scored = score_predictions(types, predicted_values, initial, actual)
+
+    for i, row in enumerate(zip(types, predicted, initial, actual)):
+        success, accuracy, error = score_one(*row)
+        assert scored['success'][i] == success
+        assert scored['accuracy'][i] == pytest.approx(accuracy)
+        assert scored['error'][i] == pytest.approx(error)
+
+
+def test_price_windows_group_nearby_times():
+    base = pd.Timestamp('2024-01-01 00:00:30', tz='UTC')
+    times = pd.DatetimeIndex([
+        base + pd.Timedelta(minutes=10),
+        base,
+        base + pd.Timedelta(days=30),
+        base + pd.Timedelta(minutes=999),
+        base + pd.Timedelta(minutes=1000),
+    ])
+    windows = price_windows(times, '1m', max_candles=1000)
+    start = base.floor('1min')
+    assert windows == [
+        (start, start + pd.Timedelta(minutes=1000)),
+        (start + pd.Timedelta(minutes=1000), start + pd.Timedelta(minutes=1001)),
+        (start + pd.Timedelta(days=30), start + pd.Timedelta(days=30, minutes=1)),
+    ]
+    # An old prediction does not widen the fetch up to now
+    assert all(end - begin <= pd.Timedelta(minutes=1000) for begin, end in windows)
+
+
+def test_prices_at_uses_the_candle_containing_each_time():
+    index = pd.DatetimeIndex(['2024-01-01 00:00', '2024-01-01 00:01', '2024-01-01 00:05'], tz='UTC')
+    closes = pd.Series([10.0, 11.0, 12.0], index=index)
+    times = pd.DatetimeIndex([
+        '2023-12-31 23:59:59',   # before the first candle
+        '2024-01-01 00:00:00',
+        '2024-01-01 00:01:59',
+        '2024-01-01 00:03:00',   # gap between windows
+        '2024-01-01 00:05:30',
+    ], tz='UTC')
+    prices = prices_at(closes, times, '1m')
+    assert np.isnan(prices[0])
+    assert prices[1:3].tolist() == [10.0, 11.0]
+    assert np.isnan(prices[3])
+    assert prices[4] == 12.0
@@ -0,0 +1,54 @@
+"""Walk-forward evaluation windows for horizons other than the stored 1h"""
+
+from datetime import timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import volatility_eval
+from market_data import INTERVAL_MS
+from volatility_eval import WalkForwardEvaluator
+
+
+class RecordingSource:
+    """Random-walk 1h candles for any range; remembers what was asked"""
+
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, asset, start, end, interval='1h'):
+        self.requests.append((start, end))
+        index = pd.date_range(pd.Timestamp(start).ceil('h'), end, freq='h', inclusive='left')
+        rng = np.random.default_rng(0)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(index))))
+        return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close, 'Volume': 1.0},
+                            index=index)
+
+
+@pytest.mark.parametrize('hours', [1, 4, 24])
+def test_prepare_covers_the_evaluator_horizon(tmp_path, monkeypatch, hours):
+    monkeypatch.setattr(volatility_eval, 'load_bars', partial(volatility_eval.load_bars, cache_dir=str(tmp_path)))
+    source = RecordingSource()
+    horizon = timedelta(hours=hours)
+    first = pd.Timestamp('2024-03-01', tz='UTC')
+    last = pd.Timestamp('2024-03-05', tz='UTC')
+
+    evaluator = WalkForwardEvaluator('1h', horizon=horizon, source=source)
+    evaluator.prepare({'BTC-USD': (first, last)})
+
+    start, end = source.requests[0]
+    assert start <= first - horizon
+    assert end >= last + horizon
+
+    # The last forecast's realized window is covered, so nothing is skipped
+    page = pd.DataFrame({
+        'asset': ['BTC-USD'] * 2,
+        'timestamp': [first.isoformat(), last.isoformat()],
+        'predicted_volatility': [1.0, 1.0]
+    })
+    evaluator.update(page)
+    assert evaluator.skipped == 0
+    assert evaluator.errors['BTC-USD'].count == 2
+    assert evaluator.horizon_ms == hours * INTERVAL_MS['1h']
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Barrido de Parámetros de Umbrales
+Evalúa una rejilla de (ventana, percentiles, buffer) del generador de señales
+de run_garch sobre una sola serie de volatilidad GARCH precalculada, con la
+simulación de la estrategia vectorizada para todas las combinaciones a la vez
+
+Uso:
+    python threshold_sweep.py                        # BTC-USD, 30 días de velas de 1h
+    python threshold_sweep.py --asset ETH-USD --days 90
+    python threshold_sweep.py --source binance --interval 15m
+    python threshold_sweep.py --top 50 --output sweep.csv
+    python threshold_sweep.py --no-costs             # sin comisiones, spread ni slippage
+"""
+
+import sys
+import time
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from arch import arch_model
+from garch_filter import GarchFilter
+from market_data import fetch_candles, asset_to_symbol
+from cost_model import CostModel
+
+# Rejilla por defecto (run_garch usa ventana 24, percentiles 75/25 y buffer 10%)
+DEFAULT_WINDOWS = [12, 24, 48, 72, 168]
+DEFAULT_HIGH_PERCENTILES = [60, 65, 70, 75, 80, 85, 90]
+DEFAULT_LOW_PERCENTILES = [10, 15, 20, 25, 30, 35, 40]
+DEFAULT_BUFFERS = [0.0, 0.05, 0.1, 0.2, 0.3]
+
+INITIAL_CAPITAL = 1000
+
+# Señales como enteros para operar con arrays
+BUY, HOLD, SELL = 1, 0, -1
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def precompute_volatility(returns):
+    """
+    Volatilidad pronosticada para cada vela con un solo ajuste GARCH(1,1)
+
+    El pronóstico de la vela t es el de t+1 hecho al cierre de t (lo que
+    compararía run_garch con sus umbrales en ese momento). Los parámetros se
+    estiman sobre toda la muestra: sirve para comparar configuraciones entre
+    sí, no como estimación fuera de muestra.
+
+    Returns:
+        np.ndarray: Volatilidad (%) alineada con returns
+    """
+    fitted = arch_model(returns, vol='Garch', p=1, q=1).fit(disp='off', show_warning=False)
+    garch = GarchFilter.from_fitted(fitted)
+    sigma2, _ = garch.filter(returns)
+    next_var = garch.forecast(returns, 1)
+    return np.sqrt(np.concatenate([sigma2[1:], next_var]))
+
+
+def simulate_signals(prices, signals, initial_capital=INITIAL_CAPITAL, costs=None):
+    """
+    Estrategia de test_improved_garch.simulate_strategy para muchas series de señales
+
+    BUY entra con todo el capital, SELL sale a efectivo y HOLD mantiene la
+    posición; la primera vela entra solo si su señal es BUY.
+
+    Args:
+        prices: Precios (T,)
+        signals: Matriz (combinaciones, T) con BUY/HOLD/SELL
+        costs: CostModel aplicado a cada entrada/salida (None = sin costos)
+
+    Returns:
+        dict de arrays (uno por combinación): final, return_pct, trades, costs_pct
+    """
+    signals = np.atleast_2d(signals)
+    codes = signals.copy()
+    codes[:, 0] = np.where(signals[:, 0] == BUY, BUY, SELL)
+
+    # Posición = última señal distinta de HOLD (forward-fill por fila)
+    steps = np.arange(codes.shape[1])
+    last = np.maximum.accumulate(np.where(codes != HOLD, steps, 0), axis=1)
+    in_asset = np.take_along_axis(codes, last, axis=1) == BUY
+
+    log_returns = np.diff(np.log(prices))
+    gross = np.concatenate([np.zeros((len(in_asset), 1)),
+                            np.cumsum(in_asset[:, :-1] * log_returns, axis=1)], axis=1)
+    trades = np.count_nonzero(in_asset[:, 1:] != in_asset[:, :-1], axis=1)
+
+    cost_log = np.zeros(len(in_asset))
+    if costs is not None:
+        # Cada cambio de posición (y la entrada inicial) mueve todo el capital
+        switches = np.concatenate([in_asset[:, :1], in_asset[:, 1:] != in_asset[:, :-1]], axis=1)
+        # Nocional = capital antes del trade; la segunda pasada incluye los costos ya pagados
+        paid = np.zeros_like(gross)
+        for _ in range(2):
+            notional = initial_capital * np.exp(gross[switches] + paid[switches])
+            step_cost = np.zeros_like(gross)
+            step_cost[switches] = np.log1p(-costs.rate(notional))
+            paid = np.cumsum(step_cost, axis=1) - step_cost
+        cost_log = step_cost.sum(axis=1)
+
+    final = initial_capital * np.exp(gross[:, -1] + cost_log)
+    return {
+        'final': final,
+        'return_pct': (final - initial_capital) / initial_capital * 100,
+        'trades': trades,
+        'costs_pct': (initial_capital * np.exp(gross[:, -1]) - final) / initial_capital * 100
+    }
+
+
+def _evaluate_window(args):
+    """Todas las combinaciones de una ventana (función top-level para el pool de procesos)"""
+    window, returns, volatilities, prices, highs, lows, buffers, costs = args
+
+    historical = pd.Series(returns).rolling(window=window).std().dropna().values
+    if len(historical) == 0:
+        return []
+
+    combos = [(h, l, b) for h, l, b in product(highs, lows, buffers) if l < h]
+    high_pct = np.array([c[0] for c in combos], dtype=float)
+    low_pct = np.array([c[1] for c in combos], dtype=float)
+    buffer = np.array([c[2] for c in combos], dtype=float)
+
+    # Percentiles de todas las combinaciones en una sola pasada
+    percentiles = dict(zip(sorted(set(highs) | set(lows)),
+                           np.percentile(historical, sorted(set(highs) | set(lows)))))
+    vol_high = np.array([percentiles[h] for h in high_pct])
+    vol_low = np.array([percentiles[l] for l in low_pct])
+    spread = (vol_high - vol_low) * buffer
+    threshold_high = (vol_high + spread)[:, None]
+    threshold_low = (vol_low - spread)[:, None]
+
+    signals = np.where(volatilities > threshold_high, SELL,
+                       np.where(volatilities < threshold_low, BUY, HOLD))
+    results = simulate_signals(prices, signals, costs=costs)
+
+    n = signals.shape[1]
+    return [
+        {
+            'window': window,
+            'high_pct': high_pct[i],
+            'low_pct': low_pct[i],
+            'buffer': buffer[i],
+            'threshold_high': float(threshold_high[i, 0]),
+            'threshold_low': float(threshold_low[i, 0]),
+            'buy_pct': 100 * np.count_nonzero(signals[i] == BUY) / n,
+            'sell_pct': 100 * np.count_nonzero(signals[i] == SELL) / n,
+            'return_pct': float(results['return_pct'][i]),
+            'costs_pct': float(results['costs_pct'][i]),
+            'trades': int(results['trades'][i])
+        }
+        for i in range(len(combos))
+    ]
+
+
+def sweep(returns, volatilities, prices, windows=None, highs=None, lows=None, buffers=None,
+          max_workers=None, costs=None):
+    """
+    Evaluar la rejilla completa en paralelo (un proceso por ventana)
+
+    Args:
+        returns: Retornos (%) usados para la volatilidad histórica de los umbrales
+        volatilities: Volatilidad pronosticada por vela (misma longitud)
+        prices: Precios de cierre (misma longitud)
+        max_workers: Procesos (por defecto uno por CPU)
+        costs: CostModel (None = sin costos)
+
+    Returns:
+        pd.DataFrame: Una fila por configuración, ordenada por retorno
+    """
+    returns = np.asarray(returns, dtype=float)
+    volatilities = np.asarray(volatilities, dtype=float)
+    prices = np.asarray(prices, dtype=float)
+    jobs = [
+        (w, returns, volatilities, prices, highs or DEFAULT_HIGH_PERCENTILES,
+         lows or DEFAULT_LOW_PERCENTILES, buffers or DEFAULT_BUFFERS, costs)
+        for w in windows or DEFAULT_WINDOWS
+    ]
+
+    if len(jobs) > 1 and (max_workers is None or max_workers > 1):
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            rows = [row for result in pool.map(_evaluate_window, jobs) for row in result]
+    else:
+        rows = [row for job in jobs for row in _evaluate_window(job)]
+
+    results = pd.DataFrame(rows)
+    hodl_pct = (prices[-1] - prices[0]) / prices[0] * 100
+    results['vs_hodl'] = results['return_pct'] - hodl_pct
+    return results.sort_values('return_pct', ascending=False).reset_index(drop=True)
+
+
+def print_results(results, top=20, hodl_pct=None):
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*100}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'BARRIDO DE UMBRALES'.center(100)}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*100}{Colors.RESET}\n")
+
+    print(f"   {'#':>4}{'Ventana':>9}{'P alto':>8}{'P bajo':>8}{'Buffer':>8}{'Umbral +':>10}{'Umbral -':>10}"
+          f"{'BUY':>8}{'SELL':>8}{'Retorno':>10}{'vs HODL':>10}{'Costos':>9}{'Trades':>8}")
+    for rank, row in results.head(top).iterrows():
+        color = Colors.GREEN if row['vs_hodl'] > 0 else Colors.RED
+        default = (row['window'], row['high_pct'], row['low_pct'], row['buffer']) == (24, 75, 25, 0.1)
+        marker = f"{Colors.BOLD}*{Colors.RESET}" if default else " "
+        print(f"  {marker}{rank + 1:>4}{int(row['window']):>9}{row['high_pct']:>8.0f}{row['low_pct']:>8.0f}"
+              f"{row['buffer']:>8.2f}{row['threshold_high']:>10.4f}{row['threshold_low']:>10.4f}"
+              f"{row['buy_pct']:>7.1f}%{row['sell_pct']:>7.1f}%{color}{row['return_pct']:>+9.2f}%"
+              f"{row['vs_hodl']:>+9.2f}%{Colors.RESET}{row['costs_pct']:>8.2f}%{int(row['trades']):>8}")
+
+    current = results[(results['window'] == 24) & (results['high_pct'] == 75) &
+                      (results['low_pct'] == 25) & (results['buffer'] == 0.1)]
+    if not current.empty:
+        rank = current.index[0] + 1
+        print(f"\n   * Configuración actual de run_garch: puesto {rank} de {len(results)} "
+              f"({current.iloc[0]['return_pct']:+.2f}%)")
+    if hodl_pct is not None:
+        print(f"   HODL: {hodl_pct:+.2f}%")
+    print()
+
+
+def _arg(args, name, default):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    asset = _arg(args, '--asset', 'BTC-USD')
+    days = int(_arg(args, '--days', 30))
+    interval = _arg(args, '--interval', '1h')
+    source = _arg(args, '--source', None)
+    top = int(_arg(args, '--top', 20))
+    output = _arg(args, '--output', None)
+
+    print(f"📥 Descargando {days} días de velas de {interval} para {asset}...")
+    data = fetch_candles(asset, days=days, interval=interval, source=source)
+    if len(data) < 100:
+        print(f"{Colors.RED}❌ Datos insuficientes: {len(data)} puntos{Colors.RESET}")
+        return
+
+    data['returns'] = 100 * data['Close'].pct_change()
+    data = data.dropna()
+
+    print("📈 Calculando volatilidad GARCH (un solo ajuste)...")
+    volatilities = precompute_volatility(data['returns'].values)
+
+    n_combos = len(DEFAULT_WINDOWS) * sum(
+        1 for h, l in product(DEFAULT_HIGH_PERCENTILES, DEFAULT_LOW_PERCENTILES) if l < h
+    ) * len(DEFAULT_BUFFERS)
+    costs = None if '--no-costs' in args else CostModel.from_env(asset_to_symbol(asset))
+    print(f"💸 Costos: {costs if costs else 'ninguno'}")
+
+    print(f"🔍 Evaluando {n_combos:,} configuraciones sobre {len(data):,} velas...")
+    start = time.time()
+    results = sweep(data['returns'].values, volatilities, data['Close'].values, costs=costs)
+    print(f"✅ Barrido completado en {time.time() - start:.2f}s")
+
+    prices = data['Close'].values
+    print_results(results, top=top, hodl_pct=(prices[-1] - prices[0]) / prices[0] * 100)
+
+    if output:
+        results.to_csv(output, index=False)
+        print(f"💾 Resultados guardados en {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Incremental Volatility Thresholds for GARCH Trading Bot
+Rolling volatility and its percentiles per asset, updated one bar at a time so
+run_garch derives its BUY/SELL thresholds without rescanning the return history
+"""
+
+import json
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analytics_sql import upsert
+from market_data import INTERVAL_MS
+from streaming_stats import RollingStd, QuantileSketch
+
+
+# Same defaults as the original run_garch thresholds
+DEFAULT_WINDOW = 24       # bars in the rolling std
+DEFAULT_HIGH_QUANTILE = 0.75
+DEFAULT_LOW_QUANTILE = 0.25
+DEFAULT_BUFFER = 0.1      # fraction of the inter-percentile range added on each side
+
+# Percentiles cover the trailing THRESHOLD_DAYS (the candle window run_garch used to
+# rescan), kept as THRESHOLD_BLOCKS sketches that drop out one block at a time
+THRESHOLD_DAYS = 30
+THRESHOLD_BLOCKS = 30
+SKETCH_ACCURACY = 0.005   # relative error of the percentiles
+
+# Engine state per asset and interval, next to the model selection (BigQuery: see README)
+THRESHOLD_TABLE_ID = "garch_threshold_state"
+
+THRESHOLD_SCHEMA = {
+    'asset': 'STRING', 'bar_interval': 'STRING', 'state': 'STRING', 'updated_at': 'TIMESTAMP'
+}
+
+_THRESHOLD_UPDATES = {c: '{new}.' + c for c in THRESHOLD_SCHEMA if c not in ('asset', 'bar_interval')}
+
+
+def horizon_bars(interval, days=THRESHOLD_DAYS):
+    """Bars of `interval` in `days`"""
+    return int(days * 86_400_000 // INTERVAL_MS[interval])
+
+
+class ThresholdEngine:
+    """
+    Dynamic volatility thresholds for one asset
+
+    Each new return updates the rolling std in O(1) and adds the std to a
+    quantile sketch. Sketches are closed every `horizon // blocks` bars and
+    only the last `blocks` are kept, so the percentiles follow the trailing
+    `horizon` bars (to one block of granularity) like the original rescan of
+    the 30-day window, in constant memory. Bars at or before the last
+    processed timestamp are skipped, so the same candle window can be passed
+    on every run.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, high_q=DEFAULT_HIGH_QUANTILE,
+                 low_q=DEFAULT_LOW_QUANTILE, buffer=DEFAULT_BUFFER,
+                 horizon=horizon_bars('1h'), blocks=THRESHOLD_BLOCKS):
+        self.window = window
+        self.high_q = high_q
+        self.low_q = low_q
+        self.buffer = buffer
+        self.horizon = horizon
+        self.block_size = max(1, horizon // blocks)
+        self.rolling = RollingStd(window)
+        self.blocks = deque(maxlen=blocks)
+        self.current = QuantileSketch(SKETCH_ACCURACY)
+        self.last_timestamp = None
+
+    def update(self, ret, timestamp=None):
+        """Add one return (in %); returns the current rolling std"""
+        if timestamp is not None:
+            ts = pd.Timestamp(timestamp)
+            if self.last_timestamp is not None and ts <= self.last_timestamp:
+                return self.rolling.std()
+            self.last_timestamp = ts
+        vol = self.rolling.update(ret)
+        if not np.isnan(vol):
+            self.current.update(vol)
+            if self.current.count >= self.block_size:
+                self.blocks.append(self.current)
+                self.current = QuantileSketch(SKETCH_ACCURACY)
+        return vol
+
+    def update_series(self, returns):
+        """
+        Add the bars of a return series not processed yet
+
+        Args:
+            returns: pd.Series of returns (%) indexed by bar timestamp
+
+        Returns:
+            int: Bars processed
+        """
+        if self.last_timestamp is not None:
+            returns = returns[returns.index > self.last_timestamp]
+        for ts, ret in returns.items():
+            self.update(ret, ts)
+        return len(returns)
+
+    def sketch(self):
+        """Merged sketch of the rolling std values in the window"""
+        merged = QuantileSketch(SKETCH_ACCURACY)
+        for block in list(self.blocks) + [self.current]:
+            merged.merge(block)
+        return merged
+
+    @property
+    def ready(self):
+        return bool(self.blocks) or self.current.count > 0
+
+    def thresholds(self):
+        """
+        Current thresholds
+
+        Returns:
+            dict: threshold_high, threshold_low, vol_75_percentile, vol_25_percentile
+        """
+        sketch = self.sketch()
+        vol_high = sketch.quantile(self.high_q)
+        vol_low = sketch.quantile(self.low_q)
+        buffer = (vol_high - vol_low) * self.buffer
+        return {
+            'threshold_high': vol_high + buffer,
+            'threshold_low': vol_low - buffer,
+            'vol_75_percentile': vol_high,
+            'vol_25_percentile': vol_low
+        }
+
+    def to_dict(self):
+        return {
+            'window': self.window,
+            'high_q': self.high_q,
+            'low_q': self.low_q,
+            'buffer': self.buffer,
+            'horizon': self.horizon,
+            'blocks_max': self.blocks.maxlen,
+            'rolling': self.rolling.to_dict(),
+            'blocks': [block.to_dict() for block in self.blocks],
+            'current': self.current.to_dict(),
+            'last_timestamp': self.last_timestamp.isoformat() if self.last_timestamp is not None else None
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        engine = cls(d['window'], d['high_q'], d['low_q'], d['buffer'], d['horizon'], d['blocks_max'])
+        engine.rolling = RollingStd.from_dict(d['rolling'])
+        engine.blocks.extend(QuantileSketch.from_dict(block) for block in d['blocks'])
+        engine.current = QuantileSketch.from_dict(d['current'])
+        if d.get('last_timestamp'):
+            engine.last_timestamp = pd.Timestamp(d['last_timestamp'])
+        return engine
+
+
+def create_threshold_table(backend):
+    """Create the threshold state table on the SQLite stand-in (BigQuery: see README)"""
+    backend.execute(f"""
+        CREATE TABLE IF NOT EXISTS {backend.table_ref(THRESHOLD_TABLE_ID)} (
+            asset TEXT, bar_interval TEXT, state TEXT, updated_at TEXT,
+            PRIMARY KEY (asset, bar_interval)
+        )
+    """)
+
+
+def get_engine(backend, asset, interval='1h'):
+    """Stored engine of an asset and interval, or a fresh one over THRESHOLD_DAYS"""
+    rows = backend.query(
+        f"SELECT state FROM {backend.table_ref(THRESHOLD_TABLE_ID)} "
+        f"WHERE asset = {backend.placeholder('asset')} AND bar_interval = {backend.placeholder('bar_interval')}",
+        {'asset': asset, 'bar_interval': interval}
+    )
+    if rows:
+        try:
+            return ThresholdEngine.from_dict(json.loads(rows[0]['state']))
+        except (KeyError, TypeError, ValueError):
+            pass
+    return ThresholdEngine(horizon=horizon_bars(interval))
+
+
+def save_engine(backend, asset, engine, interval='1h'):
+    """Store (or replace) the engine of an asset and interval"""
+    values = {
+        'asset': asset,
+        'bar_interval': interval,
+        'state': json.dumps(engine.to_dict()),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+    upsert(backend, THRESHOLD_TABLE_ID, ['asset', 'bar_interval'], values, _THRESHOLD_UPDATES, THRESHOLD_SCHEMA)
+
+
+def closed_bars(returns, interval='1h', now=None):
+    """
+    Bars whose candle has closed by `now`
+
+    The last kline of a fetch is usually still forming: its return is
+    partial, and once last_timestamp moved onto it the engine would skip
+    the completed bar on the next run.
+    """
+    now = pd.Timestamp(now) if now is not None else pd.Timestamp.now(tz='UTC')
+    index = pd.DatetimeIndex(returns.index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    if now.tz is None:
+        now = now.tz_localize('UTC')
+    close_time = index + pd.Timedelta(milliseconds=INTERVAL_MS[interval])
+    return returns[close_time <= now]
+
+
+def update_thresholds(asset, returns, interval='1h', backend=None, now=None):
+    """
+    Feed new closed bars into the asset's engine and return its thresholds
+
+    Without a backend (or if it fails) a fresh engine is fed the whole
+    series, which gives the percentiles of the candle window itself.
+
+    Args:
+        asset: Asset name
+        returns: pd.Series of returns (%) indexed by bar open time
+        interval: Candle interval (engines are kept per interval)
+        backend: BigQueryBackend or SQLiteBackend holding THRESHOLD_TABLE_ID
+        now: Current time (default: now, UTC); bars still open are left for a later run
+
+    Returns:
+        (thresholds dict, bars processed)
+    """
+    engine = None
+    if backend is not None:
+        try:
+            engine = get_engine(backend, asset, interval)
+        except Exception as e:
+            print(f"⚠️ Could not load threshold state: {e}")
+    if engine is None:
+        engine = ThresholdEngine(horizon=horizon_bars(interval))
+    processed = engine.update_series(closed_bars(returns, interval, now))
+    if backend is not None:
+        try:
+            save_engine(backend, asset, engine, interval)
+        except Exception as e:
+            print(f"⚠️ Could not save threshold state: {e}")
+    return engine.thresholds(), processed
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Diario de Trades (append-only)
+Registro de órdenes en SQLite con WAL: cada trade es un INSERT O(1)
+
+Uso:
+    python trade_journal.py compact   # checkpoint del WAL + VACUUM
+    python trade_journal.py import    # importar trades_history.json antiguo
+"""
+
+import os
+import sys
+import json
+import sqlite3
+from datetime import datetime
+
+JOURNAL_FILE = "trades_history.db"
+LEGACY_JSON_FILE = "trades_history.json"
+
+
+class TradeJournal:
+    def __init__(self, path=JOURNAL_FILE):
+        """Abrir (o crear) el diario de trades"""
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: las escrituras son appends al log, un crash no corrompe el historial
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS trades (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                order_id INTEGER,
+                symbol TEXT NOT NULL,
+                side TEXT,
+                type TEXT,
+                status TEXT,
+                quantity TEXT,
+                order_json TEXT,
+                dry_run INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Diarios creados antes de registrar las órdenes simuladas
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(trades)")}
+        if 'dry_run' not in columns:
+            self.conn.execute("ALTER TABLE trades ADD COLUMN dry_run INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol_time ON trades (symbol, timestamp)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_time ON trades (timestamp)")
+        self.conn.commit()
+
+    def append(self, trade):
+        """Añadir un trade (dict con las mismas claves que el historial JSON, dry_run opcional)"""
+        self.conn.execute(
+            "INSERT INTO trades (timestamp, order_id, symbol, side, type, status, quantity, order_json, dry_run) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                trade.get('timestamp', datetime.now().isoformat()),
+                trade.get('order_id'),
+                trade['symbol'],
+                trade.get('side'),
+                trade.get('type'),
+                trade.get('status'),
+                str(trade.get('quantity')),
+                json.dumps(trade.get('order', {})),
+                int(bool(trade.get('dry_run')))
+            )
+        )
+        self.conn.commit()
+
+    def last(self, n=10, symbol=None, dry_run=None):
+        """
+        Últimos n trades en orden cronológico (sin cargar el historial completo)
+
+        Args:
+            n: Número de trades
+            symbol: Solo este símbolo (None: todos)
+            dry_run: True solo simulados, False solo reales, None ambos
+        """
+        sql = "SELECT * FROM trades"
+        where, params = [], []
+        if symbol:
+            where.append("symbol = ?")
+            params.append(symbol)
+        if dry_run is not None:
+            where.append("dry_run = ?")
+            params.append(int(dry_run))
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Por símbolo, el índice (symbol, timestamp) sirve el orden
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?" if symbol else " ORDER BY id DESC LIMIT ?"
+        rows = self.conn.execute(sql, params + [n]).fetchall()
+        return [self._to_trade(r) for r in reversed(rows)]
+
+    def between(self, start, end, symbol=None):
+        """Trades entre dos timestamps ISO (usa los índices de símbolo/tiempo)"""
+        sql = "SELECT * FROM trades WHERE timestamp >= ? AND timestamp < ?"
+        params = [start, end]
+        if symbol:
+            sql += " AND symbol = ?"
+            params.append(symbol)
+        sql += " ORDER BY timestamp"
+        return [self._to_trade(r) for r in self.conn.execute(sql, params)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def compact(self):
+        """Reclamar espacio libre y volcar el WAL al archivo principal"""
+        # En modo WAL el VACUUM también escribe en el log: el checkpoint va después
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.commit()
+
+    def import_legacy_json(self, json_path=LEGACY_JSON_FILE):
+        """
+        Importar el historial antiguo (trades_history.json) una sola vez
+
+        Returns:
+            int: Trades importados
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r') as f:
+            history = json.load(f)
+        with self.conn:
+            for trade in history:
+                self.conn.execute(
+                    "INSERT INTO trades (timestamp, order_id, symbol, side, type, status, quantity, order_json) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (trade['timestamp'], trade.get('order_id'), trade['symbol'], trade.get('side'),
+                     trade.get('type'), trade.get('status'), str(trade.get('quantity')),
+                     json.dumps(trade.get('order', {})))
+                )
+        os.rename(json_path, json_path + ".imported")
+        return len(history)
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _to_trade(row):
+        return {
+            'timestamp': row['timestamp'],
+            'order_id': row['order_id'],
+            'symbol': row['symbol'],
+            'side': row['side'],
+            'type': row['type'],
+            'status': row['status'],
+            'quantity': row['quantity'],
+            'order': json.loads(row['order_json']) if row['order_json'] else {},
+            'dry_run': bool(row['dry_run'])
+        }
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else 'compact'
+    journal = TradeJournal()
+
+    if command == 'import':
+        imported = journal.import_legacy_json()
+        print(f"✅ {imported} trades importados desde {LEGACY_JSON_FILE}")
+    elif command == 'compact':
+        size_before = os.path.getsize(JOURNAL_FILE)
+        wal = JOURNAL_FILE + "-wal"
+        wal_before = os.path.getsize(wal) if os.path.exists(wal) else 0
+        journal.compact()
+        print(f"✅ Diario compactado: {journal.count()} trades")
+        print(f"   Antes: {size_before + wal_before} bytes, después: {os.path.getsize(JOURNAL_FILE)} bytes")
+    else:
+        print(f"❌ Comando desconocido: {command} (usa 'compact' o 'import')")
+
+    journal.close()
@@ -10,6 +10,9 @@ from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import yfinance as yf
+from prediction_store import iter_query_pages
+from streaming_stats import RunningStats, P2Quantile
+from cost_model import CostModel
 
 class Colors:
     GREEN = '\033[92m'
@@ -41,6 +44,112 @@ def print_warning(text):
 def print_info(text):
     print(f"{Colors.CYAN}ℹ️  {text}{Colors.RESET}")
 
+REAL_VOL_WINDOW = 6  # 6 períodos = ~30 min
+ACCURACY_THRESHOLD = 0.5  # 0.5% de tolerancia
+
+class BiasAccumulator:
+    """Estado de los análisis de sesgo, actualizado página por página"""
+
+    def __init__(self, initial_capital=1000, costs=None):
+        self.total = 0
+        self.signal_counts = {'BUY': 0, 'SELL': 0, 'HOLD': 0}
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.first_signal = None
+        self.last_signal = None
+        self.signal_changes = 0
+        self.intervals = RunningStats()
+        self.interval_median = P2Quantile(0.5)
+        self.volatility = RunningStats()
+        # Precisión de volatilidad (predicha vs realizada)
+        self.vol_errors = RunningStats()
+        self.vol_sq_error_sum = 0.0
+        self.vol_accurate = 0
+        self._price_tail = np.array([])
+        self._last_volatility = np.nan
+        # Estrategia
+        self.initial_capital = initial_capital
+        self.first_price = None
+        self.last_price = None
+        self.cash = 0
+        self.btc = 0
+        self.position = None
+        self.trades = 0
+        # Comisión, spread y slippage por trade (ver cost_model.py); la estrategia simulada es BTC
+        self.costs = costs or CostModel.from_env("BTCUSDT")
+
+    def update(self, page):
+        """Procesa una página de predicciones ordenadas por timestamp"""
+        if page.empty:
+            return
+
+        timestamps = pd.to_datetime(page['timestamp'])
+        prices = page['current_price'].to_numpy(dtype=float)
+        vols = page['predicted_volatility'].to_numpy(dtype=float)
+        signals = page['signal'].to_numpy()
+
+        # ANÁLISIS 1: distribución de señales
+        for signal, count in zip(*np.unique(signals, return_counts=True)):
+            self.signal_counts[signal] = self.signal_counts.get(signal, 0) + int(count)
+
+        # ANÁLISIS 2: intervalos entre ejecuciones (minutos)
+        ts = timestamps
+        if self.last_timestamp is not None:
+            ts = pd.concat([pd.Series([self.last_timestamp]), timestamps], ignore_index=True)
+        intervals = ts.diff().dt.total_seconds().to_numpy()[1:] / 60
+        self.intervals.update(intervals)
+        self.interval_median.extend(intervals)
+
+        # ANÁLISIS 3: cambios de señal (enlazando con la página anterior)
+        chained = signals if self.last_signal is None else np.concatenate([[self.last_signal], signals])
+        self.signal_changes += int((chained[1:] != chained[:-1]).sum())
+
+        # ANÁLISIS 4: volatilidad predicha (período anterior) vs realizada
+        ext_prices = np.concatenate([self._price_tail, prices])
+        real_return = pd.Series(ext_prices).pct_change() * 100
+        real_vol = real_return.rolling(window=REAL_VOL_WINDOW).std().to_numpy()[len(self._price_tail):]
+        predicted_prev = np.concatenate([[self._last_volatility], vols[:-1]])
+        valid = ~np.isnan(real_vol) & ~np.isnan(predicted_prev)
+        error = np.abs(predicted_prev[valid] - real_vol[valid])
+        self.vol_errors.update(error)
+        self.vol_sq_error_sum += float((error ** 2).sum())
+        self.vol_accurate += int((error < ACCURACY_THRESHOLD).sum())
+        self._price_tail = ext_prices[-REAL_VOL_WINDOW:]
+        self._last_volatility = vols[-1]
+
+        # ANÁLISIS 5: estrategia (empezar con BUY en primera señal)
+        if self.first_price is None:
+            self.first_price = prices[0]
+            self.btc = self.initial_capital * (1 - self.costs.rate(self.initial_capital)) / self.first_price
+            self.position = 'BUY'
+        # Posición tras cada predicción = última señal BUY/SELL (HOLD mantiene la anterior)
+        active = np.concatenate([[self.position], signals])
+        steps = np.where(np.isin(active, ['BUY', 'SELL']), np.arange(len(active)), 0)
+        positions = active[np.maximum.accumulate(steps)]
+        # Solo se recorren los cambios de posición (los trades)
+        for i in np.flatnonzero(positions[1:] != positions[:-1]):
+            price = prices[i]
+            if positions[i + 1] == 'SELL':
+                notional = self.btc * price
+                self.cash = notional * (1 - self.costs.rate(notional))
+                self.btc = 0
+            else:
+                self.btc = self.cash * (1 - self.costs.rate(self.cash)) / price
+                self.cash = 0
+            self.trades += 1
+        self.position = positions[-1]
+
+        # ANÁLISIS 6: volatilidad observada
+        self.volatility.update(vols)
+
+        self.total += len(page)
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamps.iloc[0]
+            self.first_signal = signals[0]
+        self.last_timestamp = timestamps.iloc[-1]
+        self.last_signal = signals[-1]
+        self.last_price = prices[-1]
+
 def analyze_garch_bias():
     """Analiza si el modelo GARCH tiene sesgos"""
 
@@ -49,49 +158,44 @@ def analyze_garch_bias():
     try:
         client = bigquery.Client(project=PROJECT_ID)
 
-        # Obtener todas las predicciones
-        query = f"""
-        SELECT
-            timestamp,
-            current_price,
-            predicted_volatility,
-            signal,
-            model_params
+        base_query = f"""
         FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
         WHERE timestamp >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 7 DAY)
-        ORDER BY timestamp ASC
         """
 
-        results = client.query(query).result()
-        predictions = list(results)
+        # Contar primero para no descargar nada si hay muy pocos datos
+        count = list(client.query(f"SELECT COUNT(*) AS total {base_query}").result())[0].total
 
-        if len(predictions) < 10:
-            print_warning(f"Muy pocas predicciones para analizar: {len(predictions)}")
+        if count < 10:
+            print_warning(f"Muy pocas predicciones para analizar: {count}")
             print_info("El modelo necesita al menos 10 predicciones para análisis confiable")
             return
 
-        print_success(f"Predicciones encontradas: {len(predictions)}")
+        print_success(f"Predicciones encontradas: {count}")
         print()
 
-        # Convertir a DataFrame
-        data = []
-        for pred in predictions:
-            data.append({
-                'timestamp': pred.timestamp,
-                'price': float(pred.current_price),
-                'volatility': float(pred.predicted_volatility),
-                'signal': pred.signal
-            })
+        # Recorrer las predicciones por páginas (memoria acotada)
+        query = f"""
+        SELECT
+            timestamp,
+            current_price,
+            predicted_volatility,
+            signal
+        {base_query}
+        ORDER BY timestamp ASC
+        """
 
-        df = pd.DataFrame(data)
+        acc = BiasAccumulator()
+        for page in iter_query_pages(client, query):
+            acc.update(page)
 
         # ANÁLISIS 1: Distribución de señales
         print_info("📊 ANÁLISIS 1: Distribución de Señales")
 
-        buy_count = (df['signal'] == 'BUY').sum()
-        sell_count = (df['signal'] == 'SELL').sum()
-        hold_count = (df['signal'] == 'HOLD').sum()
-        total = len(df)
+        buy_count = acc.signal_counts['BUY']
+        sell_count = acc.signal_counts['SELL']
+        hold_count = acc.signal_counts['HOLD']
+        total = acc.total
 
         buy_pct = (buy_count / total) * 100
         sell_pct = (sell_count / total) * 100
@@ -120,14 +224,11 @@ def analyze_garch_bias():
         # ANÁLISIS 2: ¿El modelo recalcula cada vez?
         print_info("🔄 ANÁLISIS 2: ¿Recalcula el Modelo Cada 5 Minutos?")
 
-        df['time_diff'] = df['timestamp'].diff().dt.total_seconds() / 60
-
-        # Filtrar outliers (primero valor es NaN)
-        time_diffs = df['time_diff'].dropna()
+        avg_interval = np.nan
 
-        if len(time_diffs) > 0:
-            avg_interval = time_diffs.mean()
-            median_interval = time_diffs.median()
+        if acc.intervals.count > 0:
+            avg_interval = acc.intervals.mean
+            median_interval = acc.interval_median.value()
 
             print(f"   Intervalo promedio: {avg_interval:.1f} minutos")
             print(f"   Intervalo mediano:  {median_interval:.1f} minutos")
@@ -146,17 +247,17 @@ def analyze_garch_bias():
         # ANÁLISIS 3: ¿Las predicciones cambian?
         print_info("🎯 ANÁLISIS 3: ¿Las Predicciones Cambian o Son Siempre Iguales?")
 
-        unique_signals = df['signal'].nunique()
-        signal_changes = (df['signal'] != df['signal'].shift()).sum() - 1  # -1 por el primero
+        unique_signals = sum(1 for count in acc.signal_counts.values() if count > 0)
+        signal_changes = acc.signal_changes
 
         print(f"   Señales únicas: {unique_signals}/3 posibles (BUY, SELL, HOLD)")
         print(f"   Cambios de señal: {signal_changes} veces")
 
         if unique_signals == 1:
-            print_error(f"🚨 MODELO ESTÁTICO: Siempre da la misma señal ({df['signal'].iloc[0]})")
+            print_error(f"🚨 MODELO ESTÁTICO: Siempre da la misma señal ({acc.first_signal})")
             print_warning("   El modelo NO está funcionando correctamente")
-        elif signal_changes < 2 and len(df) > 50:
-            print_warning(f"⚠️  Pocas variaciones ({signal_changes} cambios en {len(df)} predicciones)")
+        elif signal_changes < 2 and total > 50:
+            print_warning(f"⚠️  Pocas variaciones ({signal_changes} cambios en {total} predicciones)")
         else:
             print_success(f"✅ El modelo SÍ cambia sus predicciones ({signal_changes} cambios)")
 
@@ -165,25 +266,16 @@ def analyze_garch_bias():
         # ANÁLISIS 4: Volatilidad predicha vs real
         print_info("📈 ANÁLISIS 4: Precisión de Volatilidad Predicha")
 
-        # Calcular volatilidad real (siguiente período)
-        df['real_return'] = df['price'].pct_change() * 100
-        df['real_volatility'] = df['real_return'].rolling(window=6).std()  # 6 períodos = ~30 min
-
-        # Comparar predicha vs real (shift para comparar predicción con realidad siguiente)
-        df['predicted_vol_prev'] = df['volatility'].shift(1)
+        # Error entre la predicción anterior y la volatilidad realizada
+        n_comparisons = acc.vol_errors.count
 
-        # Calcular error solo donde tenemos ambos valores
-        valid_comparison = df.dropna(subset=['predicted_vol_prev', 'real_volatility'])
-
-        if len(valid_comparison) > 5:
-            error = np.abs(valid_comparison['predicted_vol_prev'] - valid_comparison['real_volatility'])
-            mae = error.mean()
-            rmse = np.sqrt((error ** 2).mean())
+        if n_comparisons > 5:
+            mae = acc.vol_errors.mean
+            rmse = np.sqrt(acc.vol_sq_error_sum / n_comparisons)
 
             # Calcular accuracy
-            threshold = 0.5  # 0.5% de tolerancia
-            accurate = (error < threshold).sum()
-            accuracy_pct = (accurate / len(error)) * 100
+            threshold = ACCURACY_THRESHOLD
+            accuracy_pct = (acc.vol_accurate / n_comparisons) * 100
 
             print(f"   Error Absoluto Medio (MAE): {mae:.4f}%")
             print(f"   RMSE: {rmse:.4f}%")
@@ -203,44 +295,11 @@ def analyze_garch_bias():
         # ANÁLISIS 5: Performance de la estrategia
         print_info("💰 ANÁLISIS 5: Performance Real vs HODL")
 
-        # Simular estrategia
-        initial_capital = 1000
-        cash = 0
-        btc = 0
-        position = None
-        trades = []
-
-        # Empezar con BUY en primera señal
-        first_price = df.iloc[0]['price']
-        btc = initial_capital / first_price
-        position = 'BUY'
-
-        for idx, row in df.iterrows():
-            signal = row['signal']
-            price = row['price']
-
-            if signal != position:
-                if signal == 'SELL' and position == 'BUY':
-                    # Vender
-                    cash = btc * price
-                    pnl = cash - initial_capital
-                    trades.append({'action': 'SELL', 'price': price, 'pnl': pnl})
-                    btc = 0
-                    position = 'SELL'
-
-                elif signal == 'BUY' and position == 'SELL':
-                    # Comprar
-                    btc = cash / price
-                    cash = 0
-                    position = 'BUY'
-                    trades.append({'action': 'BUY', 'price': price})
-
-        # Valor final
-        last_price = df.iloc[-1]['price']
-        if btc > 0:
-            final_value = btc * last_price
-        else:
-            final_value = cash
+        # Estrategia simulada durante el recorrido de las páginas
+        initial_capital = acc.initial_capital
+        first_price = acc.first_price
+        last_price = acc.last_price
+        final_value = acc.btc * last_price if acc.btc > 0 else acc.cash
 
         # HODL comparison
         hodl_btc = initial_capital / first_price
@@ -256,7 +315,8 @@ def analyze_garch_bias():
         print(f"   Retorno GARCH: {strategy_return:+.2f}%")
         print(f"   Retorno HODL:  {hodl_return:+.2f}%")
         print(f"   Diferencia:    {strategy_return - hodl_return:+.2f}%")
-        print(f"   Trades ejecutados: {len(trades)}")
+        print(f"   Trades ejecutados: {acc.trades}")
+        print(f"   Costos: {acc.costs}")
 
         print()
 
@@ -279,8 +339,8 @@ def analyze_garch_bias():
         print(f"   - Entre 1.5% y 3.0%   → {Colors.YELLOW}HOLD{Colors.RESET}")
         print()
 
-        vol_mean = df['volatility'].mean()
-        vol_std = df['volatility'].std()
+        vol_mean = acc.volatility.mean
+        vol_std = acc.volatility.std()
 
         print(f"   Volatilidad promedio observada: {vol_mean:.4f}%")
         print(f"   Desviación estándar: {vol_std:.4f}%")
@@ -301,9 +361,9 @@ def analyze_garch_bias():
         # CONCLUSIÓN FINAL
         print_header("📋 RESUMEN Y CONCLUSIONES")
 
-        print(f"{Colors.BOLD}Periodo analizado:{Colors.RESET} {len(df)} predicciones")
-        print(f"{Colors.BOLD}Desde:{Colors.RESET} {df.iloc[0]['timestamp']}")
-        print(f"{Colors.BOLD}Hasta:{Colors.RESET} {df.iloc[-1]['timestamp']}")
+        print(f"{Colors.BOLD}Periodo analizado:{Colors.RESET} {total} predicciones")
+        print(f"{Colors.BOLD}Desde:{Colors.RESET} {acc.first_timestamp}")
+        print(f"{Colors.BOLD}Hasta:{Colors.RESET} {acc.last_timestamp}")
         print()
 
         # Calcular score
@@ -323,7 +383,7 @@ def analyze_garch_bias():
             score += 1
 
         # Test 4: Accuracy razonable
-        if len(valid_comparison) > 5 and accuracy_pct > 40:
+        if n_comparisons > 5 and accuracy_pct > 40:
             score += 1
 
         # Test 5: Supera o iguala HODL
@@ -5,12 +5,33 @@ Compara las predicciones de tu bot contra datos reales de Binance
 """
 
 import json
-import os
-from datetime import datetime, timedelta
-from binance.client import Client
+from datetime import datetime, timedelta, timezone
+from rate_limit import GovernedClient
 from binance.exceptions import BinanceAPIException
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from market_data import BinanceKlinesSource, INTERVAL_MS, KLINES_PAGE_LIMIT
+from prediction_log import PredictionLog
+
+# Cada predicción se puntúa con el cierre de la vela de 1m que contiene su validation_time
+VALIDATION_INTERVAL = '1m'
+
+
+def local_to_utc(timestamps):
+    """
+    Timestamps ISO del log (hora local naive, datetime.now()) -> UTC
+
+    El offset se resuelve para cada fecha con las reglas de la zona del
+    sistema, así las predicciones a ambos lados de un cambio de horario
+    quedan en su hora correcta.
+
+    Returns:
+        pd.DatetimeIndex en UTC
+    """
+    return pd.DatetimeIndex([
+        pd.Timestamp(ts).to_pydatetime().astimezone(timezone.utc) for ts in timestamps
+    ])
 
 class Colors:
     GREEN = '\033[92m'
@@ -22,13 +43,123 @@ class Colors:
     RESET = '\033[0m'
     BOLD = '\033[1m'
 
+def score_predictions(types, predicted_values, initial_prices, actual_prices):
+    """
+    Puntuar un lote de predicciones de forma vectorizada
+
+    Mismas reglas que la validación individual: price_up/price_down por
+    dirección, price_target con error < 5%, price_range dentro del rango,
+    change_percentage con error < 2 puntos.
+
+    Returns:
+        dict de arrays: price_change_pct, success, accuracy, error
+    """
+    types = np.asarray(types)
+    initial = np.asarray(initial_prices, dtype=float)
+    actual = np.asarray(actual_prices, dtype=float)
+    n = len(types)
+
+    change = (actual - initial) / initial * 100
+    success = np.zeros(n, dtype=bool)
+    accuracy = np.zeros(n)
+    error = np.zeros(n)
+
+    up = types == 'price_up'
+    success[up] = change[up] > 0
+    accuracy[up] = np.clip(change[up] * 10, 0, 100)
+
+    down = types == 'price_down'
+    success[down] = change[down] < 0
+    accuracy[down] = np.clip(np.abs(change[down]) * 10, 0, 100)
+
+    target = types == 'price_target'
+    if target.any():
+        values = np.array([float(v) for v in np.asarray(predicted_values, dtype=object)[target]])
+        err = np.abs((actual[target] - values) / values) * 100
+        error[target] = err
+        success[target] = err < 5
+        accuracy[target] = np.maximum(0, 100 - err)
+
+    in_range = types == 'price_range'
+    if in_range.any():
+        bounds = np.array([[float(lo), float(hi)] for lo, hi in np.asarray(predicted_values, dtype=object)[in_range]])
+        success[in_range] = (bounds[:, 0] <= actual[in_range]) & (actual[in_range] <= bounds[:, 1])
+        accuracy[in_range] = np.where(success[in_range], 100, 0)
+
+    pct = types == 'change_percentage'
+    if pct.any():
+        values = np.array([float(v) for v in np.asarray(predicted_values, dtype=object)[pct]])
+        err = np.abs(change[pct] - values)
+        error[pct] = err
+        success[pct] = err < 2
+        accuracy[pct] = np.maximum(0, 100 - err * 10)
+
+    return {'price_change_pct': change, 'success': success, 'accuracy': accuracy, 'error': error}
+
+
+def price_windows(times, interval=VALIDATION_INTERVAL, max_candles=KLINES_PAGE_LIMIT):
+    """
+    Agrupar instantes en ventanas de a lo sumo max_candles velas
+
+    Las predicciones cercanas comparten una descarga y una predicción vieja
+    no obliga a bajar todo el rango hasta hoy.
+
+    Args:
+        times: pd.DatetimeIndex (UTC)
+
+    Returns:
+        list de (start, end): rangos [start, end) a descargar
+    """
+    step = pd.Timedelta(milliseconds=INTERVAL_MS[interval])
+    windows = []
+    for ts in sorted(times):
+        start = ts.floor(step)
+        if windows and start + step <= windows[-1][0] + max_candles * step:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], start + step))
+        else:
+            windows.append((start, start + step))
+    return windows
+
+
+def prices_at(closes, times, interval=VALIDATION_INTERVAL):
+    """
+    Cierre de la vela que contiene cada instante
+
+    Args:
+        closes: pd.Series de cierres indexada por open time (UTC)
+        times: pd.DatetimeIndex (UTC)
+
+    Returns:
+        np.ndarray: precios (NaN si ninguna vela descargada contiene el instante)
+    """
+    candle_ns = closes.index.as_unit('ns').asi8
+    target_ns = times.as_unit('ns').asi8
+    idx = np.searchsorted(candle_ns, target_ns, side='right') - 1
+    inside = idx >= 0
+    inside[inside] = target_ns[inside] < candle_ns[idx[inside]] + INTERVAL_MS[interval] * 1_000_000
+    prices = np.full(len(target_ns), np.nan)
+    prices[inside] = closes.values[idx[inside]]
+    return prices
+
+
 class PredictionValidator:
-    def __init__(self, testnet=True):
-        """Inicializar validador de predicciones"""
-        self.client = Client("", "", testnet=testnet)
-        self.predictions_file = "predictions_log.json"
+    def __init__(self, testnet=True, feed=None):
+        """
+        Inicializar validador de predicciones
+
+        Args:
+            testnet: Usar testnet de Binance
+            feed: MarketDataFeed ya iniciado (market_feed.py); si es None, usa REST
+        """
+        self.client = GovernedClient("", "", testnet=testnet)
+        self.feed = feed
         self.results_file = "validation_results.json"
 
+        # Registro indexado (migra el log JSON antiguo la primera vez)
+        self.store = PredictionLog()
+        if self.store.count() == 0:
+            self.store.import_legacy_json()
+
     def log_prediction(self, symbol, prediction_type, predicted_value,
                       timeframe_hours=24, context=None):
         """
@@ -44,8 +175,7 @@ class PredictionValidator:
 
         # Obtener precio actual
         try:
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            current_price = float(ticker['price'])
+            current_price = self._get_current_price(symbol)
         except Exception as e:
             print(f"{Colors.RED}❌ Error obteniendo precio: {e}{Colors.RESET}")
             return None
@@ -64,13 +194,8 @@ class PredictionValidator:
             'result': None
         }
 
-        # Cargar predicciones existentes
-        predictions = self._load_predictions()
-        predictions.append(prediction)
-
-        # Guardar
-        with open(self.predictions_file, 'w') as f:
-            json.dump(predictions, f, indent=2)
+        # INSERT indexado, sin releer el historial
+        self.store.append(prediction)
 
         print(f"{Colors.GREEN}✅ Predicción registrada:{Colors.RESET}")
         print(f"   ID: {prediction['id']}")
@@ -82,164 +207,128 @@ class PredictionValidator:
         return prediction['id']
 
     def validate_predictions(self):
-        """Validar predicciones que ya cumplieron su timeframe"""
+        """
+        Validar predicciones que ya cumplieron su timeframe
+
+        Las predicciones vencidas se agrupan por símbolo: una sola descarga
+        de klines por símbolo cubre todas sus ventanas, y los resultados se
+        calculan de forma vectorizada.
+        """
 
-        predictions = self._load_predictions()
         now = datetime.now()
-        validated_count = 0
 
         print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.RESET}")
         print(f"{Colors.BOLD}{Colors.BLUE}🔍 VALIDANDO PREDICCIONES{Colors.RESET}")
         print(f"{Colors.BOLD}{Colors.BLUE}{'='*70}{Colors.RESET}\n")
 
-        for pred in predictions:
-            if pred['validated']:
-                continue
+        # Índice (validated, validation_time): solo se leen las vencidas
+        due = self.store.due(now.isoformat())
 
-            validation_time = datetime.fromisoformat(pred['validation_time'])
+        results = {}
+        if due:
+            for symbol, group in pd.DataFrame(due).groupby('symbol'):
+                results.update(self._validate_symbol_batch(symbol, group))
+            self.store.save_results(due, results)
 
-            if now >= validation_time:
-                # Es hora de validar
-                result = self._validate_single_prediction(pred)
-                pred['validated'] = True
-                pred['result'] = result
-                validated_count += 1
-
-        # Guardar resultados actualizados
-        with open(self.predictions_file, 'w') as f:
-            json.dump(predictions, f, indent=2)
+        validated_count = len(results)
 
         # Guardar resumen de resultados
-        self._save_validation_summary(predictions)
+        self._save_validation_summary()
 
         print(f"\n{Colors.CYAN}📊 Predicciones validadas: {validated_count}{Colors.RESET}\n")
 
         return validated_count
 
-    def _validate_single_prediction(self, pred):
-        """Validar una predicción individual"""
-
-        symbol = pred['symbol']
-        pred_type = pred['prediction_type']
-        predicted_value = pred['predicted_value']
-        initial_price = pred['current_price']
-
-        print(f"{Colors.BLUE}🔍 Validando: {pred['id']}{Colors.RESET}")
-        print(f"   Símbolo: {symbol}")
-        print(f"   Tipo: {pred_type}")
-        print(f"   Predicción: {predicted_value}")
-        print(f"   Precio inicial: ${initial_price:,.2f}")
+    def _price_path(self, symbol, times):
+        """
+        Cierres de 1m alrededor de cada instante (una descarga por ventana)
 
-        try:
-            # Obtener precio actual
-            ticker = self.client.get_symbol_ticker(symbol=symbol)
-            current_price = float(ticker['price'])
-
-            # Calcular cambio real
-            price_change_pct = ((current_price - initial_price) / initial_price) * 100
-
-            print(f"   Precio actual: ${current_price:,.2f}")
-            print(f"   Cambio real: {price_change_pct:+.2f}%")
-
-            # Validar según el tipo de predicción
-            result = {
-                'actual_price': current_price,
-                'price_change_pct': price_change_pct,
-                'validation_time': datetime.now().isoformat(),
-                'success': False,
-                'accuracy': 0.0,
-                'error': 0.0
-            }
+        Returns:
+            pd.Series: Close indexado por open time (UTC)
+        """
+        source = BinanceKlinesSource(client=self.client)
+        frames = [source.fetch(symbol, start.to_pydatetime(), end.to_pydatetime(), VALIDATION_INTERVAL)['Close']
+                  for start, end in price_windows(times)]
+        closes = pd.concat(frames) if frames else pd.Series(dtype=float)
+        return closes[~closes.index.duplicated(keep='last')].sort_index()
 
-            if pred_type == 'price_up':
-                # Predicción: precio subirá
-                result['success'] = price_change_pct > 0
-                result['accuracy'] = max(0, min(100, price_change_pct * 10))  # Escala 0-100
-
-            elif pred_type == 'price_down':
-                # Predicción: precio bajará
-                result['success'] = price_change_pct < 0
-                result['accuracy'] = max(0, min(100, abs(price_change_pct) * 10))
-
-            elif pred_type == 'price_target':
-                # Predicción: precio alcanzará valor específico
-                target = float(predicted_value)
-                error_pct = abs((current_price - target) / target) * 100
-                result['error'] = error_pct
-                result['success'] = error_pct < 5  # Éxito si error < 5%
-                result['accuracy'] = max(0, 100 - error_pct)
-
-            elif pred_type == 'price_range':
-                # Predicción: precio estará en rango
-                min_price, max_price = predicted_value
-                result['success'] = min_price <= current_price <= max_price
-                result['accuracy'] = 100 if result['success'] else 0
-
-            elif pred_type == 'change_percentage':
-                # Predicción: cambio de porcentaje específico
-                predicted_pct = float(predicted_value)
-                error_pct = abs(price_change_pct - predicted_pct)
-                result['error'] = error_pct
-                result['success'] = error_pct < 2  # Éxito si error < 2%
-                result['accuracy'] = max(0, 100 - (error_pct * 10))
-
-            # Mostrar resultado
-            if result['success']:
-                print(f"   {Colors.GREEN}✅ PREDICCIÓN CORRECTA{Colors.RESET}")
-                print(f"   Accuracy: {result['accuracy']:.1f}%")
-            else:
-                print(f"   {Colors.RED}❌ PREDICCIÓN INCORRECTA{Colors.RESET}")
-                if result['error'] > 0:
-                    print(f"   Error: {result['error']:.2f}%")
+    def _validate_symbol_batch(self, symbol, group):
+        """
+        Validar todas las predicciones vencidas de un símbolo
 
-            print()
-            return result
+        Returns:
+            dict: id de predicción -> resultado
+        """
+        validation_times = local_to_utc(group['validation_time'])
 
+        try:
+            closes = self._price_path(symbol, validation_times)
+            if closes.empty:
+                raise ValueError("Sin velas para el rango")
         except Exception as e:
-            print(f"   {Colors.RED}❌ Error validando: {e}{Colors.RESET}\n")
-            return {
-                'error': str(e),
-                'success': False,
-                'accuracy': 0.0
+            print(f"   {Colors.RED}❌ Error validando {symbol}: {e}{Colors.RESET}\n")
+            return {pred_id: {'error': str(e), 'success': False, 'accuracy': 0.0}
+                    for pred_id in group['id']}
+
+        # Sin vela que contenga el validation_time: quedan sin validar para el próximo intento
+        actual = prices_at(closes, validation_times)
+        covered = ~np.isnan(actual)
+        if not covered.all():
+            print(f"   {Colors.YELLOW}⚠️  {symbol}: {int((~covered).sum())} predicciones sin velas, "
+                  f"quedan pendientes{Colors.RESET}")
+        group = group[covered]
+        actual = actual[covered]
+
+        scored = score_predictions(
+            group['prediction_type'].values,
+            group['predicted_value'].values,
+            group['current_price'].values.astype(float),
+            actual
+        )
+
+        validation_time = datetime.now().isoformat()
+        results = {}
+        for i, pred_id in enumerate(group['id']):
+            results[pred_id] = {
+                'actual_price': float(actual[i]),
+                'price_change_pct': float(scored['price_change_pct'][i]),
+                'validation_time': validation_time,
+                'success': bool(scored['success'][i]),
+                'accuracy': float(scored['accuracy'][i]),
+                'error': float(scored['error'][i])
             }
 
+        successful = int(scored['success'].sum())
+        print(f"{Colors.BLUE}🔍 {symbol}: {len(group)} predicciones{Colors.RESET}")
+        print(f"   {Colors.GREEN}✅ Correctas: {successful}{Colors.RESET}   "
+              f"{Colors.RED}❌ Incorrectas: {len(group) - successful}{Colors.RESET}\n")
+        return results
+
     def get_statistics(self):
         """Obtener estadísticas de accuracy del bot"""
 
-        predictions = self._load_predictions()
-        validated = [p for p in predictions if p['validated']]
+        # Contadores agregados por (símbolo, tipo): no se recorre el historial
+        counters = self.store.stats()
+        total = sum(c['total'] for c in counters)
 
-        if not validated:
+        if not total:
             print(f"{Colors.YELLOW}⚠️  No hay predicciones validadas aún{Colors.RESET}")
             return None
 
-        # Calcular estadísticas
-        total = len(validated)
-        successful = len([p for p in validated if p['result']['success']])
+        successful = sum(c['successful'] for c in counters)
         failed = total - successful
 
         success_rate = (successful / total) * 100
-        avg_accuracy = sum(p['result']['accuracy'] for p in validated) / total
+        avg_accuracy = sum(c['accuracy_sum'] for c in counters) / total
 
-        # Estadísticas por tipo
+        # Estadísticas por tipo y por símbolo
         by_type = {}
-        for pred in validated:
-            pred_type = pred['prediction_type']
-            if pred_type not in by_type:
-                by_type[pred_type] = {'total': 0, 'successful': 0}
-            by_type[pred_type]['total'] += 1
-            if pred['result']['success']:
-                by_type[pred_type]['successful'] += 1
-
-        # Estadísticas por símbolo
         by_symbol = {}
-        for pred in validated:
-            symbol = pred['symbol']
-            if symbol not in by_symbol:
-                by_symbol[symbol] = {'total': 0, 'successful': 0}
-            by_symbol[symbol]['total'] += 1
-            if pred['result']['success']:
-                by_symbol[symbol]['successful'] += 1
+        for c in counters:
+            for key, breakdown in ((c['prediction_type'], by_type), (c['symbol'], by_symbol)):
+                entry = breakdown.setdefault(key, {'total': 0, 'successful': 0})
+                entry['total'] += c['total']
+                entry['successful'] += c['successful']
 
         stats = {
             'total_predictions': total,
@@ -310,17 +399,16 @@ class PredictionValidator:
             print(f"   {Colors.RED}❌ POBRE - Considera revisar tu estrategia{Colors.RESET}")
         print()
 
-    def _load_predictions(self):
-        """Cargar predicciones del archivo"""
-        if not os.path.exists(self.predictions_file):
-            return []
-        try:
-            with open(self.predictions_file, 'r') as f:
-                return json.load(f)
-        except:
-            return []
+    def _get_current_price(self, symbol):
+        """Precio desde el feed en memoria, o REST si no hay dato fresco"""
+        if self.feed is not None:
+            price = self.feed.get_price(symbol)
+            if price is not None:
+                return price
+        ticker = self.client.get_symbol_ticker(symbol=symbol)
+        return float(ticker['price'])
 
-    def _save_validation_summary(self, predictions):
+    def _save_validation_summary(self):
         """Guardar resumen de validaciones"""
         stats = self.get_statistics()
         if stats:
@@ -7,8 +7,8 @@ import chromadb
 from chromadb.config import Settings
 import google.generativeai as genai
 import os
-from datetime import datetime
 import json
+import hashlib
 
 
 # Initialize ChromaDB client
@@ -70,6 +70,51 @@ def generate_embeddings(text):
         return None
 
 
+def compute_report_id(metadata):
+    """
+    Compute a content-addressed ID for a report
+    
+    The hash covers only the summary the report is generated from (market
+    figures and the last prediction timestamp), not the Gemini text or the
+    generation time, so asking for a report again before a new prediction
+    arrives yields the same ID.
+    
+    Args:
+        metadata (dict): Report metadata (price, volatility, signal, etc.)
+    
+    Returns:
+        str: SHA-256 hex digest
+    """
+    content = {
+        'price': metadata.get('price'),
+        'volatility': metadata.get('volatility'),
+        'signal': metadata.get('signal'),
+        'avg_volatility': metadata.get('avg_volatility'),
+        'persistence': metadata.get('persistence'),
+        'num_predictions': metadata.get('num_predictions'),
+        'last_timestamp': metadata.get('last_timestamp')
+    }
+    payload = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_report(report_id):
+    """
+    Stored report for a report ID
+    
+    Returns:
+        (report_text, metadata) or None if it was never stored
+    """
+    try:
+        collection = get_or_create_collection()
+        existing = collection.get(ids=[f"report_{report_id}"])
+        if existing and existing.get('ids'):
+            return existing['documents'][0], existing['metadatas'][0]
+    except Exception as e:
+        print(f"Error reading report: {e}")
+    return None
+
+
 def store_report(report_text, metadata, pdf_url=None):
     """
     Store a report in the vector database
@@ -85,9 +130,14 @@ def store_report(report_text, metadata, pdf_url=None):
     try:
         collection = get_or_create_collection()
         
-        # Generate unique ID
-        doc_id = f"report_{metadata.get('timestamp', datetime.now().isoformat())}"
-        doc_id = doc_id.replace(':', '-').replace(' ', '_')
+        # Content-addressed ID: same summary -> same document
+        doc_id = f"report_{compute_report_id(metadata)}"
+        
+        # Skip re-embedding if the report is already stored
+        existing = collection.get(ids=[doc_id])
+        if existing and existing.get('ids'):
+            print(f"ℹ️  Report already in vector DB, skipping: {doc_id}")
+            return doc_id
         
         # Prepare metadata (ChromaDB requires string or numeric values)
         chroma_metadata = {
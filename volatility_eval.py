@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Evaluación Walk-Forward de Volatilidad
+Alinea cada pronóstico guardado con la volatilidad realizada de la ventana
+siguiente (velas horarias o de minuto en caché) y calcula MAE, RMSE, QLIKE
+y hit-rate por activo sobre todo el historial
+
+Uso:
+    python volatility_eval.py                   # predicciones desde BigQuery, velas de 1h
+    python volatility_eval.py --local           # espejo Parquet local
+    python volatility_eval.py --interval 1m     # volatilidad realizada con velas de minuto
+    python volatility_eval.py --source binance  # fuente de velas (ver market_data.py)
+"""
+
+import os
+import sys
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from google.cloud import bigquery
+from market_data import get_data_source, INTERVAL_MS, OHLCV_COLUMNS
+from prediction_store import iter_query_pages, iter_mirror, PAGE_SIZE
+
+PROJECT_ID = "travel-recomender"
+DATASET_ID = "trading_bot"
+TABLE_ID = "garch_predictions"
+
+# Velas descargadas se guardan aquí y solo se pide lo que falta
+BAR_CACHE_DIR = "/tmp/garch_bars"
+
+# Horizonte de los pronósticos guardados (run_garch usa horizon=1 sobre velas de 1h)
+FORECAST_HORIZON = timedelta(hours=1)
+
+
+class Colors:
+    GREEN = '\033[92m'
+    RED = '\033[91m'
+    YELLOW = '\033[93m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+    BOLD = '\033[1m'
+
+
+def load_bars(asset, start, end, interval='1h', source=None, cache_dir=BAR_CACHE_DIR):
+    """
+    Velas de un activo desde la caché Parquet, descargando solo los huecos
+
+    Returns:
+        pd.DataFrame: OHLCV normalizado que cubre [start, end) (vacío si no hay velas)
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{asset}_{interval}.parquet")
+    cached = pd.read_parquet(path) if os.path.exists(path) else None
+
+    missing = []
+    if cached is None or cached.empty:
+        missing.append((start, end))
+    else:
+        if start < cached.index[0]:
+            missing.append((start, cached.index[0].to_pydatetime()))
+        if end > cached.index[-1]:
+            missing.append((cached.index[-1].to_pydatetime(), end))
+
+    if missing:
+        source = source or get_data_source()
+        frames = [cached] if cached is not None else []
+        frames += [source.fetch(asset, s, e, interval) for s, e in missing]
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame(columns=OHLCV_COLUMNS, index=pd.DatetimeIndex([], tz='UTC', name='timestamp'),
+                                dtype=float)
+        cached = pd.concat(frames)
+        cached = cached[~cached.index.duplicated(keep='last')].sort_index()
+        cached.to_parquet(path)
+
+    return cached[(cached.index >= start) & (cached.index < end)]
+
+
+class RealizedVolatility:
+    """
+    Volatilidad realizada en cualquier ventana en O(log n)
+
+    Guarda la suma acumulada de retornos al cuadrado (en %) indexada por el
+    cierre de cada vela; la varianza de (t0, t1] es una resta.
+    """
+
+    def __init__(self, bars, interval):
+        close_ms = bars.index.as_unit('ns').asi8 // 1_000_000 + INTERVAL_MS[interval]
+        returns = 100 * bars['Close'].pct_change().values
+        self.close_ms = close_ms[1:]
+        self.cum_sq = np.concatenate([[0.0], np.cumsum(returns[1:] ** 2)])
+
+    def window(self, start_ms, end_ms):
+        """
+        Volatilidad realizada de las ventanas (start, end]
+
+        Returns:
+            (vol, valid): arrays; valid=False si la ventana no está cubierta por velas
+        """
+        lo = np.searchsorted(self.close_ms, start_ms, side='right')
+        hi = np.searchsorted(self.close_ms, end_ms, side='right')
+        covered = len(self.close_ms) > 0
+        valid = (hi > lo) & covered & (end_ms <= (self.close_ms[-1] if covered else 0))
+        return np.sqrt(self.cum_sq[hi] - self.cum_sq[lo]), valid
+
+
+class ForecastErrors:
+    """Sumas de error por activo, acumuladas página por página"""
+
+    def __init__(self):
+        self.count = 0
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.qlike_sum = 0.0
+        self.qlike_count = 0
+        self.hits = 0
+        self.hit_count = 0
+
+    def update(self, forecast, realized, previous):
+        """
+        Args:
+            forecast: Volatilidad pronosticada (%)
+            realized: Volatilidad realizada en la ventana pronosticada (%)
+            previous: Volatilidad realizada en la ventana anterior (%)
+        """
+        err = forecast - realized
+        self.count += len(err)
+        self.abs_sum += np.abs(err).sum()
+        self.sq_sum += (err ** 2).sum()
+
+        # QLIKE sobre varianzas (indefinido si la varianza realizada es 0)
+        f_var, r_var = forecast ** 2, realized ** 2
+        ok = (f_var > 0) & (r_var > 0)
+        ratio = r_var[ok] / f_var[ok]
+        self.qlike_sum += (ratio - np.log(ratio) - 1).sum()
+        self.qlike_count += int(ok.sum())
+
+        # Hit-rate: ¿el pronóstico anticipa si la volatilidad sube o baja?
+        moved = realized != previous
+        self.hits += int((np.sign(forecast - previous) == np.sign(realized - previous))[moved].sum())
+        self.hit_count += int(moved.sum())
+
+    def metrics(self):
+        if self.count == 0:
+            return None
+        return {
+            'count': self.count,
+            'mae': self.abs_sum / self.count,
+            'rmse': float(np.sqrt(self.sq_sum / self.count)),
+            'qlike': self.qlike_sum / self.qlike_count if self.qlike_count else np.nan,
+            'hit_rate': 100 * self.hits / self.hit_count if self.hit_count else np.nan
+        }
+
+
+class WalkForwardEvaluator:
+    """Evaluación de pronósticos de varios activos contra velas en caché"""
+
+    def __init__(self, interval='1h', horizon=FORECAST_HORIZON, source=None):
+        self.interval = interval
+        self.horizon_ms = int(horizon.total_seconds() * 1000)
+        self.source = source
+        self.realized = {}
+        self.errors = {}
+        self.skipped = 0
+
+    def prepare(self, ranges):
+        """
+        Cargar velas para cada activo
+
+        Args:
+            ranges: dict activo -> (primer timestamp, último timestamp) de sus pronósticos
+        """
+        horizon = timedelta(milliseconds=self.horizon_ms)
+        for asset, (first, last) in ranges.items():
+            start = first - horizon - timedelta(milliseconds=2 * INTERVAL_MS[self.interval])
+            end = last + horizon + timedelta(milliseconds=INTERVAL_MS[self.interval])
+            bars = load_bars(asset, start, end, self.interval, self.source)
+            if len(bars) < 2:
+                # Sin retornos: sus pronósticos cuentan como omitidos en update()
+                print(f"{Colors.YELLOW}⚠️  {asset}: sin velas de {self.interval}, se omite{Colors.RESET}")
+                continue
+            self.realized[asset] = RealizedVolatility(bars, self.interval)
+            self.errors[asset] = ForecastErrors()
+
+    def update(self, page):
+        """Evaluar una página de pronósticos (columnas asset, timestamp, predicted_volatility)"""
+        ts_ms = pd.to_datetime(page['timestamp'], utc=True).dt.as_unit('ns').astype('int64').values // 1_000_000
+        forecast = page['predicted_volatility'].values.astype(float)
+        assets = page['asset'].values
+
+        for asset in np.unique(assets):
+            mask = assets == asset
+            rv = self.realized.get(asset)
+            if rv is None:
+                self.skipped += int(mask.sum())
+                continue
+            t = ts_ms[mask]
+            realized, valid = rv.window(t, t + self.horizon_ms)
+            previous, valid_prev = rv.window(t - self.horizon_ms, t)
+            ok = valid & valid_prev
+            self.skipped += int((~ok).sum())
+            self.errors[asset].update(forecast[mask][ok], realized[ok], previous[ok])
+
+    def results(self):
+        """Métricas por activo y del total"""
+        out = {asset: e.metrics() for asset, e in self.errors.items() if e.count}
+        total = ForecastErrors()
+        for e in self.errors.values():
+            for attr in vars(total):
+                setattr(total, attr, getattr(total, attr) + getattr(e, attr))
+        if total.count:
+            out['ALL'] = total.metrics()
+        return out
+
+
+def forecast_ranges(use_mirror=False):
+    """Primer y último timestamp de pronósticos por activo"""
+    if use_mirror:
+        ranges = {}
+        for page in iter_mirror(columns=['asset', 'timestamp']):
+            ts = pd.to_datetime(page['timestamp'], utc=True)
+            for asset, group in ts.groupby(page['asset']):
+                lo, hi = group.min(), group.max()
+                old = ranges.get(asset)
+                ranges[asset] = (min(lo, old[0]), max(hi, old[1])) if old else (lo, hi)
+        return {a: (lo.to_pydatetime(), hi.to_pydatetime()) for a, (lo, hi) in ranges.items()}
+
+    client = bigquery.Client(project=PROJECT_ID)
+    query = f"""
+    SELECT asset, MIN(timestamp) AS first_ts, MAX(timestamp) AS last_ts
+    FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+    GROUP BY asset
+    """
+    return {
+        row.asset: (pd.Timestamp(row.first_ts).tz_convert('UTC').to_pydatetime(),
+                    pd.Timestamp(row.last_ts).tz_convert('UTC').to_pydatetime())
+        for row in client.query(query).result()
+    }
+
+
+def iter_forecasts(use_mirror=False, page_size=PAGE_SIZE):
+    """Pronósticos (asset, timestamp, predicted_volatility) página por página"""
+    columns = ['asset', 'timestamp', 'predicted_volatility']
+    if use_mirror:
+        yield from iter_mirror(columns=columns, batch_size=page_size)
+        return
+
+    client = bigquery.Client(project=PROJECT_ID)
+    query = f"""
+    SELECT asset, timestamp, predicted_volatility
+    FROM `{PROJECT_ID}.{DATASET_ID}.{TABLE_ID}`
+    WHERE predicted_volatility IS NOT NULL
+    """
+    yield from iter_query_pages(client, query, page_size)
+
+
+def print_results(results, skipped):
+    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'EVALUACIÓN WALK-FORWARD DE VOLATILIDAD'.center(80)}{Colors.RESET}")
+    print(f"{Colors.BOLD}{Colors.BLUE}{'='*80}{Colors.RESET}\n")
+
+    print(f"   {'Activo':<12}{'N':>10}{'MAE':>10}{'RMSE':>10}{'QLIKE':>10}{'Hit-rate':>11}")
+    for asset, m in results.items():
+        color = Colors.BOLD if asset == 'ALL' else ''
+        print(f"   {color}{asset:<12}{m['count']:>10,}{m['mae']:>10.4f}{m['rmse']:>10.4f}"
+              f"{m['qlike']:>10.4f}{m['hit_rate']:>10.1f}%{Colors.RESET}")
+
+    if skipped:
+        print(f"\n{Colors.YELLOW}⚠️  {skipped:,} pronósticos sin velas que cubran su ventana (omitidos){Colors.RESET}")
+    print()
+
+
+def main():
+    args = sys.argv[1:]
+    use_mirror = '--local' in args
+    interval = args[args.index('--interval') + 1] if '--interval' in args else '1h'
+    source = get_data_source(args[args.index('--source') + 1]) if '--source' in args else None
+
+    print(f"📥 Rango de pronósticos por activo ({'espejo Parquet' if use_mirror else 'BigQuery'})...")
+    ranges = forecast_ranges(use_mirror)
+    if not ranges:
+        print(f"{Colors.YELLOW}⚠️  No hay pronósticos{Colors.RESET}")
+        return
+
+    evaluator = WalkForwardEvaluator(interval=interval, source=source)
+    print(f"📥 Cargando velas de {interval} para {len(ranges)} activos...")
+    evaluator.prepare(ranges)
+
+    for page in iter_forecasts(use_mirror):
+        evaluator.update(page)
+
+    print_results(evaluator.results(), evaluator.skipped)
+
+
+if __name__ == "__main__":
+    main()